@@ -0,0 +1,174 @@
+from pathlib import Path
+from typing import Iterable, Iterator, TextIO
+import csv
+import gzip
+import io
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+
+from .enums import PipelineStep
+
+
+logger = logging.getLogger(__name__)
+
+
+# SRA/ENA/DDBJ run accessions: what prefetch and fasterq-dump take
+ACCESSION_PATTERN = re.compile(r"[SED]RR\d{6,}")
+
+LIST_SUFFIXES = (".txt", ".csv")
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+# invalid lines logged individually per file before only counting them
+MAX_LOGGED_INVALID = 5
+
+
+def _split_suffix(path: Path) -> tuple[str, str]:
+    """(list suffix, compression suffix or "") of a list file name."""
+    suffixes = [suffix.lower() for suffix in Path(path).suffixes]
+    compression = suffixes.pop() if suffixes and suffixes[-1] in COMPRESSED_SUFFIXES else ""
+    return (suffixes[-1] if suffixes else ""), compression
+
+
+def is_list_file(path: Path) -> bool:
+    """Plain or SraRunInfo CSV list, optionally gzip- or zstd-compressed."""
+    return not Path(path).name.startswith(".") and _split_suffix(path)[0] in LIST_SUFFIXES
+
+
+def _require_zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError("Reading .zst lists needs zstandard. Install it with `pip install zstandard`.") from e
+    return zstandard
+
+
+def open_list(path: Path) -> TextIO:
+    """Open a list file for streaming text reads, decompressing on the fly."""
+    _, compression = _split_suffix(path)
+    if compression == ".gz":
+        return gzip.open(path, "rt", newline="")
+    if compression == ".zst":
+        zstandard = _require_zstandard()
+        raw = open(path, "rb")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True), newline="")
+    return open(path, "r", newline="")
+
+
+def _run_column(f: TextIO, path: Path) -> Iterator[str]:
+    """Values of the Run column of an SraRunInfo CSV."""
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    if "Run" not in header:
+        raise ValueError(f"{path} has no Run column; expected an SraRunInfo CSV")
+    column = header.index("Run")
+    for row in reader:
+        # concatenated efetch batches repeat the header line
+        if len(row) > column and row[column] != "Run":
+            yield row[column]
+
+
+def read_accessions(path: Path) -> Iterator[str]:
+    """
+    Stream run accessions from a list file, one at a time. Text lists hold
+    one accession per line (blank lines and # comments are ignored); CSVs are
+    SraRunInfo tables read by their Run column. Entries that are not run
+    accessions are logged and skipped.
+    """
+    kind, _ = _split_suffix(path)
+    invalid = 0
+    with open_list(path) as f:
+        values = _run_column(f, path) if kind == ".csv" else f
+        for line_no, value in enumerate(values, 1):
+            value = value.strip()
+            if not value or value.startswith("#"):
+                continue
+            if ACCESSION_PATTERN.fullmatch(value):
+                yield value
+                continue
+            invalid += 1
+            if invalid <= MAX_LOGGED_INVALID:
+                logger.warning(f"{path}:{line_no}: skipping invalid accession {value[:40]!r}")
+    if invalid:
+        logger.warning(f"Skipped {invalid} invalid entries in {path}")
+
+
+class AccessionSpool:
+    """
+    Disk-backed state for ingesting lists too large to hold in memory: the
+    set of accessions seen so far (to drop ones repeated in later lists) and
+    the queue of planned jobs. Lives in a temporary SQLite file that is
+    removed on close.
+    """
+    def __init__(self, directory: Path = None):
+        fd, self.path = tempfile.mkstemp(prefix="ingest_", suffix=".db", dir=directory)
+        os.close(fd)
+        # jobs are read back from the pool's task-feeding thread
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE seen (accession TEXT PRIMARY KEY) WITHOUT ROWID;
+            CREATE TABLE jobs (accession TEXT, source_file TEXT, steps TEXT);
+        """)
+        self.jobs = 0
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+    def add_new(self, accessions: Iterable[str]) -> list[str]:
+        """Record accessions as seen; return those not seen before, in order and without repeats."""
+        new = []
+        for accession in accessions:
+            cursor = self._conn.execute("INSERT OR IGNORE INTO seen VALUES (?)", (accession,))
+            if cursor.rowcount:
+                new.append(accession)
+        return new
+
+
+    def queue(self, jobs: Iterable[tuple[str, str, tuple]]):
+        rows = [(acc, str(source), ",".join(step.value for step in steps)) for acc, source, steps in jobs]
+        self._conn.executemany("INSERT INTO jobs VALUES (?, ?, ?)", rows)
+        self.jobs += len(rows)
+
+
+    def iter_jobs(self, page_size: int = 1000) -> Iterator[tuple[str, str, tuple]]:
+        """Queued jobs in insertion order, read a page at a time."""
+        last = 0
+        while True:
+            page = self._conn.execute(
+                "SELECT rowid, accession, source_file, steps FROM jobs WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last, page_size),
+            ).fetchall()
+            if not page:
+                return
+            for last, accession, source_file, steps in page:
+                yield accession, source_file, tuple(PipelineStep(step) for step in steps.split(","))
+
+
+    def close(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+            Path(self.path).unlink(missing_ok=True)
+
+
+def chunked(values: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for value in values:
+        chunk.append(value)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -1,10 +1,6 @@
 from pathlib import Path
 import typer
 
-from .cli_components import create_pipeline_components
-from ..config import Config
-from ..job_orchestrator import SRAOrchestrator
-
 
 app = typer.Typer(help="Align FASTQ files with STAR or STARsolo depending on args.")
 
@@ -19,11 +15,18 @@ def align_run(
     umi_start: int = typer.Option(None, help="UMI start pos."),
     umi_len: int = typer.Option(None, help="UMI length."),
     barcode_whitelist: Path = typer.Option(None, help="Path to whitelist."),
+    metrics_port: int = typer.Option(None, help="Serve Prometheus metrics on this local port."),
+    profile: bool = typer.Option(False, help="Profile each job and write a collapsed-stack file next to the logs."),
+    dashboard: bool = typer.Option(False, help="Show a live per-step progress dashboard instead of a progress bar."),
     fresh_run: bool = typer.Option(False, help="Initialize a new CSV log?"),
 ):
     """
     Align converted FASTQ files to a genome reference using STAR.
     """
+    from ..config import Config
+    from ..job_orchestrator import SRAOrchestrator
+    from .cli_components import create_pipeline_components
+
     config = Config(config_file=config_file, safe=False, setup_logs=False)
 
     overrides = {
@@ -38,13 +41,15 @@ def align_run(
         "cb_len": cb_len,
         "umi_start": umi_start,
         "umi_len": umi_len,
+        "metrics_port": metrics_port,
+        "profile": profile,
+        "dashboard": dashboard,
     }
 
     components = create_pipeline_components(config, overrides)
-    orchestrator = SRAOrchestrator(**components)
-
-    if fresh_run:
-        orchestrator.prepare_for_run()
+    with SRAOrchestrator(**components) as orchestrator:
+        if fresh_run:
+            orchestrator.prepare_for_run()
     
-    orchestrator.process_sra_lists()
-    orchestrator.retry_failed()
\ No newline at end of file
+        orchestrator.process_sra_lists()
+        orchestrator.retry_failed()
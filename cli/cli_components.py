@@ -5,6 +5,7 @@ from ..log_manager import LogManager
 from ..validators import SRAValidator
 from ..status_checker import DownloadStatusChecker
 from ..config import Config
+from ..profiling import JobProfiler
 
 
 def create_pipeline_components(config: Config, overrides: Dict[str, Any]) -> Dict[str, Any]:
@@ -19,6 +20,13 @@ def create_pipeline_components(config: Config, overrides: Dict[str, Any]) -> Dic
 
     s3_bucket = overrides.get("s3_bucket") or config.s3_bucket
     s3_prefix = overrides.get("s3_prefix") or ""
+    metrics_port = overrides.get("metrics_port") or config.metrics_port
+    profile = overrides.get("profile", False)
+    dashboard = overrides.get("dashboard", False)
+    stages = overrides.get("stages")  # None: the command's flags decide
+    pack_outputs = overrides.get("pack_outputs")
+    if pack_outputs is None:
+        pack_outputs = config.pack_outputs
 
     # STAR-specific
     barcode_whitelist = overrides.get("barcode_whitelist")
@@ -31,6 +39,11 @@ def create_pipeline_components(config: Config, overrides: Dict[str, Any]) -> Dic
     log_manager = LogManager(config.csv_log_dir, config.python_log_dir)
     csv_log_path = log_manager.get_latest_csv_log()
 
+    profiler = None
+    if profile:
+        profiler = JobProfiler(log_manager.generate_profile_dir(), mode=config.profile_mode,
+                               interval=config.profile_interval)
+
     validator = SRAValidator(config.sra_output_dir)
     status_checker = DownloadStatusChecker(config.sra_output_dir)
 
@@ -43,6 +56,20 @@ def create_pipeline_components(config: Config, overrides: Dict[str, Any]) -> Dic
         "star_output_dir": config.star_output_dir,
 
         "database_url": config.database_url,
+        "manifest_buffered": config.manifest_buffered,
+        "manifest_flush_interval": config.manifest_flush_interval,
+        "manifest_flush_size": config.manifest_flush_size,
+        "single_writer": config.manifest_single_writer,
+
+        "step_timeouts": config.step_timeouts,
+        "stall_timeout": config.stall_timeout,
+
+        "metrics_port": metrics_port,
+        "metrics_textfile": config.metrics_textfile,
+        "metrics_interval": config.metrics_interval,
+        "profiler": profiler,
+        "dashboard": dashboard,
+        "stages": stages,
 
         "log_manager": log_manager,
         "validator": validator,
@@ -54,6 +81,8 @@ def create_pipeline_components(config: Config, overrides: Dict[str, Any]) -> Dic
         "s3_handler": s3_handler,
         "s3_bucket": s3_bucket,
         "s3_prefix": s3_prefix,
+        "pack_outputs": pack_outputs,
+        "pack_max_member_mb": config.pack_max_member_mb,
 
         "threads": threads,
         "max_retries": max_retries,
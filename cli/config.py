@@ -1,8 +1,6 @@
 from pathlib import Path
 import typer
 
-from ..config import Config
-
 
 app = typer.Typer(help="Setup or manage womb-raider configuration and folders.")
 
@@ -14,6 +12,8 @@ def initialize_config(
     """
     Initialize folder structure and setup logging system based on config.yaml.
     """
+    from ..config import Config
+
     typer.echo("Initializing configuration...")
 
     config = Config(config_file=config_file, base_dir=Path("."), safe=True, setup_logs=True)
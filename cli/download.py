@@ -1,10 +1,6 @@
 from pathlib import Path
 import typer
 
-from .cli_components import create_pipeline_components
-from ..config import Config
-from ..job_orchestrator import SRAOrchestrator
-
 
 app = typer.Typer(help="Download and validate SRA files.")
 
@@ -15,11 +11,18 @@ def download(
     batch_size: int = typer.Option(None, help="Max jobs per batch."),
     threads: int = typer.Option(None, help="Threads per job."),
     max_retries: int = typer.Option(None, help="Max retries for failed downloads."),
+    metrics_port: int = typer.Option(None, help="Serve Prometheus metrics on this local port."),
+    profile: bool = typer.Option(False, help="Profile each job and write a collapsed-stack file next to the logs."),
+    dashboard: bool = typer.Option(False, help="Show a live per-step progress dashboard instead of a progress bar."),
     fresh_run: bool = typer.Option(True, help="Initialize a new CSV log?"),
 ):
     """
     Download and validate SRA files only.
     """
+    from ..config import Config
+    from ..job_orchestrator import SRAOrchestrator
+    from .cli_components import create_pipeline_components
+
     config = Config(config_file=config_file, safe=False, setup_logs=False)
 
     overrides = {
@@ -29,13 +32,15 @@ def download(
         "convert_fastq": False,
         "align_star": False,
         "s3_handler": False,
+        "metrics_port": metrics_port,
+        "profile": profile,
+        "dashboard": dashboard,
     }
 
     components = create_pipeline_components(config, overrides)
-    orchestrator = SRAOrchestrator(**components)
-
-    if fresh_run:
-        orchestrator.prepare_for_run()
+    with SRAOrchestrator(**components) as orchestrator:
+        if fresh_run:
+            orchestrator.prepare_for_run()
 
-    orchestrator.process_sra_lists()
-    orchestrator.retry_failed()
\ No newline at end of file
+        orchestrator.process_sra_lists()
+        orchestrator.retry_failed()
@@ -0,0 +1,30 @@
+from pathlib import Path
+from typing import List
+import typer
+
+
+app = typer.Typer(help="Load run metadata used for scheduling and STAR parameters.")
+
+
+@app.command("import")
+def import_metadata(
+    paths: List[Path] = typer.Argument(..., help="SraRunInfo CSVs (.csv, .csv.gz, .csv.zst) and GEO SOFT files (.soft, .soft.gz)."),
+    config_file: Path = typer.Option("config.yaml", help="Path to config file."),
+):
+    """
+    Load SraRunInfo exports into the run_metadata table, then annotate their runs from GEO SOFT files.
+    """
+    from ..config import Config
+    from ..db.engine import get_session_maker
+    from .. import run_metadata
+
+    config = Config(config_file=config_file, safe=False, setup_logs=False)
+
+    session = get_session_maker(config.database_url)()
+    try:
+        counts = run_metadata.import_metadata(session, paths)
+    finally:
+        session.close()
+
+    typer.echo(f"{counts['runs']} runs loaded; {counts['geo_runs']} runs annotated from GEO"
+               + (f" ({counts['geo_unmatched']} GEO experiments without loaded runs)" if counts["geo_unmatched"] else ""))
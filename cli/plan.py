@@ -0,0 +1,32 @@
+from pathlib import Path
+from typing import List
+import typer
+
+from ..enums import PipelineStep
+from .run import DEFAULT_STAGES
+
+
+def plan_pipeline(
+    config_file: Path = typer.Option("config.yaml", help="Path to config file."),
+    stage: List[PipelineStep] = typer.Option(DEFAULT_STAGES, "--stage", "-s",
+                                             help="Stage to plan; repeat for several."),
+    out: Path = typer.Option(None, help="Save the plan as JSON for `run --plan`."),
+):
+    """
+    Dry run: show pending work per stage with estimated bytes and core-hours, without running anything.
+    """
+    from ..config import Config
+    from ..job_orchestrator import SRAOrchestrator
+    from ..planner import format_summary
+    from .cli_components import create_pipeline_components
+
+    config = Config(config_file=config_file, safe=False, setup_logs=False)
+
+    components = create_pipeline_components(config, {"stages": stage})
+    orchestrator = SRAOrchestrator(**components)
+
+    work_plan = orchestrator.build_plan()
+    typer.echo(format_summary(work_plan, workers=orchestrator.batch_size))
+    if out:
+        work_plan.save(out)
+        typer.echo(f"Plan saved to {out}")
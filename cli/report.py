@@ -0,0 +1,109 @@
+from pathlib import Path
+import typer
+
+
+app = typer.Typer(help="Export run results to Parquet or CSV and summarize them.")
+
+
+@app.command("export")
+def export(
+    config_file: Path = typer.Option("config.yaml", help="Path to config file."),
+):
+    """
+    Export jobs, step timings, tool usage and STAR metrics from the manifest to partitioned Parquet.
+    """
+    from ..config import Config
+    from ..db.engine import get_session_maker
+    from .. import reports
+
+    config = Config(config_file=config_file, safe=False, setup_logs=False)
+
+    session = get_session_maker(config.database_url)()
+    try:
+        written = reports.export_parquet(session, config.reports_dir)
+    finally:
+        session.close()
+
+    for name, path in written.items():
+        typer.echo(f"{name}: {path}")
+
+
+@app.command("csv")
+def csv(
+    config_file: Path = typer.Option("config.yaml", help="Path to config file."),
+):
+    """
+    Write a timestamped CSV snapshot of every job's step statuses. The CSV is an export; the DB is the source of truth.
+    """
+    from ..config import Config
+    from ..db.engine import get_session_maker
+    from ..log_manager import LogManager
+    from ..manifest_manager import ManifestManager
+
+    config = Config(config_file=config_file, safe=False, setup_logs=False)
+    log_manager = LogManager(config.csv_log_dir, config.python_log_dir)
+
+    session = get_session_maker(config.database_url)()
+    try:
+        log_path = log_manager.export_csv(ManifestManager(session).iter_log_rows())
+    finally:
+        session.close()
+
+    typer.echo(log_path)
+
+
+@app.command("throughput")
+def throughput(
+    config_file: Path = typer.Option("config.yaml", help="Path to config file."),
+    freq: str = typer.Option("1h", help="Time bucket size (pandas offset, e.g. 15min, 1h, 1D)."),
+):
+    """
+    Finished steps and bytes written per step per time bucket.
+    """
+    from ..config import Config
+    from .. import reports
+
+    config = Config(config_file=config_file, safe=False, setup_logs=False)
+    typer.echo(reports.throughput(config.reports_dir, freq).to_string(index=False))
+
+
+@app.command("failures")
+def failures(
+    config_file: Path = typer.Option("config.yaml", help="Path to config file."),
+):
+    """
+    Attempts, failures and failure rate per step.
+    """
+    from ..config import Config
+    from .. import reports
+
+    config = Config(config_file=config_file, safe=False, setup_logs=False)
+    typer.echo(reports.failure_rates(config.reports_dir).to_string(index=False))
+
+
+@app.command("durations")
+def durations(
+    config_file: Path = typer.Option("config.yaml", help="Path to config file."),
+):
+    """
+    p50/p95 duration of successful attempts per step.
+    """
+    from ..config import Config
+    from .. import reports
+
+    config = Config(config_file=config_file, safe=False, setup_logs=False)
+    typer.echo(reports.step_durations(config.reports_dir).to_string(index=False))
+
+
+@app.command("tools")
+def tools(
+    config_file: Path = typer.Option("config.yaml", help="Path to config file."),
+):
+    """
+    Wall time, cores used, peak memory and I/O per external tool.
+    """
+    from ..config import Config
+    from .. import reports
+
+    config = Config(config_file=config_file, safe=False, setup_logs=False)
+    typer.echo(reports.tool_usage(config.reports_dir).to_string(index=False))
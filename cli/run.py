@@ -0,0 +1,74 @@
+from pathlib import Path
+from typing import List
+import typer
+
+from ..enums import PipelineStep
+
+
+DEFAULT_STAGES = [PipelineStep.DOWNLOAD, PipelineStep.VALIDATE, PipelineStep.CONVERT, PipelineStep.ALIGN]
+
+
+def run_pipeline(
+    config_file: Path = typer.Option("config.yaml", help="Path to config file."),
+    stage: List[PipelineStep] = typer.Option(DEFAULT_STAGES, "--stage", "-s",
+                                             help="Stage to run; repeat for several."),
+    batch_size: int = typer.Option(None, help="Max jobs per batch."),
+    threads: int = typer.Option(None, help="Threads per job."),
+    max_retries: int = typer.Option(None, help="Max attempts per failed step."),
+    cb_start: int = typer.Option(None, help="Cell barcode start pos."),
+    cb_len: int = typer.Option(None, help="Cell barcode length."),
+    umi_start: int = typer.Option(None, help="UMI start pos."),
+    umi_len: int = typer.Option(None, help="UMI length."),
+    barcode_whitelist: Path = typer.Option(None, help="Path to whitelist."),
+    s3_bucket: str = typer.Option(None, help="S3 bucket name."),
+    s3_prefix: str = typer.Option("", help="S3 object prefix (optional)."),
+    pack_outputs: bool = typer.Option(None, help="Stream small outputs into one tar.gz per accession."),
+    metrics_port: int = typer.Option(None, help="Serve Prometheus metrics on this local port."),
+    profile: bool = typer.Option(False, help="Profile each job and write a collapsed-stack file next to the logs."),
+    dashboard: bool = typer.Option(False, help="Show a live per-step progress dashboard instead of a progress bar."),
+    fresh_run: bool = typer.Option(True, help="Initialize a new CSV log?"),
+    plan: Path = typer.Option(None, help="Execute a plan saved by `plan --out` (its stages replace --stage)."),
+):
+    """
+    Stream every accession through the selected stages in one pass.
+    """
+    from ..config import Config
+    from ..job_orchestrator import SRAOrchestrator
+    from ..planner import WorkPlan
+    from .cli_components import create_pipeline_components
+
+    work_plan = WorkPlan.load(plan) if plan else None
+    if work_plan:
+        stage = work_plan.stages
+
+    config = Config(config_file=config_file, safe=False, setup_logs=False)
+
+    overrides = {
+        "batch_size": batch_size,
+        "threads": threads,
+        "max_retries": max_retries,
+        "stages": stage,
+        "barcode_whitelist": barcode_whitelist,
+        "cb_start": cb_start,
+        "cb_len": cb_len,
+        "umi_start": umi_start,
+        "umi_len": umi_len,
+        "s3_bucket": s3_bucket,
+        "s3_prefix": s3_prefix,
+        "pack_outputs": pack_outputs,
+        "metrics_port": metrics_port,
+        "profile": profile,
+        "dashboard": dashboard,
+    }
+
+    components = create_pipeline_components(config, overrides)
+    with SRAOrchestrator(**components) as orchestrator:
+        if fresh_run:
+            orchestrator.prepare_for_run()
+
+        if work_plan:
+            orchestrator.execute_plan(work_plan)
+            return
+
+        orchestrator.process_sra_lists()
+        orchestrator.retry_failed()
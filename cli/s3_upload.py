@@ -1,10 +1,6 @@
 from pathlib import Path
 import typer
 
-from ..config import Config
-from ..job_orchestrator import SRAOrchestrator
-from .cli_components import create_pipeline_components
-
 
 app = typer.Typer(help="Upload STAR outputs to S3 bucket.")
 
@@ -16,11 +12,19 @@ def s3_upload(
     threads: int = typer.Option(None, help="Threads per job."),
     s3_bucket: str = typer.Option(None, help="S3 bucket name."),
     s3_prefix: str = typer.Option("", help="S3 object prefix (optional)."),
+    pack_outputs: bool = typer.Option(None, help="Stream small outputs into one tar.gz per accession."),
+    metrics_port: int = typer.Option(None, help="Serve Prometheus metrics on this local port."),
+    profile: bool = typer.Option(False, help="Profile each job and write a collapsed-stack file next to the logs."),
+    dashboard: bool = typer.Option(False, help="Show a live per-step progress dashboard instead of a progress bar."),
     fresh_run: bool = typer.Option(False, help="Initialize a new CSV log?"),
 ):
     """
     Upload STAR output files to S3.
     """
+    from ..config import Config
+    from ..job_orchestrator import SRAOrchestrator
+    from .cli_components import create_pipeline_components
+
     config = Config(config_file=config_file, safe=False, setup_logs=False)
 
     overrides = {
@@ -31,12 +35,15 @@ def s3_upload(
         "s3_handler": True,  # <<< Enable S3 handling
         "s3_bucket": s3_bucket,
         "s3_prefix": s3_prefix,
+        "pack_outputs": pack_outputs,
+        "metrics_port": metrics_port,
+        "profile": profile,
+        "dashboard": dashboard,
     }
 
     components = create_pipeline_components(config, overrides)
-    orchestrator = SRAOrchestrator(**components)
-
-    if fresh_run:
-        orchestrator.prepare_for_run()
+    with SRAOrchestrator(**components) as orchestrator:
+        if fresh_run:
+            orchestrator.prepare_for_run()
     
-    orchestrator.retry_failed()
\ No newline at end of file
+        orchestrator.retry_failed()
@@ -7,8 +7,6 @@ from .log_manager import LogManager
 from .log_setup import setup_logging
 
 
-load_dotenv()
-
 
 class Config:
     def __init__(self, config_file="config.yaml", base_dir=None, *,
@@ -30,6 +28,8 @@ class Config:
 
 
     def _set_database_url(self):
+        # read .env here rather than at import, so importing the CLI does no I/O
+        load_dotenv()
         self.database_url = os.getenv("database_url")
         if not self.database_url:
             raise ValueError("Missing database_url in environment. Please check your .env file.")
@@ -47,6 +47,29 @@ class Config:
         self.max_retries = self.config.get("max_retries", 5)
         self.s3_bucket = self.config.get("s3_bucket", None)
         self.s3_prefix = self.config.get("s3_prefix", "")
+        self.pack_outputs = self.config.get("pack_outputs", False)
+        self.pack_max_member_mb = self.config.get("pack_max_member_mb", 64)
+
+        manifest = self.config.get("manifest", {})
+        self.manifest_buffered = manifest.get("buffered", False)
+        self.manifest_flush_interval = manifest.get("flush_interval", 5.0)
+        self.manifest_flush_size = manifest.get("flush_size", 50)
+        self.manifest_single_writer = manifest.get("single_writer")  # None = auto (SQLite files)
+
+        self.log_format = self.config.get("logs", {}).get("format", "text")
+
+        watchdog = self.config.get("watchdog", {})
+        self.step_timeouts = {step: seconds for step, seconds in (watchdog.get("timeouts") or {}).items() if seconds}
+        stall_minutes = watchdog.get("stall_minutes")
+        self.stall_timeout = stall_minutes * 60 if stall_minutes else None
+
+        metrics = self.config.get("metrics", {})
+        self.metrics_port = metrics.get("port")
+        self.metrics_interval = metrics.get("interval", 15.0)
+
+        profiling = self.config.get("profiling", {})
+        self.profile_mode = profiling.get("mode", "sample")
+        self.profile_interval = profiling.get("interval", 0.01)
 
 
     def _path(self, *args):
@@ -66,6 +89,10 @@ class Config:
         logs = self.config["logs"]
         self.csv_log_dir = self.logs_dir / logs["csv"]
         self.python_log_dir = self.logs_dir / logs["python"]
+        self.reports_dir = self.logs_dir / logs.get("reports", "reports")
+
+        textfile = self.config.get("metrics", {}).get("textfile")
+        self.metrics_textfile = self.logs_dir / textfile if textfile else None
 
         star = self.config["star"]
         self.star_genome_dir = self.star_dir / star["genome_dir"]
@@ -89,4 +116,4 @@ class Config:
     def _initialize_logging(self):
         log_manager = LogManager(self.csv_log_dir, self.python_log_dir)
         python_log_path = log_manager.generate_python_log()
-        setup_logging(python_log_path)
\ No newline at end of file
+        setup_logging(python_log_path, json_format=self.log_format == "json")
\ No newline at end of file
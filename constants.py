@@ -8,4 +8,12 @@ CSV_HEADER = [
     "Align Status",
     "Upload Status",
     "Source File"
-]
\ No newline at end of file
+]
+
+# dashboard.py, planner.py
+# which of a step's byte counts (step_events bytes_in/bytes_out) measures its work;
+# steps not listed use "out"
+STEP_BYTES_DIRECTION = {
+    "validate": "in",
+    "upload": "in",
+}
@@ -0,0 +1,197 @@
+from collections import deque
+from typing import Optional
+import time
+
+from rich.console import Console, Group
+from rich.live import Live
+from rich.table import Table
+from rich.text import Text
+
+from .constants import STEP_BYTES_DIRECTION
+from .metrics import (MetricsRegistry, JOBS_COMPLETED, STEP_BYTES, STEP_DURATION, STEP_RESULTS, STEPS_ACTIVE,
+                      TOOL_PROGRESS)
+from .utils import format_bytes
+
+
+def _format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "?"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h {minutes:02d}m"
+    if minutes:
+        return f"{minutes}m {seconds:02d}s"
+    return f"{seconds}s"
+
+
+class Dashboard:
+    """
+    Live terminal view of a batch, drawn from the parent's MetricsRegistry:
+    per-step active/queued/done counts, bytes/s and jobs/h over a sliding
+    window, the rates running tools report their own progress at (STAR
+    reads/s), and an ETA from historical mean step durations (falling back
+    to this run's). Rendering only reads a registry snapshot in the parent's
+    refresh thread, so workers never wait on it.
+    """
+    def __init__(self, registry: MetricsRegistry, *, steps: list[str], total: int, workers: int,
+                 history: dict[str, float] = None, refresh_interval: float = 1.0,
+                 window: float = 60.0, console: Console = None):
+        self.registry = registry
+        self.steps = steps
+        self.total = total
+        self.workers = max(1, workers)
+        self.history = history or {}
+        self.refresh_interval = refresh_interval
+        self.window = window
+        self.console = console
+
+        self._samples = deque()
+        self._started = time.monotonic()
+        self._live = None
+        self._completed_before = 0
+
+
+    def start(self):
+        self._started = time.monotonic()
+        # the registry outlives a batch: count only the jobs of this one
+        values, _ = self.registry.snapshot()
+        self._completed_before = sum(value for (metric, _), value in values.items() if metric == JOBS_COMPLETED)
+        self._live = Live(get_renderable=self.render, console=self.console,
+                          refresh_per_second=1 / self.refresh_interval, transient=False)
+        self._live.start()
+
+
+    def stop(self):
+        if self._live:
+            self._live.refresh()
+            self._live.stop()
+            self._live = None
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+    def summary(self, now: float = None) -> dict:
+        """Current counts, rates and ETA; render() draws this."""
+        now = time.monotonic() if now is None else now
+        values, histograms = self.registry.snapshot()
+
+        def total(name, **labels):
+            wanted = set((k, str(v)) for k, v in labels.items())
+            return sum(value for (metric, key), value in values.items()
+                       if metric == name and wanted <= set(key))
+
+        completed = total(JOBS_COMPLETED) - self._completed_before
+        remaining = max(0, self.total - completed)
+        active = {step: total(STEPS_ACTIVE, step=step) for step in self.steps}
+        sample = {
+            "completed": completed,
+            "bytes": {step: total(STEP_BYTES, step=step, direction=STEP_BYTES_DIRECTION.get(step, "out"))
+                      for step in self.steps},
+            "done": {step: total(STEP_RESULTS, step=step) for step in self.steps},
+            "progress": {(dict(key)["tool"], dict(key)["unit"]): value
+                         for (metric, key), value in values.items() if metric == TOOL_PROGRESS},
+        }
+        oldest = self._record_sample(now, sample)
+        elapsed = now - oldest[0]
+
+        def rate(current, previous, per=1.0):
+            return (current - previous) * per / elapsed if elapsed > 0 else 0.0
+
+        steps = []
+        remaining_work = 0.0
+        for i, step in enumerate(self.steps):
+            # remaining jobs have not reached this step unless they are active in it or a later one
+            later_active = sum(active[s] for s in self.steps[i:])
+            queued = max(0, remaining - later_active)
+            histogram = histograms.get((STEP_DURATION, (("step", step),)))
+            run_mean = histogram[-1] / histogram[-2] if histogram and histogram[-2] else None
+            mean = self.history.get(step, run_mean)
+            if mean is not None:
+                # active steps are on average half done
+                remaining_work += (queued + active[step] / 2) * mean
+            steps.append({
+                "step": step,
+                "active": active[step],
+                "queued": queued,
+                "done": sample["done"][step],
+                "failed": total(STEP_RESULTS, step=step, status="Failed")
+                          + total(STEP_RESULTS, step=step, status="TimedOut"),
+                "bytes_per_second": rate(sample["bytes"][step], oldest[1]["bytes"][step]),
+                "jobs_per_hour": rate(sample["done"][step], oldest[1]["done"][step], 3600),
+                "mean_seconds": mean,
+            })
+
+        progress = [
+            {"tool": tool, "unit": unit, "per_second": rate(value, oldest[1]["progress"].get((tool, unit), 0))}
+            for (tool, unit), value in sorted(sample["progress"].items())
+        ]
+
+        jobs_per_hour = rate(completed, oldest[1]["completed"], 3600)
+        if remaining == 0:
+            eta = 0.0
+        elif remaining_work:
+            eta = remaining_work / self.workers
+        elif jobs_per_hour:
+            eta = remaining / jobs_per_hour * 3600
+        else:
+            eta = None
+
+        return {
+            "total": self.total,
+            "completed": completed,
+            "elapsed_seconds": now - self._started,
+            "jobs_per_hour": jobs_per_hour,
+            "eta_seconds": eta,
+            "steps": steps,
+            "progress": progress,
+        }
+
+
+    def _record_sample(self, now: float, sample: dict) -> tuple:
+        """Keep samples inside the rate window and return the oldest one."""
+        self._samples.append((now, sample))
+        while len(self._samples) > 1 and now - self._samples[0][0] > self.window:
+            self._samples.popleft()
+        return self._samples[0]
+
+
+    def render(self):
+        summary = self.summary()
+
+        table = Table(expand=False, box=None, pad_edge=False)
+        table.add_column("Step")
+        for column in ("Active", "Queued", "Done", "Failed", "Bytes/s", "Jobs/h", "Mean"):
+            table.add_column(column, justify="right")
+        for row in summary["steps"]:
+            table.add_row(
+                row["step"],
+                str(int(row["active"])),
+                str(int(row["queued"])),
+                str(int(row["done"])),
+                Text(str(int(row["failed"])), style="red" if row["failed"] else ""),
+                f"{format_bytes(row['bytes_per_second'])}/s",
+                f"{row['jobs_per_hour']:.0f}",
+                _format_duration(row["mean_seconds"]),
+            )
+
+        header = Text(
+            f"Jobs {int(summary['completed'])}/{summary['total']}  "
+            f"{summary['jobs_per_hour']:.0f} jobs/h  "
+            f"elapsed {_format_duration(summary['elapsed_seconds'])}  "
+            f"ETA {_format_duration(summary['eta_seconds'])}",
+            style="bold",
+        )
+        if not summary["progress"]:
+            return Group(header, table)
+        progress = Text("  ".join(f"{row['tool']} {row['per_second']:,.0f} {row['unit']}/s"
+                                  for row in summary["progress"]))
+        return Group(header, table, progress)
@@ -0,0 +1,49 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+import os
+
+
+# how long a SQLite connection waits on a lock before raising "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = 30_000
+
+# one engine per (process, url): forked pool workers must not reuse
+# the parent's pooled connections
+_session_makers = {}
+
+
+def is_sqlite_file(database_url: str) -> bool:
+    """True for on-disk SQLite URLs (in-memory databases cannot use WAL or be shared)."""
+    if not database_url.startswith("sqlite"):
+        return False
+    path = database_url.split("///", 1)[1] if "///" in database_url else ""
+    return path not in ("", ":memory:")
+
+
+def create_db_engine(database_url: str) -> Engine:
+    """create_engine, plus WAL and busy-timeout pragmas on every SQLite connection."""
+    if not database_url.startswith("sqlite"):
+        return create_engine(database_url)
+
+    engine = create_engine(database_url, connect_args={"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000})
+    wal = is_sqlite_file(database_url)
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        if wal:
+            # readers no longer block the writer; NORMAL is durable under WAL except on power loss
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.close()
+
+    return engine
+
+
+def get_session_maker(database_url: str) -> sessionmaker:
+    """Return a cached sessionmaker for this process. The schema is setup_db's job (db.schema.create_schema)."""
+    key = (os.getpid(), database_url)
+    if key not in _session_makers:
+        _session_makers[key] = sessionmaker(bind=create_db_engine(database_url))
+    return _session_makers[key]
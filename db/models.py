@@ -1,8 +1,8 @@
-from sqlalchemy import Column, String, Enum, DateTime
+from sqlalchemy import Column, String, Enum, DateTime, Integer, BigInteger, Float, Index
 from sqlalchemy.orm import declarative_base
 from datetime import datetime, timezone
 
-from ..enums import StepStatus, PipelineStatus
+from ..enums import StepStatus, PipelineStatus, PipelineStep
 
 
 Base = declarative_base()
@@ -20,7 +20,124 @@ class JobModel(Base):
     align_status = Column(Enum(StepStatus), default=StepStatus.PENDING)
     upload_status = Column(Enum(StepStatus), default=StepStatus.PENDING)
 
-    pipeline_status = Column(Enum(PipelineStatus), default=PipelineStatus.PENDING)
+    # indexed: retry selection filters on it
+    pipeline_status = Column(Enum(PipelineStatus), default=PipelineStatus.PENDING, index=True)
 
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
\ No newline at end of file
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+
+class StepEventModel(Base):
+    """Append-only record of every step attempt, one row per finished step."""
+    __tablename__ = "step_events"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    accession = Column(String, nullable=False)
+    step = Column(Enum(PipelineStep), nullable=False)
+    attempt = Column(Integer, nullable=False, default=1)
+
+    status = Column(Enum(StepStatus), nullable=False)
+    started_at = Column(DateTime, nullable=False)
+    ended_at = Column(DateTime, nullable=False)
+    duration_seconds = Column(Float)
+
+    bytes_in = Column(BigInteger)
+    bytes_out = Column(BigInteger)
+    exit_code = Column(Integer)
+    host = Column(String)
+
+    __table_args__ = (
+        Index("ix_step_events_step_status", "step", "status"),
+        Index("ix_step_events_started_at", "started_at"),
+        Index("ix_step_events_accession_step", "accession", "step"),
+    )
+
+
+class ToolRunModel(Base):
+    """Resource usage of one external tool invocation within a step attempt."""
+    __tablename__ = "tool_runs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    accession = Column(String, nullable=False)
+    step = Column(Enum(PipelineStep), nullable=False)
+    attempt = Column(Integer, nullable=False, default=1)
+    tool = Column(String, nullable=False)
+    exit_code = Column(Integer)
+
+    wall_seconds = Column(Float)
+    user_cpu_seconds = Column(Float)
+    sys_cpu_seconds = Column(Float)
+    max_rss_kb = Column(BigInteger)
+    read_bytes = Column(BigInteger)
+    write_bytes = Column(BigInteger)
+    host = Column(String)
+    recorded_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("ix_tool_runs_tool", "tool"),
+        Index("ix_tool_runs_accession_step", "accession", "step"),
+    )
+
+
+class RunMetadataModel(Base):
+    """Per-run facts from SraRunInfo exports, annotated from GEO SOFT files (see run_metadata)."""
+    __tablename__ = "run_metadata"
+
+    accession = Column(String, primary_key=True)
+    experiment = Column(String)
+    study = Column(String)
+    sample = Column(String)
+    geo_sample = Column(String)
+
+    layout = Column(String)  # PAIRED or SINGLE
+    spots = Column(BigInteger)
+    bases = Column(BigInteger)
+    avg_length = Column(Float)  # per spot, both mates together
+    size_mb = Column(Float)
+    platform = Column(String)
+    library_strategy = Column(String)
+
+    source_file = Column(String)
+    recorded_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # GEO samples point at experiments, not runs
+        Index("ix_run_metadata_experiment", "experiment"),
+    )
+
+
+class StarMetricsModel(Base):
+    """Alignment summary from STAR's Log.final.out, latest alignment per accession."""
+    __tablename__ = "star_metrics"
+
+    accession = Column(String, primary_key=True)
+    input_reads = Column(BigInteger)
+    avg_input_read_length = Column(Float)
+    uniquely_mapped_reads = Column(BigInteger)
+    uniquely_mapped_pct = Column(Float)
+    mismatch_rate_pct = Column(Float)
+    multi_mapped_pct = Column(Float)
+    unmapped_too_short_pct = Column(Float)
+    unmapped_other_pct = Column(Float)
+    mapping_speed_mreads_per_hour = Column(Float)
+
+    recorded_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+
+class ArtifactModel(Base):
+    """A file a successful step left on disk, as it was when the step finished (see artifacts)."""
+    __tablename__ = "artifacts"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    accession = Column(String, nullable=False)
+    step = Column(Enum(PipelineStep), nullable=False)
+    path = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    mtime_ns = Column(BigInteger, nullable=False)
+    # artifacts.fast_digest, filled in by a background thread; None if the file went before it was hashed
+    digest = Column(String)
+    recorded_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("ix_artifacts_accession_step", "accession", "step"),
+    )
@@ -0,0 +1,38 @@
+from sqlalchemy.engine import Engine
+
+from ..enums import StepStatus
+from .models import Base
+from .views import create_views
+
+
+# StepStatus labels added after the first manifests were created. On Postgres the
+# status columns share the native enum type `stepstatus`, which create_all never alters
+ADDED_STEP_STATUSES = (StepStatus.RUNNING, StepStatus.INTERRUPTED, StepStatus.TIMED_OUT)
+
+# indexes added to tables that already existed (create_all only indexes the tables it creates)
+ADDED_INDEXES = {
+    "ix_jobs_pipeline_status": "jobs (pipeline_status)",
+}
+
+
+def create_schema(engine: Engine) -> None:
+    """
+    Create the manifest tables and views, and bring an existing manifest up
+    to date with the enum labels and indexes added since. Run once per
+    database (setup_db), never from the pipeline's processes: every pool
+    worker running DDL at once contends for locks, and on Postgres fails
+    the batch.
+    """
+    Base.metadata.create_all(engine)
+
+    if engine.dialect.name == "postgresql":
+        # before Postgres 12, ADD VALUE cannot run inside a transaction block
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for status in ADDED_STEP_STATUSES:
+                conn.exec_driver_sql(f"ALTER TYPE stepstatus ADD VALUE IF NOT EXISTS '{status.name}'")
+
+    with engine.begin() as conn:
+        for name, columns in ADDED_INDEXES.items():
+            conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON {columns}")
+
+    create_views(engine)
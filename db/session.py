@@ -3,6 +3,15 @@ from sqlalchemy.orm import sessionmaker
 from ..config import Config
 
 
-cfg = Config()
-engine = create_engine(cfg.database_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+_built = {}
+
+
+def __getattr__(name):
+    """Build `engine` and `SessionLocal` on first use instead of at import."""
+    if name not in ("engine", "SessionLocal"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if not _built:
+        cfg = Config()
+        _built["engine"] = create_engine(cfg.database_url)
+        _built["SessionLocal"] = sessionmaker(autocommit=False, autoflush=False, bind=_built["engine"])
+    return _built[name]
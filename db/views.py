@@ -0,0 +1,69 @@
+from sqlalchemy.engine import Engine
+
+
+# nearest-rank percentiles so the same SQL runs on SQLite and Postgres
+STEP_DURATIONS = """
+WITH ranked AS (
+    SELECT step, duration_seconds,
+           ROW_NUMBER() OVER (PARTITION BY step ORDER BY duration_seconds) AS rn,
+           COUNT(*) OVER (PARTITION BY step) AS n
+    FROM step_events
+    WHERE status = 'SUCCESS' AND duration_seconds IS NOT NULL
+)
+SELECT step,
+       COUNT(*) AS runs,
+       AVG(duration_seconds) AS mean_seconds,
+       MIN(CASE WHEN rn >= 0.50 * n THEN duration_seconds END) AS p50_seconds,
+       MIN(CASE WHEN rn >= 0.95 * n THEN duration_seconds END) AS p95_seconds,
+       MAX(duration_seconds) AS max_seconds
+FROM ranked
+GROUP BY step
+"""
+
+STEP_THROUGHPUT = """
+SELECT step, status,
+       COUNT(*) AS events,
+       SUM(duration_seconds) AS busy_seconds,
+       SUM(COALESCE(bytes_in, 0)) AS bytes_in,
+       SUM(COALESCE(bytes_out, 0)) AS bytes_out,
+       SUM(COALESCE(bytes_out, 0)) / NULLIF(SUM(duration_seconds), 0) AS bytes_out_per_second,
+       MIN(started_at) AS first_started_at,
+       MAX(ended_at) AS last_ended_at
+FROM step_events
+GROUP BY step, status
+"""
+
+HOURLY_BUCKET = {
+    "sqlite": "strftime('%Y-%m-%d %H:00:00', ended_at)",
+    "postgresql": "date_trunc('hour', ended_at)",
+}
+
+STEP_THROUGHPUT_HOURLY = """
+SELECT step, {bucket} AS hour,
+       COUNT(*) AS jobs,
+       SUM(CASE WHEN status IN ('FAILED', 'TIMED_OUT') THEN 1 ELSE 0 END) AS failed,
+       SUM(COALESCE(bytes_out, 0)) AS bytes_out
+FROM step_events
+GROUP BY step, {bucket}
+"""
+
+
+def _views(dialect: str) -> dict[str, str]:
+    views = {
+        "step_durations": STEP_DURATIONS,
+        "step_throughput": STEP_THROUGHPUT,
+    }
+    if dialect in HOURLY_BUCKET:
+        views["step_throughput_hourly"] = STEP_THROUGHPUT_HOURLY.format(bucket=HOURLY_BUCKET[dialect])
+    return views
+
+
+def create_views(engine: Engine) -> None:
+    """Create (or refresh) the capacity-planning views over step_events."""
+    dialect = engine.dialect.name
+    create = "CREATE OR REPLACE VIEW" if dialect == "postgresql" else "CREATE VIEW IF NOT EXISTS"
+
+    with engine.begin() as conn:
+        for name, query in _views(dialect).items():
+            # driver-level SQL: the strftime pattern must not be parsed for bind params
+            conn.exec_driver_sql(f"{create} {name} AS {query}")
@@ -0,0 +1,70 @@
+from pathlib import Path
+from typing import Optional
+import fcntl
+import logging
+import os
+import shutil
+import socket
+
+
+logger = logging.getLogger(__name__)
+
+
+# claims live here, under the directory they claim space in
+CLAIMS_DIR = ".disk_claims"
+
+
+def _claimed(claims_dir: Path, host: str) -> int:
+    """Bytes held by live claims, removing this host's claims whose process is gone."""
+    total = 0
+    for claim in claims_dir.glob("*.claim"):
+        try:
+            owner, pid, size = claim.read_text().split()
+        except (OSError, ValueError):
+            continue
+        if owner == host and not _alive(int(pid)):
+            logger.info(f"Dropping disk claim {claim.name} left by exited process {pid}")
+            claim.unlink(missing_ok=True)
+            continue
+        total += int(size)
+    return total
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def reserve(directory: Path, name: str, needed: int) -> Optional[Path]:
+    """
+    Claim `needed` bytes under directory for `name` if free space covers them
+    on top of every claim already held, and return the claim (for release());
+    None if it does not fit. Claims are files under CLAIMS_DIR taken under a
+    lock, so parallel workers (and other runs on the same tree) cannot all
+    pass on the same free space. A claim counts in full until it is released,
+    even as its download fills the disk, so this errs on the side of caution.
+    """
+    claims_dir = Path(directory) / CLAIMS_DIR
+    claims_dir.mkdir(parents=True, exist_ok=True)
+    host = socket.gethostname()
+    with open(claims_dir / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        free = shutil.disk_usage(directory).free
+        claimed = _claimed(claims_dir, host)
+        if free < claimed + needed:
+            logger.error(f"Not enough space for {name} under {directory}: needs about {needed / 2**30:.1f} GiB, "
+                         f"{free / 2**30:.1f} GiB free of which {claimed / 2**30:.1f} GiB is claimed")
+            return None
+        claim = claims_dir / f"{name}.claim"
+        claim.write_text(f"{host} {os.getpid()} {needed}\n")
+    return claim
+
+
+def release(claim: Optional[Path]):
+    if claim is not None:
+        claim.unlink(missing_ok=True)
@@ -16,6 +16,12 @@ class StepStatus(str, Enum):
     SUCCESS = "Success"
     FAILED = "Failed"
     SKIPPED = "Skipped"
+    # in flight; left behind only if the process running the step died
+    RUNNING = "Running"
+    # stopped by a shutdown signal; the next run resumes it
+    INTERRUPTED = "Interrupted"
+    # failed because the watchdog killed a hung or overlong tool; requeued within the run
+    TIMED_OUT = "TimedOut"
 
 
 # ---- job.py ----
@@ -3,6 +3,10 @@ import logging
 from pathlib import Path
 from typing import List
 
+from .log_setup import log_subprocess_output
+from .tool_runner import run_tool
+from . import fs_index
+
 
 class FASTQConverter:
     def __init__(self, *, output_dir: Path, threads: int = 4):
@@ -17,11 +21,14 @@ class FASTQConverter:
         cmd = self._build_fasterq_command(accession)
 
         try:
-            subprocess.run(cmd, capture_output=True, text=True, cwd=self.output_dir, check=True)
+            run_tool("fasterq-dump", cmd, cwd=self.output_dir, check=True)
+            for path in [*self.get_fastq_paths(accession), self.get_single_end_path(accession)]:
+                fs_index.refresh(path)
             self.logger.info(f"FASTQ conversion completed for {accession}")
             return True
         except subprocess.CalledProcessError as e:
-            self.logger.warning(f"FASTQ conversion failed for {accession}:\n{e.stderr}")
+            log_subprocess_output(self.logger, f"FASTQ conversion failed for {accession}", e.stderr,
+                                  level=logging.WARNING)
             return False
 
 
@@ -33,6 +40,20 @@ class FASTQConverter:
         return [r1, r2]
 
 
+    def get_single_end_path(self, accession: str) -> Path:
+        """fasterq-dump writes unpaired reads to <accession>.fastq."""
+        return self.output_dir / f"{accession}.fastq"
+
+
+    def find_fastq_files(self, accession: str) -> List[Path]:
+        """The converted FASTQs on disk: both mates, else the single-end file, else none."""
+        paired = self.get_fastq_paths(accession)
+        if all(fs_index.exists(path) for path in paired):
+            return paired
+        single = self.get_single_end_path(accession)
+        return [single] if fs_index.exists(single) else []
+
+
     def _build_fasterq_command(self, accession: str) -> List[str]:
         """Builds the fasterq-dump command."""
         return [
@@ -0,0 +1,189 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Optional
+import logging
+import os
+import stat
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class FsIndex:
+    """
+    In-memory directory listings of the pipeline's data trees, so per-accession
+    existence checks don't each cost a metadata round trip on shared storage.
+
+    Each root is listed once with os.scandir when the index is built; deeper
+    directories are listed lazily the first time something under them is
+    looked up, and a path whose parent is known not to exist is answered
+    without touching the filesystem at all. Code that creates or deletes
+    files under a root reports it with refresh()/discard(). Paths outside
+    the roots fall through to the filesystem.
+    """
+    def __init__(self, roots: Iterable[Path]):
+        self._dirs = {}  # directory -> {entry name: is_dir}
+        self.roots = []
+        for root in roots:
+            root = os.path.abspath(root)
+            if root not in self.roots and self._scan(root) is not None:
+                self.roots.append(root)
+
+
+    def covers(self, path) -> bool:
+        path = os.path.abspath(path)
+        return any(path == root or path.startswith(root + os.sep) for root in self.roots)
+
+
+    def exists(self, path) -> bool:
+        path = os.path.abspath(path)
+        if not self.covers(path):
+            return os.path.exists(path)
+        if path in self.roots:
+            return True
+        listing = self._listing(os.path.dirname(path))
+        return listing is not None and os.path.basename(path) in listing
+
+
+    def is_file(self, path) -> bool:
+        path = os.path.abspath(path)
+        if not self.covers(path):
+            return os.path.isfile(path)
+        if path in self.roots:
+            return False
+        listing = self._listing(os.path.dirname(path))
+        return listing is not None and listing.get(os.path.basename(path)) is False
+
+
+    def listdir(self, path) -> Optional[list[str]]:
+        """Entry names of a directory, or None if it does not exist."""
+        path = os.path.abspath(path)
+        if not self.covers(path):
+            try:
+                return sorted(os.listdir(path))
+            except (FileNotFoundError, NotADirectoryError):
+                return None
+        listing = self._listing(path)
+        return None if listing is None else sorted(listing)
+
+
+    def refresh(self, path):
+        """Re-read one path (one stat) after a tool created, replaced or removed it."""
+        path = os.path.abspath(path)
+        if not self.covers(path):
+            return
+        self._forget(path)
+        try:
+            is_dir = stat.S_ISDIR(os.stat(path).st_mode)
+            exists = True
+        except (FileNotFoundError, NotADirectoryError):
+            is_dir = exists = False
+
+        if path in self.roots:
+            if exists:
+                self._scan(path)
+            return
+
+        parent_dir, name = os.path.split(path)
+        parent = self._dirs.get(parent_dir)
+        if parent is None:
+            # the parent is not listed yet (or was just created as well): make sure
+            # its own parent knows about it; the lazy listing will then find path
+            if exists:
+                self.refresh(parent_dir)
+        elif exists:
+            parent[name] = is_dir
+        else:
+            parent.pop(name, None)
+
+
+    def discard(self, path):
+        """Forget a path this process just deleted."""
+        path = os.path.abspath(path)
+        self._forget(path)
+        parent = self._dirs.get(os.path.dirname(path))
+        if parent is not None:
+            parent.pop(os.path.basename(path), None)
+
+
+    def _listing(self, directory: str) -> Optional[dict]:
+        if directory in self._dirs:
+            return self._dirs[directory]
+        if directory in self.roots:
+            return None
+        parent = self._listing(os.path.dirname(directory))
+        if parent is None or not parent.get(os.path.basename(directory)):
+            return None
+        return self._scan(directory)
+
+
+    def _scan(self, directory: str) -> Optional[dict]:
+        try:
+            with os.scandir(directory) as entries:
+                # is_dir() comes from d_type on Linux, so no extra stat per entry
+                listing = {entry.name: entry.is_dir() for entry in entries}
+        except (FileNotFoundError, NotADirectoryError):
+            self._dirs.pop(directory, None)
+            return None
+        self._dirs[directory] = listing
+        return listing
+
+
+    def _forget(self, directory: str):
+        listing = self._dirs.pop(directory, None)
+        for name, is_dir in (listing or {}).items():
+            if is_dir:
+                self._forget(os.path.join(directory, name))
+
+
+# this process's index; pool workers forked while it is set inherit it
+_index = None
+
+
+@contextmanager
+def indexing(roots: Iterable[Path]):
+    """Build the index over roots for the duration of the block."""
+    global _index
+    start = time.perf_counter()
+    _index = FsIndex(root for root in roots if root)
+    entries = sum(len(listing) for listing in _index._dirs.values())
+    logger.info(f"Indexed {entries} entries under {len(_index.roots)} roots "
+                f"in {time.perf_counter() - start:.2f}s")
+    try:
+        yield _index
+    finally:
+        _index = None
+
+
+def exists(path: Path) -> bool:
+    return _index.exists(path) if _index is not None else path.exists()
+
+
+def is_file(path: Path) -> bool:
+    return _index.is_file(path) if _index is not None else path.is_file()
+
+
+def listdir(path: Path) -> Optional[list[str]]:
+    """Entry names of a directory, or None if it does not exist."""
+    if _index is not None:
+        return _index.listdir(path)
+    try:
+        return sorted(os.listdir(path))
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def glob_prefix(directory: Path, prefix: str) -> list[Path]:
+    """Entries of directory whose name starts with prefix (what directory.glob(f"{prefix}*") finds)."""
+    return [directory / name for name in listdir(directory) or [] if name.startswith(prefix)]
+
+
+def refresh(path: Path):
+    if _index is not None:
+        _index.refresh(path)
+
+
+def discard(path: Path):
+    if _index is not None:
+        _index.discard(path)
@@ -1,22 +1,51 @@
 from pathlib import Path
+from datetime import datetime, timezone
 import logging
+import socket
 import subprocess
-from typing import Optional
+import time
+from typing import Optional, TYPE_CHECKING
 
 from .validators import SRAValidator
 from .status_checker import DownloadStatusChecker
 from .fastq_converter import FASTQConverter
 from .star_runner import STARRunner
-from .s3_handler import S3Handler
 from .manifest_manager import ManifestManager
-from .db.models import StepStatus
+from .tar_packer import pack_and_upload, expand_files
+from .log_setup import bind_log_context, log_subprocess_output
+from .tool_runner import run_tool, start_usage_collection, set_step_limits, take_tool_usage, tool_killed
+from . import disk_space
+from . import fs_index
+from . import metrics
+from . import shutdown
+from .db.models import StepStatus, RunMetadataModel
+from .run_metadata import disk_needed
+from .artifacts import PendingArtifacts
 
 from .enums import PipelineStep
 
+if TYPE_CHECKING:
+    # boto3 is only needed once an upload actually runs
+    from .s3_handler import S3Handler
+
 
 logger = logging.getLogger(__name__)
 
 
+HOST = socket.gethostname()
+
+
+def _total_size(paths: list[Path]) -> int:
+    """Sum sizes of the given files (and files under given directories), ignoring missing ones."""
+    total = 0
+    for file in expand_files(paths):
+        try:
+            total += file.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
 class Job:
     def __init__(
         self,
@@ -27,8 +56,11 @@ class Job:
         status_checker: DownloadStatusChecker,
         manifest_manager: ManifestManager,
         fastq_converter: Optional[FASTQConverter] = None,
-        s3_handler: Optional[S3Handler] = None,
+        s3_handler: Optional["S3Handler"] = None,
         star_runner: Optional[STARRunner] = None,
+        run_metadata: Optional[RunMetadataModel] = None,
+        step_timeouts: Optional[dict[str, float]] = None,
+        stall_timeout: Optional[float] = None,
     ):
         self.accession = accession
         self.source_file = source_file
@@ -39,6 +71,9 @@ class Job:
         self.fastq_converter = fastq_converter
         self.s3_handler = s3_handler
         self.star_runner = star_runner
+        self.run_metadata = run_metadata
+        self.step_timeouts = step_timeouts or {}
+        self.stall_timeout = stall_timeout
 
         job_record = self.manifest_manager.get_or_create_job(
             accession=self.accession,
@@ -49,70 +84,91 @@ class Job:
         self.download_status = job_record.download_status
         self.validate_status = job_record.validate_status
         self.convert_status = job_record.convert_status
+        self.align_status = job_record.align_status
         self.upload_status = job_record.upload_status
         self.pipeline_status = job_record.pipeline_status
-        
+        self._step_started = {}
+        self._attempts = None
+        self._artifacts = []
+        self._disk_claim = None
+
         logger.info(f"Initialized job from DB: {self.accession}")
 
 
     def run_download(self):
+        self._begin_step(PipelineStep.DOWNLOAD)
+        exit_code = None
         file_exists = self.status_checker.check_status(self.accession) == "Already Exists"
 
         if file_exists:
             logger.info(f"{self.accession} already exists. Skipping download.")
             self._update_status(PipelineStep.DOWNLOAD, StepStatus.SKIPPED)
+        elif not self._reserve_disk_space():
+            self._update_status(PipelineStep.DOWNLOAD, StepStatus.FAILED)
+            return False
         else:
             logger.info(f"Downloading {self.accession}...")
 
             try:
-                result = subprocess.run(
+                result = run_tool(
+                    "prefetch",
                     ["prefetch", "--max-size", "200G", "-O", str(self.output_dir), self.accession],
-                    check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+                    check=True,
                 )
-                logger.debug(f"{self.accession} prefetch stdout: {result.stdout.strip()}")
-                logger.debug(f"{self.accession} prefetch stderr: {result.stderr.strip()}")
+                exit_code = result.returncode
+                fs_index.refresh(self.output_dir / self.accession)
 
             except subprocess.CalledProcessError as e:
-                logger.error(f"Download failed for {self.accession}: {e.stderr.strip()}")
-                self._update_status(PipelineStep.DOWNLOAD, StepStatus.FAILED)
+                log_subprocess_output(logger, f"Download failed for {self.accession}", e.stderr,
+                                      level=logging.ERROR)
+                self._update_status(PipelineStep.DOWNLOAD, StepStatus.FAILED, exit_code=e.returncode)
                 return False
 
         # Confirm the download (even if it was skipped)
         confirmation = self.status_checker.confirm_download(self.accession)
         if confirmation == "Download OK!":
-            self._update_status(PipelineStep.DOWNLOAD, StepStatus.SUCCESS)
+            self._update_status(PipelineStep.DOWNLOAD, StepStatus.SUCCESS,
+                                bytes_out=_total_size(self._sra_files()), exit_code=exit_code,
+                                outputs=self._sra_files())
             return True
         else:
             logger.warning(f"Sanity check failed: no downloaded file found for {self.accession}")
-            self._update_status(PipelineStep.DOWNLOAD, StepStatus.FAILED)
+            self._update_status(PipelineStep.DOWNLOAD, StepStatus.FAILED, exit_code=exit_code)
             return False
 
 
     def run_validation(self):
+        self._begin_step(PipelineStep.VALIDATE)
         result = self.validator.validate(self.accession)
+        bytes_in = _total_size(self._sra_files())
 
         if result.strip() == "Valid":
             logger.info(f"Marking {self.accession} as SUCCESS")
-            self._update_status(PipelineStep.VALIDATE, StepStatus.SUCCESS)
+            # recorded again under validate: what it vouched for is what convert will read
+            self._update_status(PipelineStep.VALIDATE, StepStatus.SUCCESS, bytes_in=bytes_in,
+                                outputs=self._sra_files())
         else:
             logger.warning(f"Marking {self.accession} as FAILED")
-            self._update_status(PipelineStep.VALIDATE, StepStatus.FAILED)
+            self._update_status(PipelineStep.VALIDATE, StepStatus.FAILED, bytes_in=bytes_in)
 
         return result
 
 
     def run_conversion(self) -> list[Path]:
         if self.fastq_converter:
+            self._begin_step(PipelineStep.CONVERT)
+            bytes_in = _total_size(self._sra_files())
             success = self.fastq_converter.convert(self.accession)
 
             if success:
-                self._update_status(PipelineStep.CONVERT, StepStatus.SUCCESS)
-                r1, r2 = self.fastq_converter.get_fastq_paths(self.accession)
-                output_files = [r1, r2] if r1.exists() and r2.exists() else []
+                # paired runs give _1/_2 files, single-end runs one file
+                output_files = self.fastq_converter.find_fastq_files(self.accession)
+                self._update_status(PipelineStep.CONVERT, StepStatus.SUCCESS,
+                                    bytes_in=bytes_in, bytes_out=_total_size(output_files), outputs=output_files)
                 return output_files
 
             else:
-                self._update_status(PipelineStep.CONVERT, StepStatus.FAILED)
+                self._update_status(PipelineStep.CONVERT, StepStatus.FAILED, bytes_in=bytes_in)
                 
         return []
     
@@ -121,37 +177,173 @@ class Job:
         if not self.fastq_converter or not self.star_runner:
             raise RuntimeError("FASTQ files must be converted and STAR runner toggled for alignment")
 
+        self._begin_step(PipelineStep.ALIGN)
+        fastq_paths = self.fastq_converter.find_fastq_files(self.accession)
+        bytes_in = _total_size(fastq_paths)
+
         try:
-            fastq_paths = self.fastq_converter.get_fastq_paths(self.accession)
-            star_results = self.star_runner.align(self.accession, fastq_paths)
-            self._update_status(PipelineStep.ALIGN, StepStatus.SUCCESS)
+            star_results = self.star_runner.align(self.accession, fastq_paths, metadata=self.run_metadata)
+            self._update_status(PipelineStep.ALIGN, StepStatus.SUCCESS, bytes_in=bytes_in,
+                                bytes_out=_total_size(star_results), outputs=expand_files(star_results))
+            self._record_star_metrics()
             return star_results
 
         except Exception as e:
             logger.error(f"STAR alignment failed for {self.accession}: {e}")
-            self._update_status(PipelineStep.ALIGN, StepStatus.FAILED)
+            self._update_status(PipelineStep.ALIGN, StepStatus.FAILED, bytes_in=bytes_in)
             return []
 
 
+    def _record_star_metrics(self):
+        # metrics are reporting-only; never fail an alignment over them
+        try:
+            metrics = self.star_runner.read_metrics(self.accession)
+            if metrics:
+                self.manifest_manager.record_star_metrics(self.accession, metrics)
+        except Exception as e:
+            logger.warning(f"Could not record STAR metrics for {self.accession}: {e}")
+
+
     def run_upload(self, local_file: Path):
         if self.s3_handler:
+            self._begin_step(PipelineStep.UPLOAD)
+            size = _total_size([local_file])
             try:
                 self.s3_handler.upload_file(local_file)
-                self._update_status(PipelineStep.UPLOAD, StepStatus.SUCCESS)
+                self._update_status(PipelineStep.UPLOAD, StepStatus.SUCCESS, bytes_in=size, bytes_out=size)
             except Exception as e:
                 logger.warning(f"S3 upload failed for {self.accession}: {e}")
-                self._update_status(PipelineStep.UPLOAD, StepStatus.FAILED)
+                self._update_status(PipelineStep.UPLOAD, StepStatus.FAILED, bytes_in=size)
+
+
+    def run_packed_upload(self, files: list[Path], root: Path, max_member_size: int) -> bool:
+        """Upload small outputs as one streamed tar archive and large ones directly."""
+        if not self.s3_handler:
+            return False
+
+        self._begin_step(PipelineStep.UPLOAD)
+        size = _total_size(files)
+        try:
+            pack_and_upload(self.s3_handler, self.accession, files, root, max_member_size)
+            self._update_status(PipelineStep.UPLOAD, StepStatus.SUCCESS, bytes_in=size)
+            return True
+        except Exception as e:
+            logger.warning(f"Packed S3 upload failed for {self.accession}: {e}")
+            self._update_status(PipelineStep.UPLOAD, StepStatus.FAILED, bytes_in=size)
+            return False
+
+
+    def _reserve_disk_space(self) -> bool:
+        """
+        Claim the space the run metadata says the download (with its FASTQs,
+        if converting) will take, or refuse a download that will not fit
+        alongside the other jobs' claims.
+        """
+        needed = disk_needed(self.run_metadata, convert=self.fastq_converter is not None)
+        if needed is None:
+            return True
+        self._disk_claim = disk_space.reserve(self.output_dir, self.accession, needed)
+        if self._disk_claim is None:
+            logger.error(f"Not downloading {self.accession}: it would not fit")
+        return self._disk_claim is not None
+
+
+    def release_disk_space(self):
+        """Drop the job's disk claim: its files are on disk by now, or will not be written."""
+        disk_space.release(self._disk_claim)
+        self._disk_claim = None
+
+
+    def _sra_files(self) -> list[Path]:
+        sra_dir = self.output_dir / self.accession
+        return [sra_dir / f"{self.accession}{ext}" for ext in (".sra", ".sralite")]
+
+
+    def _begin_step(self, step: PipelineStep):
+        # a stopping worker starts no new step
+        shutdown.raise_if_interrupted()
+        self.write_artifacts(wait=False)
+        if self._attempts is None:
+            self._attempts = self.manifest_manager.attempt_counts(self.accession)
+        bind_log_context(step=step.value, attempt=self._attempts.get(step, 0) + 1)
+        start_usage_collection()
+        set_step_limits(self.step_timeouts.get(step.value), self.stall_timeout)
+        self._step_started[step] = (datetime.now(timezone.utc), time.perf_counter())
+        metrics.inc(metrics.STEPS_ACTIVE, step=step.value)
+        # left as-is only if this process dies mid-step; the next run's recovery pass looks for it
+        self.manifest_manager.update_step_status(self.accession, step.value, StepStatus.RUNNING)
+        # a buffered manifest writes the previous step's result and this start in one transaction
+        self.manifest_manager.flush()
 
 
-    def _update_status(self, step: PipelineStep, status: StepStatus):
+    def _step_event(self, step: PipelineStep, bytes_in: Optional[int],
+                    bytes_out: Optional[int], exit_code: Optional[int]) -> dict:
+        ended_at = datetime.now(timezone.utc)
+        if step in self._step_started:
+            started_at, started = self._step_started.pop(step)
+            metrics.inc(metrics.STEPS_ACTIVE, -1, step=step.value)
+        else:
+            started_at, started = ended_at, time.perf_counter()
+        return {
+            "step": step,
+            "started_at": started_at,
+            "ended_at": ended_at,
+            "duration_seconds": time.perf_counter() - started,
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "exit_code": exit_code,
+            "host": HOST,
+            "tools": take_tool_usage(),
+        }
+
+
+    def _update_status(self, step: PipelineStep, status: StepStatus, *, bytes_in: int = None,
+                       bytes_out: int = None, exit_code: int = None, outputs: list[Path] = None):
+        if status == StepStatus.FAILED and tool_killed():
+            # a hung or overlong tool rather than a bad input: worth retrying straight away
+            status = StepStatus.TIMED_OUT
+        if status == StepStatus.SUCCESS and outputs is not None:
+            # stat'ed now, before a later step can remove them; hashed in the background
+            self._artifacts.append(PendingArtifacts(step, outputs))
         # updates sql object
         setattr(self.status, f"{step.value}_status", status)
         # updates job
         setattr(self, f"{step.value}_status", status)
-        self.manifest_manager.update_step_status(self.accession, step.value, status)
+        if step == PipelineStep.CONVERT or (step == PipelineStep.DOWNLOAD and (
+                status != StepStatus.SUCCESS or self.fastq_converter is None)):
+            # the claim covered this step's output
+            self.release_disk_space()
+        event = self._step_event(step, bytes_in, bytes_out, exit_code)
+        self.manifest_manager.update_step_status(self.accession, step.value, status, event=event)
+        metrics.record_step(step.value, status.value, event)
         logger.debug(f"Updated status: {step.value} = {status.value} for {self.accession}")
 
 
+    def write_artifacts(self, wait: bool = True):
+        """Record finished steps' artifacts whose digests are ready (all of them, waiting, if wait)."""
+        pending = []
+        for artifacts in self._artifacts:
+            if wait or artifacts.done():
+                self.manifest_manager.record_artifacts(self.accession, artifacts.step.value, artifacts.result())
+            else:
+                pending.append(artifacts)
+        self._artifacts = pending
+
+
+    def interrupt_open_steps(self):
+        """Record steps that were stopped by a shutdown signal as Interrupted."""
+        for step in list(self._step_started):
+            logger.warning(f"{step.value} interrupted for {self.accession}")
+            self._update_status(step, StepStatus.INTERRUPTED)
+
+
+    def end_open_steps(self):
+        """Stop counting steps as active that were begun but never got a status (the job raised)."""
+        for step in self._step_started:
+            metrics.inc(metrics.STEPS_ACTIVE, -1, step=step.value)
+        self._step_started.clear()
+
+
     def to_log_row(self):
         return [
             self.accession,
@@ -1,15 +1,31 @@
+from collections import Counter
+from contextlib import contextmanager, ExitStack
 from multiprocessing import Pool as DefaultPool
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 from tqdm import tqdm
 from typing import Tuple, Callable, Iterable, Any
 from pathlib import Path
 import logging
+import pickle
+import time
 
+from .accession_lists import AccessionSpool, chunked
+from .artifacts import reconcile
+from .dashboard import Dashboard
+from .db.engine import get_session_maker, is_sqlite_file
+from . import fs_index
+from .enums import PipelineStep, StepStatus
 from .job_runner import JobRunner
+from .manifest_manager import ManifestManager, DONE_STATUSES
+from .manifest_writer import ManifestWriter
+from .metrics import MetricsCollector, JOBS_COMPLETED, QUEUE_DEPTH
+from . import metrics
+from .profiling import JobProfiler
+from .recovery import RecoveryPass
+from .run_metadata import RunMetadataStore
+from .shutdown import GracefulShutdown, init_worker
 from .fastq_converter import FASTQConverter
+from .planner import WorkPlan, estimate
 from .star_runner import STARRunner
-from .s3_handler import S3Handler
 from .utils import get_sra_lists
 
 
@@ -20,7 +36,22 @@ class SRAOrchestrator:
                 convert_fastq=False, align_star=False, s3_handler=False, s3_bucket=None,
                 s3_prefix="", threads=4, max_retries=5, batch_size=5, pool_cls=DefaultPool,
                 barcode_whitelist: Path = None, cb_start: int = None,
-                cb_len: int = None, umi_start: int = None, umi_len: int = None):
+                cb_len: int = None, umi_start: int = None, umi_len: int = None,
+                pack_outputs: bool = False, pack_max_member_mb: int = 64,
+                manifest_buffered: bool = False, manifest_flush_interval: float = 5.0,
+                manifest_flush_size: int = 50, single_writer: bool = None,
+                metrics_port: int = None, metrics_textfile: Path = None,
+                metrics_interval: float = 15.0, profiler: JobProfiler = None,
+                dashboard: bool = False, stages: Iterable[PipelineStep] = None,
+                ingest_chunk_size: int = 10000, step_timeouts: dict[str, float] = None,
+                stall_timeout: float = None):
+
+        # an explicit stage set (the `run` command) replaces the per-command flags
+        self.stages = frozenset(PipelineStep(stage) for stage in stages) if stages is not None else None
+        if self.stages is not None:
+            convert_fastq = PipelineStep.CONVERT in self.stages
+            align_star = PipelineStep.ALIGN in self.stages
+            s3_handler = PipelineStep.UPLOAD in self.stages
 
         self.output_dir = output_dir
         self.sra_lists_dir = sra_lists_dir
@@ -51,19 +82,72 @@ class SRAOrchestrator:
         self.umi_start = umi_start
         self.umi_len = umi_len
 
+        self.pack_outputs = pack_outputs
+        self.pack_max_member_mb = pack_max_member_mb
+
+        self.manifest_buffered = manifest_buffered
+        self.manifest_flush_interval = manifest_flush_interval
+        self.manifest_flush_size = manifest_flush_size
+        # None = auto: on for file-backed SQLite, where concurrent committers hit "database is locked"
+        self.single_writer = is_sqlite_file(database_url) if single_writer is None else single_writer
+        self.write_queue = None
+
+        self.metrics_port = metrics_port
+        self.metrics_textfile = metrics_textfile
+        self.metrics_interval = metrics_interval
+        self.metrics_queue = None
+        self._collector = None
+        self._run_stack = None
+
+        self.profiler = profiler
+        self.dashboard = dashboard
+        self.ingest_chunk_size = ingest_chunk_size
+        self.step_timeouts = step_timeouts or {}
+        self.stall_timeout = stall_timeout
+
+        # set once a shutdown signal ends a batch: nothing more is dispatched
+        self.stopped = False
+        self._recovered = False
+
         self.logger = logging.getLogger(__name__)
 
 
+    def __enter__(self):
+        """
+        Keep one metrics collector (registry, /metrics server, textfile) up
+        for every batch until exit, so counters do not reset and scrapes do
+        not fail between the list batch, retries and requeue rounds.
+        """
+        self._run_stack = ExitStack()
+        self._collector = self._run_stack.enter_context(self._metrics_collector())
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self._run_stack.close()
+        finally:
+            self._collector = None
+            self._run_stack = None
+
+
+    def __getstate__(self):
+        # tasks pickle the orchestrator; the run's collector stays in this process
+        state = self.__dict__.copy()
+        state["_collector"] = state["_run_stack"] = None
+        return state
+
+
     def _get_fastq_converter(self):
-        """Returns a FASTQConverter instance if conversion is enabled, else None."""
-        if not self.convert_fastq:
+        """Returns a FASTQConverter instance if conversion or alignment (which reads its FASTQs) is enabled, else None."""
+        if not self.convert_fastq and not self.align_star:
             return None
         return FASTQConverter(output_dir=self.fastq_file_dir, threads=self.threads)
 
     
     def _get_star_runner(self):
-        """Returns a STARRunner instance if alignment enabled, else None."""
-        if not self.align_star:
+        """Returns a STARRunner instance if alignment or upload (which sends its outputs) is enabled, else None."""
+        if not self.align_star and not self.s3_handler:
             return None
         return STARRunner(
             star_genome_dir=self.star_genome_dir,
@@ -83,56 +167,437 @@ class SRAOrchestrator:
             return None
         if not self.s3_bucket:
             raise ValueError("S3 usage enabled but no bucket name provided.")
+        from .s3_handler import S3Handler  # boto3 is slow to import; only upload runs need it
         return S3Handler(self.s3_bucket, self.s3_prefix)
 
 
-    def execute_job(self, args: Tuple[str, str]):
-        accession, source_file = args
+    def execute_job(self, args: Tuple[str, str, Tuple[PipelineStep, ...]]):
+        if self.profiler:
+            # covers handler/session setup here as well as JobRunner.run
+            return self.profiler.run(self._execute_job, args)
+        return self._execute_job(args)
+
 
-        engine = create_engine(self.database_url)
-        SessionLocal = sessionmaker(bind=engine)
+    def _execute_job(self, args: Tuple[str, str, Tuple[PipelineStep, ...]]):
+        accession, source_file, steps = args
 
         runner = JobRunner(
             output_dir=self.output_dir,
-            session_maker=SessionLocal,
+            session_maker=get_session_maker(self.database_url),
             validator=self.validator,
             status_checker=self.status_checker,
             s3_handler=self._get_s3_handler(),
             fastq_converter=self._get_fastq_converter(),
             star_runner=self._get_star_runner(),
-            logger=self.logger
+            logger=self.logger,
+            pack_outputs=self.pack_outputs,
+            pack_max_member_size=self.pack_max_member_mb * 1024 * 1024,
+            manifest_buffered=self.manifest_buffered,
+            manifest_flush_interval=self.manifest_flush_interval,
+            manifest_flush_size=self.manifest_flush_size,
+            write_queue=self.write_queue,
+            metrics_queue=self.metrics_queue,
+            step_timeouts=self.step_timeouts,
+            stall_timeout=self.stall_timeout,
         )
-        return runner.run(accession, source_file)
+        return runner.run(accession, source_file, steps)
     
 
+    def enabled_steps(self) -> list[PipelineStep]:
+        """Steps this orchestrator's configuration will actually run."""
+        if self.stages is not None:
+            return [step for step in PipelineStep if step in self.stages]
+        steps = [PipelineStep.DOWNLOAD, PipelineStep.VALIDATE]
+        if self.convert_fastq:
+            steps.append(PipelineStep.CONVERT)
+        if self.align_star:
+            steps.append(PipelineStep.ALIGN)
+        if self.s3_handler:
+            steps.append(PipelineStep.UPLOAD)
+        return steps
+
+
+    def _steps_to_run(self, statuses: dict[str, StepStatus]) -> Tuple[PipelineStep, ...]:
+        """Enabled steps that are not done yet, from one job's manifest statuses."""
+        return tuple(step for step in self.enabled_steps() if statuses[step.value] not in DONE_STATUSES)
+
+
+    def check_artifacts(self, manifest: ManifestManager, statuses: dict[str, dict[str, StepStatus]],
+                        write: bool = True) -> int:
+        """
+        Bring manifest statuses in line with the artifacts recorded for each
+        job (see artifacts.reconcile): steps whose outputs are gone are reset,
+        and steps whose outputs survived a status reset are marked done.
+        Updates `statuses` in place, and the manifest too if write. Returns
+        the number of jobs changed.
+        """
+        changed = 0
+        for accession, artifacts in manifest.get_artifacts(list(statuses)).items():
+            changes = reconcile(accession, statuses[accession], artifacts)
+            for step_name, status in changes.items():
+                statuses[accession][step_name] = status
+                if write:
+                    manifest.update_step_status(accession, step_name, status)
+            changed += bool(changes)
+        if changed:
+            self.logger.info(f"Recorded artifacts changed the steps to run for {changed} accessions")
+        return changed
+
+
+    def plan_accessions(self, accessions: list[str], source_file) -> dict[str, Tuple[PipelineStep, ...]]:
+        """
+        Upsert all accessions into the manifest in one round trip and return
+        {accession: steps to run} for those with an enabled step not yet done.
+        Jobs are handed these steps, so completed stages are skipped here
+        rather than rediscovered by each job.
+        """
+        session = get_session_maker(self.database_url)()
+        try:
+            manifest = ManifestManager(session)
+            statuses = manifest.bulk_get_or_create_jobs((acc, source_file) for acc in accessions)
+            self.check_artifacts(manifest, statuses)
+        finally:
+            session.close()
+
+        planned = {}
+        for acc in dict.fromkeys(accessions):
+            steps = self._steps_to_run(statuses[acc])
+            if steps:
+                planned[acc] = steps
+
+        skipped = len(statuses) - len(planned)
+        if skipped:
+            self.logger.info(f"Skipping {skipped} accessions with all enabled steps complete")
+        return planned
+
+
+    def build_plan(self) -> WorkPlan:
+        """
+        Work out every pending step from the list files, manifest statuses and
+        the filesystem, with cost estimates from past runs. Read-only: nothing
+        is launched, and neither the manifest nor its schema is written.
+        """
+        sources = {}
+        for sra_file in get_sra_lists(self.sra_lists_dir):
+            for acc in self.log_manager.load_accessions_from_file(sra_file):
+                sources.setdefault(acc, sra_file)
+
+        # one listing of the data trees answers the artifact checks and the downloads already done
+        with fs_index.indexing(self._index_roots()):
+            session = get_session_maker(self.database_url)()
+            try:
+                manifest = ManifestManager(session)
+                statuses = manifest.get_statuses(list(sources))
+                self.check_artifacts(manifest, statuses, write=False)
+                history = manifest.step_cost_history()
+                metadata = RunMetadataStore(session).get_many(list(sources))
+            finally:
+                session.close()
+
+            # accessions without a job row yet have every step pending
+            pending = {step.value: StepStatus.PENDING for step in PipelineStep}
+            jobs = []
+            for acc, sra_file in sources.items():
+                steps = self._steps_to_run(statuses.get(acc, pending))
+                if steps:
+                    jobs.append((acc, sra_file, steps))
+
+            # downloads the job would skip because the file is already there
+            on_disk = {
+                acc for acc, _, steps in jobs
+                if PipelineStep.DOWNLOAD in steps and self.status_checker.check_status(acc) == "Already Exists"
+            }
+
+        self.logger.info(f"Planned {len(jobs)} of {len(sources)} accessions")
+        return WorkPlan(stages=self.enabled_steps(), jobs=jobs, summary=estimate(jobs, history, on_disk, metadata))
+
+
+    def execute_plan(self, plan: WorkPlan):
+        """Run a plan's jobs, leaving out steps that were completed after it was made."""
+        missing = set(plan.stages) - set(self.enabled_steps())
+        if missing:
+            raise ValueError(f"Plan needs stages that are not enabled: {sorted(step.value for step in missing)}")
+        self.recover()
+
+        session = get_session_maker(self.database_url)()
+        try:
+            manifest = ManifestManager(session)
+            statuses = manifest.bulk_get_or_create_jobs((acc, sra_file) for acc, sra_file, _ in plan.jobs)
+            with fs_index.indexing(self._index_roots()):
+                self.check_artifacts(manifest, statuses)
+        finally:
+            session.close()
+
+        jobs = []
+        for acc, sra_file, _ in plan.jobs:
+            # by the plan's stages, not its steps: a step reset since (its outputs went missing) runs too
+            remaining = tuple(step for step in plan.stages if statuses[acc][step.value] not in DONE_STATUSES)
+            if remaining:
+                jobs.append((acc, sra_file, remaining))
+
+        self.logger.info(f"Executing plan from {plan.created_at}: {len(jobs)} of {len(plan.jobs)} jobs still pending")
+        if jobs:
+            self._run_and_log(iter(jobs), total=len(jobs))
+
+
     def prepare_for_run(self):
         self.csv_log_path = self.log_manager.generate_csv_log()
 
 
-    def process_batch(self, func: Callable[[Any], Any], args: Iterable[Any]) -> list[Any]:
-        with self.pool_cls(self.batch_size) as pool:
-            return list(tqdm(pool.imap(func, args), total=len(args)))
+    @contextmanager
+    def _manifest_writer(self):
+        """Run a single manifest writer for the duration of a batch when enabled."""
+        if not self.single_writer:
+            yield
+            return
 
+        writer = ManifestWriter(
+            self.database_url,
+            flush_interval=self.manifest_flush_interval,
+            flush_size=self.manifest_flush_size,
+        )
+        with writer:
+            self.write_queue = writer.queue
+            try:
+                yield
+            finally:
+                self.write_queue = None
 
-    def process_sra_lists(self):
-        for sra_file in get_sra_lists(self.sra_lists_dir):
-            accessions = self.log_manager.load_accessions_from_file(sra_file)
-            self.logger.info(f"Processing {len(accessions)} accessions from {sra_file}")
 
-            args = [(acc, sra_file) for acc in accessions]
-            results = self.process_batch(self.execute_job, args)
+    @contextmanager
+    def _metrics_collector(self):
+        """Aggregate worker metrics in this process while open (a whole run, or one batch) when enabled."""
+        if self.metrics_port is None and self.metrics_textfile is None and not self.dashboard:
+            yield None
+            return
+
+        collector = MetricsCollector(
+            port=self.metrics_port,
+            textfile=self.metrics_textfile,
+            interval=self.metrics_interval,
+        )
+        if self.write_queue is not None:
+            collector.watch_queue("manifest_writes", self.write_queue)
+        with collector:
+            self.metrics_queue = collector.queue
+            try:
+                yield collector
+            finally:
+                self.metrics_queue = None
+
+
+    @contextmanager
+    def _batch_metrics(self):
+        """The run's collector when one is up (see __enter__), else one for this batch alone."""
+        if self._collector is None:
+            with self._metrics_collector() as collector:
+                yield collector
+            return
+        if self.write_queue is not None:
+            self._collector.watch_queue("manifest_writes", self.write_queue)
+        yield self._collector
+
+
+    @contextmanager
+    def _dashboard(self, collector: MetricsCollector, total: int):
+        """Draw the live dashboard from the batch's metrics when enabled."""
+        if not self.dashboard or collector is None:
+            yield
+            return
 
-            self.log_manager.write_csv_log(results, self.csv_log_path)
+        session = get_session_maker(self.database_url)()
+        try:
+            history = ManifestManager(session).mean_step_durations()
+        finally:
+            session.close()
+
+        steps = [step.value for step in self.enabled_steps()]
+        with Dashboard(collector.registry, steps=steps, total=total, workers=self.batch_size, history=history):
+            yield
+
+
+    def _index_roots(self) -> list[Path]:
+        """Data trees that jobs check for existing files."""
+        roots = [self.output_dir]
+        if self.convert_fastq:
+            roots.append(self.fastq_file_dir)
+        if self.align_star:
+            roots.append(self.star_output_dir)
+        return roots
+
+
+    def process_batch(self, func: Callable[[Any], Any], args: Iterable[Any],
+                      on_result: Callable[[Any], None] = None, total: int = None) -> list[Any]:
+        """
+        Run func over args in the pool. With on_result, each result is handed
+        over as soon as its job finishes and nothing is accumulated.
+        """
+        results = []
+        total = total if total is not None else len(args)
+        if self.profiler:
+            self._log_task_pickle_cost(func)
+
+        # workers are forked after the index is built and inherit it
+        with GracefulShutdown() as shutdown, fs_index.indexing(self._index_roots()), self._manifest_writer(), \
+                self._batch_metrics() as collector, self._dashboard(collector, total), \
+                self.pool_cls(self.batch_size, initializer=init_worker) as pool:
+            metrics.set_gauge(QUEUE_DEPTH, total, queue="jobs")
+            # one task per worker: the rest stay here, where the first Ctrl-C can still hold them back
+            tasks = shutdown.until_stopped(args, in_flight=self.batch_size)
+            progress = tqdm(pool.imap_unordered(func, tasks), total=total, disable=self.dashboard)
+            done = 0
+            try:
+                for done, result in enumerate(progress, 1):
+                    shutdown.task_done()
+                    metrics.inc(JOBS_COMPLETED)
+                    metrics.set_gauge(QUEUE_DEPTH, total - done, queue="jobs")
+                    if on_result:
+                        on_result(result)
+                    else:
+                        results.append(result)
+            finally:
+                shutdown.stop_feeding()
+            # let workers exit normally so their queued log records are flushed;
+            # the context manager's terminate() would kill them mid-write
+            pool.close()
+            pool.join()
+
+        if shutdown.stopping:
+            self.stopped = True
+            self.logger.warning(f"Shut down by signal after {done} of {total} jobs")
+        if self.profiler:
+            self.profiler.merge()
+        return results
+
+
+    def _log_task_pickle_cost(self, func):
+        """Bound-method tasks pickle the whole orchestrator once per job; report what that costs."""
+        start = time.perf_counter()
+        try:
+            size = len(pickle.dumps(func))
+        except (pickle.PicklingError, AttributeError, TypeError):
+            return
+        elapsed = time.perf_counter() - start
+        self.logger.info(f"Each task pickles {size} bytes ({elapsed * 1000:.2f} ms in the parent)")
+
+
+    def recover(self):
+        """Reset jobs an earlier run left mid-step so they resume from their last verified step (once per run)."""
+        if self._recovered:
+            return
+        self._recovered = True
+
+        recovery = RecoveryPass(output_dir=self.output_dir, fastq_dir=self.fastq_file_dir,
+                                star_output_dir=self.star_output_dir)
+        session = get_session_maker(self.database_url)()
+        try:
+            recovery.run(ManifestManager(session))
+        finally:
+            session.close()
+
+
+    def process_sra_lists(self):
+        """
+        Plan every list first, then run all pending accessions as one batch
+        (one pool, one ETA). Lists are streamed in chunks through an on-disk
+        spool, so memory stays flat however long they are, and an accession
+        repeated in a later list is only run once, under the first list.
+        """
+        self.recover()
+        with AccessionSpool() as spool:
+            # one listing of the data trees answers every chunk's artifact checks
+            with fs_index.indexing(self._index_roots()):
+                for sra_file in get_sra_lists(self.sra_lists_dir):
+                    listed = repeated = pending = 0
+                    accessions = self.log_manager.load_accessions_from_file(sra_file)
+                    for chunk in chunked(accessions, self.ingest_chunk_size):
+                        new = spool.add_new(chunk)
+                        planned = self.plan_accessions(new, sra_file) if new else {}
+                        spool.queue((acc, sra_file, steps) for acc, steps in planned.items())
+                        listed += len(chunk)
+                        repeated += len(chunk) - len(new)
+                        pending += len(planned)
+                    self.logger.info(f"Processing {pending} of {listed} accessions from {sra_file}"
+                                     + (f" ({repeated} repeated from earlier lists or within it)" if repeated else ""))
+
+            if spool.jobs:
+                self._run_and_log(spool.iter_jobs(), total=spool.jobs)
 
 
     def retry_failed(self):
-        failed = self.log_manager.get_failed_accessions(self.csv_log_path)
+        """Retry failed jobs selected from the manifest; each resumes at its first failed step."""
+        if self.stopped:
+            return
+        self.recover()
+        session = get_session_maker(self.database_url)()
+        try:
+            manifest = ManifestManager(session)
+            failed = manifest.get_retry_jobs(
+                [step.value for step in self.enabled_steps()], max_attempts=self.max_retries
+            )
+            statuses = manifest.get_statuses([acc for acc, _, _ in failed])
+            with fs_index.indexing(self._index_roots()):
+                self.check_artifacts(manifest, statuses)
+        finally:
+            session.close()
+
+        jobs = []
+        by_step = Counter()
+        for acc, source_file, first_failed in failed:
+            # the artifact check may have found the remaining steps done
+            steps = self._steps_to_run(statuses[acc])
+            if steps:
+                jobs.append((acc, source_file, steps))
+                by_step[first_failed] += 1
 
-        if not failed:
+        if not jobs:
             self.logger.info("No failed accessions to retry.")
             return
 
-        self.logger.info(f"Retrying {len(failed)} failed accessions...")
-        args = [(acc, "Retry") for acc in failed]
-        results = self.process_batch(self.execute_job, args)
-        self.log_manager.write_csv_log(results, self.csv_log_path)
\ No newline at end of file
+        self.logger.info(f"Retrying {len(jobs)} failed accessions (first failed step: {dict(by_step)})...")
+        self._run_and_log(iter(jobs), total=len(jobs))
+
+
+    def _run_and_log(self, args: Iterable[Tuple[str, Any]], total: int):
+        """Dispatch jobs and append each result row to the CSV log as it completes."""
+        if self.stopped:
+            self.logger.warning("Shutting down; not starting another batch")
+            return
+        if self.csv_log_path is None:
+            self.prepare_for_run()
+        with self.log_manager.open_csv_log(self.csv_log_path) as csv_log:
+            # only jobs this batch ran are requeued, not every timed-out job in the manifest
+            timed_out = set()
+
+            def log_row(row):
+                if StepStatus.TIMED_OUT.value in row[1:6]:  # step statuses
+                    timed_out.add(row[0])
+                csv_log.write_row(row)
+
+            self.process_batch(self.execute_job, args, on_result=log_row, total=total)
+            # every round adds an attempt, so max_retries bounds this
+            for _ in range(self.max_retries):
+                requeued = [] if self.stopped or not timed_out else self._timed_out_jobs(timed_out)
+                timed_out.clear()
+                if not requeued:
+                    break
+                self.logger.warning(f"Requeueing {len(requeued)} jobs whose tools the watchdog killed")
+                self.process_batch(self.execute_job, iter(requeued), on_result=log_row, total=len(requeued))
+
+
+    def _timed_out_jobs(self, accessions: Iterable[str]) -> list[Tuple[str, str, Tuple[PipelineStep, ...]]]:
+        """
+        Those of accessions whose first failed step timed out or stalled, with
+        attempts left, and their remaining steps.
+        """
+        session = get_session_maker(self.database_url)()
+        try:
+            manifest = ManifestManager(session)
+            timed_out = manifest.get_retry_jobs([step.value for step in self.enabled_steps()],
+                                                max_attempts=self.max_retries,
+                                                failed_statuses=[StepStatus.TIMED_OUT],
+                                                accessions=accessions)
+            statuses = manifest.get_statuses([acc for acc, _, _ in timed_out])
+        finally:
+            session.close()
+        return [(acc, source_file, self._steps_to_run(statuses[acc])) for acc, source_file, _ in timed_out]
\ No newline at end of file
@@ -1,13 +1,25 @@
 from pathlib import Path
+from typing import Iterable
 
-from .manifest_manager import ManifestManager
+from .manifest_manager import ManifestManager, QueuedManifestManager
 from .job import Job
-from .enums import StepStatus
+from .run_metadata import RunMetadataStore
+from .shutdown import JobInterrupted, job_running
+from .enums import PipelineStep, StepStatus
+from .tar_packer import expand_files
+from . import fs_index
+from .log_setup import log_context
+from .metrics import QueueSink
+from . import metrics
 
 
 class JobRunner:
     def __init__(self, *, output_dir: Path, session_maker, validator,
-                status_checker, s3_handler, fastq_converter, star_runner, logger):     
+                status_checker, s3_handler, fastq_converter, star_runner, logger,
+                pack_outputs: bool = False, pack_max_member_size: int = 64 * 1024 * 1024,
+                manifest_buffered: bool = False, manifest_flush_interval: float = 5.0,
+                manifest_flush_size: int = 50, write_queue=None, metrics_queue=None,
+                step_timeouts: dict[str, float] = None, stall_timeout: float = None):
         self.output_dir = output_dir
         self.session_maker = session_maker
         self.validator = validator
@@ -16,18 +28,40 @@ class JobRunner:
         self.fastq_converter = fastq_converter
         self.star_runner = star_runner
         self.logger = logger
-
-
-    def run(self, accession: str, source_file: str) -> list[str]:
+        self.pack_outputs = pack_outputs
+        self.pack_max_member_size = pack_max_member_size
+        self.manifest_buffered = manifest_buffered
+        self.manifest_flush_interval = manifest_flush_interval
+        self.manifest_flush_size = manifest_flush_size
+        self.write_queue = write_queue
+        self.metrics_queue = metrics_queue
+        self.step_timeouts = step_timeouts
+        self.stall_timeout = stall_timeout
+
+
+    def run(self, accession: str, source_file: str, steps: Iterable[PipelineStep] = None) -> list[str]:
+        """
+        Run the job's steps. `steps` is the plan made by the orchestrator;
+        without one, every step that is not done and has a handler runs.
+        """
+        if self.metrics_queue is not None:
+            metrics.bind(QueueSink(self.metrics_queue))
+        # every record logged while this job runs carries its accession
+        with job_running(), log_context(accession=accession):
+            return self._run(accession, source_file, steps)
+
+
+    def _run(self, accession: str, source_file: str, steps: Iterable[PipelineStep]) -> list[str]:
         fastq_files = []
         star_files = []
     
         # create local orm session per job executed
         # so no anoying detachedinstance error
         session = self.session_maker()
+        manifest = self._create_manifest(session)
+        job = None
 
         try:
-            manifest = ManifestManager(session)
             job = Job(
                 accession=accession,
                 source_file=source_file,
@@ -37,36 +71,53 @@ class JobRunner:
                 manifest_manager=manifest,
                 fastq_converter=self.fastq_converter,
                 star_runner=self.star_runner,
-                s3_handler=self.s3_handler
+                s3_handler=self.s3_handler,
+                run_metadata=RunMetadataStore(session).get(accession),
+                step_timeouts=self.step_timeouts,
+                stall_timeout=self.stall_timeout,
             )
 
-            if self.should_download(job):
+            steps = set(self._pending_steps(job) if steps is None else steps)
+
+            if PipelineStep.DOWNLOAD in steps:
                 download_ok = job.run_download()
             else:
                 download_ok = True
-            job.run_validation()
+            if PipelineStep.VALIDATE in steps:
+                job.run_validation()
 
             # if download successful + convert fastq flag = true
             # success -> clean sra
             if download_ok and self.fastq_converter:
-                if self.should_convert(job):
+                if PipelineStep.CONVERT in steps:
                     fastq_files = job.run_conversion()
                     if fastq_files:
                         self._cleanup_sra_file(accession)
                 else:
-                    fastq_files = job.fastq_converter.get_fastq_paths(accession)
+                    # converted in an earlier run (or conversion not enabled): use what is on disk
+                    fastq_files = self.fastq_converter.find_fastq_files(accession)
 
-            
             # if fastq files exist and star runner = true
             # success ->  clean fastq
-            if self.star_runner and fastq_files:
-                if self.should_align(job):
-                    star_files = job.run_alignment()
-                    if star_files:
-                        self._cleanup_fastq_files(fastq_files)
+            if self.star_runner and fastq_files and PipelineStep.ALIGN in steps:
+                star_files = job.run_alignment()
+                if star_files:
+                    self._cleanup_fastq_files(fastq_files)
+            elif (self.star_runner and PipelineStep.UPLOAD in steps and PipelineStep.ALIGN not in steps
+                  and job.align_status == StepStatus.SUCCESS):
+                # aligned in an earlier run: upload what it left (never what a failed or killed STAR left)
+                star_files = self.star_runner.output_files(accession)
             
             # if s3 handler flagged and star files mapped
-            if self.s3_handler and star_files:
+            # packed mode: small outputs go up as one tar stream, BAMs directly
+            if self.s3_handler and star_files and self.pack_outputs:
+                if PipelineStep.UPLOAD in steps:
+                    packed_root = self.star_runner.star_output_dir
+                    if job.run_packed_upload(star_files, packed_root, self.pack_max_member_size):
+                        self._cleanup_star_files(expand_files(star_files))
+                        self._remove_empty_dirs(star_files)
+
+            elif self.s3_handler and star_files and PipelineStep.UPLOAD in steps:
                 for file in star_files:
                     if self.should_upload(job):
                         job.run_upload(file)
@@ -76,24 +127,43 @@ class JobRunner:
             # Extract plain log row BEFORE closing the session
             return job.to_log_row()
 
+        except JobInterrupted:
+            if job is None:
+                raise
+            job.interrupt_open_steps()
+            return job.to_log_row()
+
         finally:
-            session.close()
+            if job is not None:
+                job.end_open_steps()
+                job.release_disk_space()
+                job.write_artifacts()
+            # buffered status updates must land even when the job raised
+            try:
+                manifest.close()
+                self.logger.debug(f"Manifest stats for {accession}: {manifest.stats}")
+            finally:
+                session.close()
+
+
+    def _create_manifest(self, session):
+        # single-writer mode: this worker only reads, writes go to the parent's queue
+        if self.write_queue is not None:
+            return QueuedManifestManager(session, self.write_queue)
+        return ManifestManager(
+            session,
+            buffered=self.manifest_buffered,
+            flush_interval=self.manifest_flush_interval,
+            flush_size=self.manifest_flush_size,
+        )
 
 
     def _should_skip(self, status) -> bool:
         return status.value in {StepStatus.SUCCESS, StepStatus.SKIPPED}
     
 
-    def should_download(self, job) -> bool:
-        return not self._should_skip(job.download_status)
-
-
-    def should_convert(self, job) -> bool:
-        return not self._should_skip(job.convert_status)
-
-
-    def should_align(self, job) -> bool:
-        return not self._should_skip(job.align_status)
+    def _pending_steps(self, job) -> list[PipelineStep]:
+        return [step for step in PipelineStep if not self._should_skip(getattr(job, f"{step.value}_status"))]
 
 
     def should_upload(self, job) -> bool:
@@ -116,10 +186,24 @@ class JobRunner:
             self._safe_unlink(file)
 
 
+    def _remove_empty_dirs(self, paths: list[Path]):
+        """Remove output directories left empty after their files were uploaded."""
+        for path in paths:
+            if not path.is_dir():
+                continue
+            for sub in sorted((p for p in path.rglob("*") if p.is_dir()), reverse=True):
+                if not any(sub.iterdir()):
+                    sub.rmdir()
+            if not any(path.iterdir()):
+                path.rmdir()
+                self.logger.info(f"Removed empty output folder: {path}")
+
+
     def _safe_unlink(self, file: Path):
         try:
-            if file.exists():
+            if fs_index.exists(file):
                 file.unlink()
+                fs_index.discard(file)
                 self.logger.info(f"Deleted local file: {file}")
             else:
                 self.logger.debug(f"File not found during cleanup: {file}")
@@ -135,12 +219,13 @@ class JobRunner:
         if self.fastq_converter:
             dirs.append(self.fastq_converter.output_dir / accession)
         if self.star_runner:
-            dirs.append(self.star_runner.star_output / accession)
+            dirs.append(self.star_runner.star_output_dir / accession)
 
         for dir_path in dirs:
             try:
-                if dir_path.exists() and not any(dir_path.iterdir()):
+                if fs_index.listdir(dir_path) == []:
                     dir_path.rmdir()
+                    fs_index.discard(dir_path)
                     self.logger.info(f"Removed empty accession folder: {dir_path}")
                 else:
                     self.logger.debug(f"Skipped non-empty or missing dir: {dir_path}")
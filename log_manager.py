@@ -1,9 +1,13 @@
 from pathlib import Path
 import csv
 import logging
+import os
 
 from datetime import datetime
-from .db.models import StepStatus
+from typing import Iterator
+
+from .accession_lists import read_accessions
+from .enums import StepStatus
 
 from .constants import CSV_HEADER
 
@@ -35,6 +39,12 @@ class LogManager:
         log_path = self.python_log_dir / f"pipeline_{timestamp}.log"
         log_path.parent.mkdir(parents=True, exist_ok=True)
         return log_path
+
+
+    def generate_profile_dir(self) -> Path:
+        """Directory for one run's worker profiles, next to the python logs."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return self.python_log_dir / f"profile_{timestamp}"
     
 
     def get_latest_csv_log(self) -> Path:
@@ -45,15 +55,27 @@ class LogManager:
         return max(csv_files, key=lambda f: f.stat().st_mtime)
 
 
+    def open_csv_log(self, log_path: Path) -> "CSVLogWriter":
+        return CSVLogWriter(log_path)
+
+
     def write_csv_log(self, results: list[list[str]], log_path: Path) -> None:
         with log_path.open("a", newline="") as f:
             writer = csv.writer(f)
             writer.writerows(results)
     
 
-    def load_accessions_from_file(self, file_path: Path) -> list[str]:
-        with file_path.open("r") as f:
-            return [line.strip() for line in f if line.strip()]
+    def export_csv(self, rows) -> Path:
+        """Write a new timestamped CSV log containing the given rows."""
+        log_path = self.generate_csv_log()
+        self.write_csv_log(rows, log_path)
+        logger.info(f"Exported manifest snapshot to {log_path}")
+        return log_path
+
+
+    def load_accessions_from_file(self, file_path: Path) -> Iterator[str]:
+        """Stream valid run accessions from a plain, SraRunInfo CSV or compressed list."""
+        return read_accessions(file_path)
     
 
     def get_failed_accessions(self, log_path: Path) -> list[str]:
@@ -67,6 +89,42 @@ class LogManager:
             next(reader)
             for row in reader:
                 statuses = row[1:6]  # All step statuses
-                if any(status == StepStatus.FAILED.value for status in statuses):
+                if any(status in (StepStatus.FAILED.value, StepStatus.TIMED_OUT.value) for status in statuses):
                     failed.append(row[0])
-        return failed
\ No newline at end of file
+        return failed
+
+
+class CSVLogWriter:
+    """
+    Appends result rows to a CSV log as they arrive, flushing and fsyncing
+    each one so a crash loses at most the row being written.
+    """
+    def __init__(self, log_path: Path, fsync: bool = True):
+        self.log_path = log_path
+        self.fsync = fsync
+        self.rows_written = 0
+        self._file = None
+
+
+    def __enter__(self):
+        self._file = self.log_path.open("a", newline="")
+        self._writer = csv.writer(self._file)
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+    def write_row(self, row: list[str]) -> None:
+        self._writer.writerow(row)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.rows_written += 1
+
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
@@ -1,23 +1,178 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import multiprocessing
+import re
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 
-def setup_logging(log_path):
-    
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+# per-job fields attached to every record (worker is always set)
+CONTEXT_FIELDS = ("accession", "step", "attempt", "worker")
+
+# subprocess output sampling: distinct lines kept from the start and end
+SAMPLE_HEAD = 5
+SAMPLE_TAIL = 5
+
+_listener = None
+_log_context = ContextVar("log_context", default={})
+_DIGITS = re.compile(r"\d+")
+
+
+class ContextFilter(logging.Filter):
+    """Copy the current job context and worker name onto each record before it is queued."""
+    def filter(self, record):
+        context = _log_context.get()
+        for field in CONTEXT_FIELDS[:-1]:
+            setattr(record, field, context.get(field))
+        record.worker = multiprocessing.current_process().name
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; context fields are omitted when unset."""
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+@contextmanager
+def log_context(**fields):
+    """Attach fields (accession, step, attempt) to every record logged inside the block."""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def bind_log_context(**fields):
+    """Update the current context in place, e.g. when a job moves on to its next step."""
+    _log_context.set({**_log_context.get(), **fields})
+
+
+def log_subprocess_output(logger, label, output, *, level=logging.DEBUG,
+                          head=SAMPLE_HEAD, tail=SAMPLE_TAIL) -> int:
+    """
+    Log a tool's captured output as a single sampled record: lines that only
+    differ in their numbers (progress counters, percentages) are collapsed,
+    and only the first `head` and last `tail` distinct lines are kept.
+    Returns the number of lines logged (0 if the level is disabled).
+    """
+    if not output or not logger.isEnabledFor(level):
+        return 0
+
+    seen = set()
+    distinct = []
+    total = 0
+    for line in output.splitlines():
+        line = line.rstrip()
+        if not line:
+            continue
+        total += 1
+        key = _DIGITS.sub("#", line)
+        if key not in seen:
+            seen.add(key)
+            distinct.append(line)
+
+    kept = distinct
+    if len(distinct) > head + tail:
+        omitted = len(distinct) - head - tail
+        kept = distinct[:head] + [f"... {omitted} distinct lines omitted ..."] + distinct[-tail:]
+
+    suppressed = total - min(len(distinct), head + tail)
+    summary = f" ({suppressed} of {total} lines suppressed)" if suppressed else ""
+    logger.log(level, f"{label}{summary}:\n" + "\n".join(kept))
+    return min(len(distinct), head + tail)
+
+
+def setup_logging(log_path, *, json_format: bool = False):
+    """
+    Route all records through a queue to one listener thread that owns the
+    console and rotating file handlers. Pool workers forked after this call
+    inherit the QueueHandler, so they only enqueue records: no worker ever
+    writes or rotates the log file itself. With json_format the file gets
+    one JSON object per line carrying the job context fields.
+    """
+    stop_logging()
+
     # Clear existing handlers to allow reconfiguration (important for tests)
     for handler in logging.root.handlers[:]:
         logging.root.removeHandler(handler)
 
+    formatter = logging.Formatter(LOG_FORMAT)
+
     console = logging.StreamHandler()
     console.setLevel(logging.WARNING)
+    console.setFormatter(formatter)
 
     file_handler = RotatingFileHandler(log_path, maxBytes=5_000_000, backupCount=3)
     file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(JsonFormatter() if json_format else formatter)
+
+    log_queue = multiprocessing.Queue(-1)
+    start_listener(log_queue, console, file_handler)
+
+    # records below every handler's level are dropped at the call site instead
+    # of being built, pickled and queued only to be discarded by the listener
+    level = min(console.level, file_handler.level)
+    logging.basicConfig(level=level, handlers=[_queue_handler(log_queue)])
+
+    logging.getLogger().info(f"Logging system initialized: {log_path}")
+    return log_queue
+
+
+def _queue_handler(log_queue):
+    handler = QueueHandler(log_queue)
+    # the listener's handlers apply LOG_FORMAT; without this basicConfig would
+    # give the QueueHandler its default "LEVEL:name:" prefix on top of it
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    handler.addFilter(ContextFilter())
+    return handler
+
+
+def start_listener(log_queue, *handlers):
+    global _listener
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # atexit runs handlers last-in first-out: registering after the queue exists makes
+    # the listener drain and stop before multiprocessing's exit hook closes the queue
+    atexit.unregister(stop_logging)
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Drain queued records to the handlers, stop the listener, and detach the queue."""
+    global _listener
+    if _listener is None:
+        return
+
+    for handler in logging.root.handlers[:]:
+        if isinstance(handler, QueueHandler) and handler.queue is _listener.queue:
+            logging.root.removeHandler(handler)
 
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format="%(asctime)s [%(levelname)s] %(message)s",
-        handlers=[console, file_handler]
-    )
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
 
-    logging.getLogger().info(f"Logging system initialized: {log_path}")
\ No newline at end of file
+    # nothing reads the queue any more; don't let its feeder thread block exit
+    _listener.queue.close()
+    _listener.queue.cancel_join_thread()
+    _listener = None
@@ -1,19 +1,59 @@
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
+from itertools import chain
+from typing import Iterable, Tuple
 import logging
+import time
 
-from .db.models import JobModel
-from .enums import StepStatus, PipelineStatus
+from .db.models import ArtifactModel, JobModel, StepEventModel, StarMetricsModel, ToolRunModel
+from .enums import StepStatus, PipelineStatus, PipelineStep
 
 
 logger = logging.getLogger(__name__)
 
 
+STEP_NAMES = [step.value for step in PipelineStep]
+
+# step statuses that need no further work
+DONE_STATUSES = frozenset({StepStatus.SUCCESS, StepStatus.SKIPPED})
+
+# step statuses that fail the job (and make it a retry candidate)
+FAILED_STATUSES = frozenset({StepStatus.FAILED, StepStatus.TIMED_OUT})
+
+# accessions per IN (...) lookup, which keeps it under SQLite's bound-parameter limit,
+# and rows per executemany batch of job inserts
+BULK_CHUNK_SIZE = 500
+
+
 class ManifestManager:
-    def __init__(self, session: Session):
+    """
+    Reads and writes job rows and their step events. With buffered=True,
+    step status updates are coalesced in memory and written in one transaction when flush_size
+    accessions are pending, on flush() (Job calls it at each step boundary), at the first write
+    flush_interval seconds after the oldest pending one, or on close(). All of it happens on the
+    caller's thread: the session is not thread-safe.
+    """
+    def __init__(self, session: Session, *, buffered: bool = False,
+                flush_interval: float = 5.0, flush_size: int = 50):
         self.session = session
+        self.buffered = buffered
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+
+        self.stats = {"updates": 0, "flushes": 0, "commits": 0, "db_time": 0.0}
+        self._pending = {}
+        self._pending_events = []
+        self._pending_metrics = {}
+        self._pending_artifacts = {}
+        self._pending_since = None
 
 
     def get_or_create_job(self, accession: str, source_file: str) -> JobModel:
+        return self._get_or_create_job(accession, source_file)
+
+
+    def _get_or_create_job(self, accession: str, source_file: str) -> JobModel:
         job = self.session.query(JobModel).filter_by(accession=accession).first()
         if job:
             logger.debug(f"Found existing job: {accession}")
@@ -31,23 +71,238 @@ class ManifestManager:
             pipeline_status=PipelineStatus.PENDING,
         )
         self.session.add(new_job)
-        self.session.commit()
+        self._commit()
         return new_job
 
 
-    def update_step_status(self, accession: str, step_name: str, status: StepStatus) -> None:
+    def bulk_get_or_create_jobs(self, jobs: Iterable[Tuple[str, str]]) -> dict[str, dict[str, StepStatus]]:
+        """
+        Upsert (accession, source_file) pairs in one transaction and return
+        {accession: {step_name: StepStatus}} for all of them.
+        """
+        sources = {}
+        for accession, source_file in jobs:
+            sources.setdefault(accession, str(source_file))
+
+        rows = [
+            {
+                "accession": accession,
+                "source_file": source_file,
+                **{f"{step}_status": StepStatus.PENDING for step in STEP_NAMES},
+                "pipeline_status": PipelineStatus.PENDING,
+            }
+            for accession, source_file in sources.items()
+        ]
+
+        dialect = self.session.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            stmt = insert_fn(JobModel).on_conflict_do_nothing(index_elements=["accession"])
+            for chunk in _chunks(rows, BULK_CHUNK_SIZE):
+                self.session.execute(stmt, chunk)
+        else:
+            existing = set(self.get_statuses(list(sources)))
+            missing = [row for row in rows if row["accession"] not in existing]
+            for chunk in _chunks(missing, BULK_CHUNK_SIZE):
+                self.session.execute(insert(JobModel), chunk)
+
+        self._commit()
+        statuses = self.get_statuses(list(sources))
+        logger.info(f"Loaded manifest state for {len(statuses)} accessions")
+        return statuses
+
+
+    def get_statuses(self, accessions: list[str]) -> dict[str, dict[str, StepStatus]]:
+        """{accession: {step_name: StepStatus}} for the given accessions that have a job row."""
+        columns = [getattr(JobModel, f"{step}_status") for step in STEP_NAMES]
+        statuses = {}
+
+        for chunk in _chunks(accessions, BULK_CHUNK_SIZE):
+            query = select(JobModel.accession, *columns).where(JobModel.accession.in_(chunk))
+            for accession, *values in self.session.execute(query):
+                statuses[accession] = dict(zip(STEP_NAMES, values))
+        return statuses
+
+
+    def get_stopped_jobs(self) -> dict[str, dict[str, StepStatus]]:
+        """Statuses of jobs with a step left Running (its process died) or Interrupted (shut down)."""
+        columns = [getattr(JobModel, f"{step}_status") for step in STEP_NAMES]
+        stopped = (StepStatus.RUNNING, StepStatus.INTERRUPTED)
+        query = select(JobModel.accession, *columns).where(or_(*(column.in_(stopped) for column in columns)))
+        return {accession: dict(zip(STEP_NAMES, values)) for accession, *values in self.session.execute(query)}
+
+
+    def update_step_status(self, accession: str, step_name: str, status: StepStatus,
+                           event: dict = None) -> None:
+        """
+        Set one step's status. If event is given (started_at, ended_at, bytes_in, ...)
+        it is appended to step_events in the same transaction.
+        """
+        self.stats["updates"] += 1
+        events = [{"accession": accession, "status": status, **event}] if event else []
+
+        if self.buffered:
+            self._pending.setdefault(accession, {})[step_name] = status
+            self._pending_events.extend(events)
+            self._flush_if_due()
+            return
+
+        start = time.perf_counter()
         job = self.session.query(JobModel).filter_by(accession=accession).first()
+        self.stats["db_time"] += time.perf_counter() - start
         if not job:
             logger.warning(f"Tried to update status for unknown accession: {accession}")
             return
 
         setattr(job, f"{step_name}_status", status)
         self._update_pipeline_status(job)
+        self._add_events(events)
         logger.debug(f"Before commit: {accession} - {step_name}_status = {status}")
-        self.session.commit()
+        self._commit()
         logger.debug(f"Committed update for {accession}: {step_name} = {status}")
 
 
+    def record_star_metrics(self, accession: str, metrics: dict) -> None:
+        """Store (replace) the STAR alignment summary for an accession."""
+        if self.buffered:
+            self._pending_metrics[accession] = metrics
+            self._flush_if_due()
+            return
+
+        self._merge_metrics({accession: metrics})
+        self._commit()
+
+
+    def _merge_metrics(self, metrics_by_accession: dict) -> None:
+        for accession, metrics in metrics_by_accession.items():
+            self.session.merge(StarMetricsModel(accession=accession, **metrics))
+
+
+    def record_artifacts(self, accession: str, step_name: str, artifacts: list[dict]) -> None:
+        """Replace the artifacts (path, size, mtime_ns, digest) recorded for one step of a job."""
+        if self.buffered:
+            self._pending_artifacts[(accession, step_name)] = artifacts
+            self._flush_if_due()
+            return
+
+        self._replace_artifacts({(accession, step_name): artifacts})
+        self._commit()
+
+
+    def _replace_artifacts(self, artifacts_by_step: dict) -> None:
+        for (accession, step_name), artifacts in artifacts_by_step.items():
+            step = PipelineStep(step_name)
+            self.session.execute(
+                delete(ArtifactModel).where(ArtifactModel.accession == accession, ArtifactModel.step == step)
+            )
+            self.session.add_all(ArtifactModel(accession=accession, step=step, **row) for row in artifacts)
+
+
+    def get_artifacts(self, accessions: list[str]) -> dict[str, dict[str, list[dict]]]:
+        """{accession: {step_name: [artifact, ...]}} for the given accessions that have any recorded."""
+        columns = [ArtifactModel.path, ArtifactModel.size, ArtifactModel.mtime_ns, ArtifactModel.digest]
+        found = {}
+        for chunk in _chunks(accessions, BULK_CHUNK_SIZE):
+            query = (
+                select(ArtifactModel.accession, ArtifactModel.step, *columns)
+                .where(ArtifactModel.accession.in_(chunk))
+                .order_by(ArtifactModel.id)
+            )
+            for accession, step, path, size, mtime_ns, digest in self.session.execute(query):
+                found.setdefault(accession, {}).setdefault(step.value, []).append(
+                    {"path": path, "size": size, "mtime_ns": mtime_ns, "digest": digest}
+                )
+        return found
+
+
+    def flush(self) -> None:
+        """Write all buffered status updates in a single transaction."""
+        self._pending_since = None
+        if not self._pending and not self._pending_metrics and not self._pending_artifacts:
+            return
+
+        pending, self._pending = self._pending, {}
+        events, self._pending_events = self._pending_events, []
+        metrics, self._pending_metrics = self._pending_metrics, {}
+        artifacts, self._pending_artifacts = self._pending_artifacts, {}
+        start = time.perf_counter()
+
+        try:
+            jobs = self.session.query(JobModel).filter(JobModel.accession.in_(list(pending))).all()
+            found = {job.accession: job for job in jobs}
+
+            for accession, updates in pending.items():
+                job = found.get(accession)
+                if not job:
+                    logger.warning(f"Tried to update status for unknown accession: {accession}")
+                    continue
+                for step_name, status in updates.items():
+                    setattr(job, f"{step_name}_status", status)
+                self._update_pipeline_status(job)
+
+            self._add_events(events)
+            self._merge_metrics(metrics)
+            self._replace_artifacts(artifacts)
+            self.session.commit()
+        except Exception:
+            # put the updates back so a later flush can retry them
+            self.session.rollback()
+            self._pending = pending
+            self._pending_events = events
+            self._pending_metrics = metrics
+            self._pending_artifacts = artifacts
+            raise
+        finally:
+            self.stats["db_time"] += time.perf_counter() - start
+
+        self.stats["flushes"] += 1
+        self.stats["commits"] += 1
+        logger.debug(f"Flushed status updates for {len(pending)} accessions")
+
+
+    def close(self) -> None:
+        """Flush anything still buffered. Safe to call more than once."""
+        self.flush()
+
+
+    def _flush_if_due(self):
+        now = time.monotonic()
+        if self._pending_since is None:
+            self._pending_since = now
+        if len(self._pending) >= self.flush_size or now - self._pending_since >= self.flush_interval:
+            self.flush()
+
+
+    def _commit(self):
+        start = time.perf_counter()
+        self.session.commit()
+        self.stats["commits"] += 1
+        self.stats["db_time"] += time.perf_counter() - start
+
+
+    def _add_events(self, events: list[dict]) -> None:
+        """
+        Add step-event rows (and the tool runs listed under an event's "tools")
+        to the session, numbering attempts per (accession, step).
+        """
+        if not events:
+            return
+
+        attempts = self._attempt_counts(list({event["accession"] for event in events}))
+        for event in events:
+            event = dict(event)
+            tools = event.pop("tools", None) or []
+            step = PipelineStep(event["step"])
+            key = (event["accession"], step)
+            attempts[key] = attempts.get(key, 0) + 1
+            self.session.add(StepEventModel(**{**event, "step": step}, attempt=attempts[key]))
+            for usage in tools:
+                self.session.add(ToolRunModel(
+                    accession=event["accession"], step=step, attempt=attempts[key],
+                    host=event.get("host"), **usage,
+                ))
+
+
     def _update_pipeline_status(self, job: JobModel) -> None:
         """Private helper to derive pipeline status from step statuses."""
         statuses = [
@@ -58,7 +313,7 @@ class ManifestManager:
             job.upload_status
         ]
 
-        if StepStatus.FAILED in statuses:
+        if any(s in FAILED_STATUSES for s in statuses):
             job.pipeline_status = PipelineStatus.FAILED
         elif all(s == StepStatus.SUCCESS or s == StepStatus.SKIPPED for s in statuses):
             job.pipeline_status = PipelineStatus.COMPLETED
@@ -68,9 +323,175 @@ class ManifestManager:
 
     def get_failed_jobs(self, step_name: str) -> list[JobModel]:
         return self.session.query(JobModel).filter(
-            getattr(JobModel, f"{step_name}_status") == StepStatus.FAILED
+            getattr(JobModel, f"{step_name}_status").in_(FAILED_STATUSES)
         ).all()
 
 
+    def get_retry_jobs(self, step_names: list[str], max_attempts: int = None,
+                       failed_statuses: Iterable[StepStatus] = FAILED_STATUSES,
+                       accessions: Iterable[str] = None) -> list[Tuple[str, str, str]]:
+        """
+        Failed jobs to retry, as (accession, source_file, first_failed_step).
+
+        Only jobs whose first failed step is in step_names, and failed with
+        one of failed_statuses, are returned; with max_attempts set, jobs that
+        already used up their attempts at that step (per step_events) are
+        left out. With accessions, only those jobs are considered.
+        """
+        failed_statuses = set(failed_statuses)
+        columns = [getattr(JobModel, f"{step}_status") for step in STEP_NAMES]
+        query = (
+            select(JobModel.accession, JobModel.source_file, *columns)
+            .where(JobModel.pipeline_status == PipelineStatus.FAILED)
+            .order_by(JobModel.accession)
+        )
+        if accessions is None:
+            rows = self.session.execute(query)
+        else:
+            rows = chain.from_iterable(
+                self.session.execute(query.where(JobModel.accession.in_(chunk)))
+                for chunk in _chunks(sorted(accessions), BULK_CHUNK_SIZE)
+            )
+
+        candidates = []
+        for accession, source_file, *values in rows:
+            first_failed = next(
+                ((step, status) for step, status in zip(STEP_NAMES, values) if status in FAILED_STATUSES),
+                (None, None),
+            )
+            step, status = first_failed
+            if step in step_names and status in failed_statuses:
+                candidates.append((accession, source_file, step))
+
+        if max_attempts:
+            attempts = self._attempt_counts([acc for acc, _, _ in candidates])
+            candidates = [
+                (acc, source, step) for acc, source, step in candidates
+                if attempts.get((acc, PipelineStep(step)), 0) < max_attempts
+            ]
+        return candidates
+
+
+    def attempt_counts(self, accession: str) -> dict:
+        """Recorded attempts per step for one job."""
+        return {step: attempt for (_, step), attempt in self._attempt_counts([accession]).items()}
+
+
+    def _attempt_counts(self, accessions: list[str]) -> dict:
+        attempts = {}
+        for chunk in _chunks(accessions, BULK_CHUNK_SIZE):
+            query = (
+                select(StepEventModel.accession, StepEventModel.step, func.max(StepEventModel.attempt))
+                .where(StepEventModel.accession.in_(chunk))
+                .group_by(StepEventModel.accession, StepEventModel.step)
+            )
+            for accession, step, attempt in self.session.execute(query):
+                attempts[(accession, step)] = attempt
+        return attempts
+
+
+    def mean_step_durations(self) -> dict[str, float]:
+        """Mean duration in seconds of successful runs of each step, from step_events."""
+        query = (
+            select(StepEventModel.step, func.avg(StepEventModel.duration_seconds))
+            .where(StepEventModel.status == StepStatus.SUCCESS)
+            .where(StepEventModel.duration_seconds.is_not(None))
+            .group_by(StepEventModel.step)
+        )
+        return {step.value: mean for step, mean in self.session.execute(query) if mean is not None}
+
+
+    def step_cost_history(self) -> dict[str, dict]:
+        """
+        Per-step means over successful attempts in step_events (seconds,
+        bytes_in, bytes_out) and tool CPU seconds per attempt from tool_runs.
+        """
+        query = (
+            select(
+                StepEventModel.step,
+                func.avg(StepEventModel.duration_seconds),
+                func.avg(StepEventModel.bytes_in),
+                func.avg(StepEventModel.bytes_out),
+            )
+            .where(StepEventModel.status == StepStatus.SUCCESS)
+            .group_by(StepEventModel.step)
+        )
+        history = {
+            step.value: {"seconds": seconds, "bytes_in": bytes_in, "bytes_out": bytes_out, "cpu_seconds": None}
+            for step, seconds, bytes_in, bytes_out in self.session.execute(query)
+        }
+
+        # tool runs are recorded for every attempt, so divide by all attempts, not just successes
+        attempts = dict(self.session.execute(
+            select(StepEventModel.step, func.count()).group_by(StepEventModel.step)
+        ).all())
+        cpu = self.session.execute(
+            select(ToolRunModel.step, func.sum(ToolRunModel.user_cpu_seconds + ToolRunModel.sys_cpu_seconds))
+            .group_by(ToolRunModel.step)
+        )
+        for step, cpu_seconds in cpu:
+            if step.value in history and cpu_seconds is not None and attempts.get(step):
+                history[step.value]["cpu_seconds"] = cpu_seconds / attempts[step]
+        return history
+
+
+    def iter_log_rows(self):
+        """Yield CSV-log rows (see constants.CSV_HEADER) for every job in the manifest."""
+        columns = [getattr(JobModel, f"{step}_status") for step in STEP_NAMES]
+        query = select(JobModel.accession, *columns, JobModel.source_file).order_by(JobModel.accession)
+        for accession, *statuses, source_file in self.session.execute(query).yield_per(1000):
+            yield [accession, *(status.value for status in statuses), source_file]
+
+
     def all_jobs(self) -> list[JobModel]:
-        return self.session.query(JobModel).all()
\ No newline at end of file
+        return self.session.query(JobModel).all()
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class QueuedManifestManager(ManifestManager):
+    """
+    Worker-side manifest for single-writer mode. Reads go straight to the
+    database; writes are put on a queue drained by a ManifestWriter.
+    """
+    def __init__(self, session: Session, queue):
+        super().__init__(session)
+        self.queue = queue
+
+
+    def _get_or_create_job(self, accession: str, source_file: str) -> JobModel:
+        job = self.session.query(JobModel).filter_by(accession=accession).first()
+        if job:
+            # detach so status changes made by Job are never autoflushed from this worker
+            self.session.expunge(job)
+            return job
+
+        logger.debug(f"Queueing creation of new job: {accession}")
+        self.queue.put(("get_or_create_job", (accession, str(source_file)), {}))
+        return JobModel(
+            accession=accession,
+            source_file=str(source_file),
+            **{f"{step}_status": StepStatus.PENDING for step in STEP_NAMES},
+            pipeline_status=PipelineStatus.PENDING,
+        )
+
+
+    def update_step_status(self, accession: str, step_name: str, status: StepStatus,
+                           event: dict = None) -> None:
+        self.stats["updates"] += 1
+        self.queue.put(("update_step_status", (accession, step_name, status), {"event": event}))
+
+
+    def record_star_metrics(self, accession: str, metrics: dict) -> None:
+        self.queue.put(("record_star_metrics", (accession, metrics), {}))
+
+
+    def record_artifacts(self, accession: str, step_name: str, artifacts: list[dict]) -> None:
+        self.queue.put(("record_artifacts", (accession, step_name, artifacts), {}))
+
+
+    def flush(self) -> None:
+        """Nothing to flush locally; the writer owns all pending writes."""
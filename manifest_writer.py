@@ -0,0 +1,100 @@
+from multiprocessing import Manager
+from queue import Empty
+import logging
+import threading
+
+from .db.engine import get_session_maker
+from .manifest_manager import ManifestManager
+
+
+logger = logging.getLogger(__name__)
+
+
+# manifest methods workers may ask the writer to run
+WRITE_OPS = {"get_or_create_job", "update_step_status", "record_star_metrics", "record_artifacts"}
+
+
+class ManifestWriter:
+    """
+    Single writer for the manifest database. Pool workers put write ops on a
+    shared queue and one thread in the parent applies them through a buffered
+    ManifestManager, so SQLite sees one writer committing in batches.
+    """
+    def __init__(self, database_url: str, *, flush_interval: float = 1.0, flush_size: int = 200):
+        self.database_url = database_url
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+
+        self._sync_manager = Manager()
+        # a manager proxy pickles cleanly into pool tasks, unlike multiprocessing.Queue
+        self.queue = self._sync_manager.Queue()
+        self.stats = {}
+        self._thread = None
+
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="manifest-writer", daemon=True)
+        self._thread.start()
+        logger.info("Started single-writer manifest thread")
+
+
+    def stop(self):
+        """Drain everything already queued, flush, and shut the queue down."""
+        if self._thread:
+            self.queue.put(None)
+            self._thread.join()
+            self._thread = None
+        self._sync_manager.shutdown()
+        logger.info(f"Manifest writer stopped: {self.stats}")
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+    def _run(self):
+        session = get_session_maker(self.database_url)()
+        manifest = ManifestManager(session, buffered=True, flush_interval=self.flush_interval,
+                                   flush_size=self.flush_size)
+        try:
+            while True:
+                try:
+                    item = self.queue.get(timeout=self.flush_interval)
+                except Empty:
+                    self._flush(manifest)
+                    continue
+
+                if item is None:
+                    break
+                self._apply(manifest, item)
+        finally:
+            try:
+                manifest.close()
+            finally:
+                self.stats = dict(manifest.stats)
+                session.close()
+
+
+    def _flush(self, manifest: ManifestManager):
+        try:
+            manifest.flush()
+        except Exception as e:
+            # updates stay buffered and are retried on the next flush
+            logger.error(f"Manifest writer flush failed: {e}")
+
+
+    def _apply(self, manifest: ManifestManager, item):
+        name, args, kwargs = item
+        if name not in WRITE_OPS:
+            logger.error(f"Ignoring unknown manifest write op: {name}")
+            return
+        try:
+            getattr(manifest, name)(*args, **kwargs)
+        except Exception as e:
+            # one bad op must not kill the writer for every other worker
+            logger.error(f"Manifest write {name}{args} failed: {e}")
@@ -0,0 +1,300 @@
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Manager
+from pathlib import Path
+from queue import Empty
+import logging
+import math
+import os
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+STEP_RESULTS = "sra_pipeline_step_results_total"
+STEP_DURATION = "sra_pipeline_step_duration_seconds"
+STEP_BYTES = "sra_pipeline_step_bytes_total"
+JOBS_COMPLETED = "sra_pipeline_jobs_completed_total"
+QUEUE_DEPTH = "sra_pipeline_queue_depth"
+ACTIVE_SUBPROCESSES = "sra_pipeline_active_subprocesses"
+STEPS_ACTIVE = "sra_pipeline_steps_active"
+TOOL_KILLS = "sra_pipeline_tool_kills_total"
+TOOL_PROGRESS = "sra_pipeline_tool_progress_total"
+
+# name -> (type, help)
+METRICS = {
+    STEP_RESULTS: ("counter", "Finished pipeline steps by step and status."),
+    STEP_DURATION: ("histogram", "Wall time of finished pipeline steps."),
+    STEP_BYTES: ("counter", "Bytes read (direction=in) and written (direction=out) by steps. "
+                            "Downloaded bytes are step=download,direction=out; uploaded bytes "
+                            "are step=upload,direction=in."),
+    JOBS_COMPLETED: ("counter", "Jobs returned by pool workers."),
+    QUEUE_DEPTH: ("gauge", "Items waiting in pipeline queues."),
+    ACTIVE_SUBPROCESSES: ("gauge", "External tools currently running, by tool."),
+    STEPS_ACTIVE: ("gauge", "Pipeline steps currently running, by step."),
+    TOOL_KILLS: ("counter", "External tools killed by the watchdog, by tool and reason (timeout or stalled)."),
+    TOOL_PROGRESS: ("counter", "Work external tools report done while running (e.g. STAR reads from "
+                               "Log.progress.out), by tool and unit."),
+}
+
+# step durations range from seconds (validate) to hours (STAR on large runs)
+DURATION_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200, 14400)
+
+# where module-level metric calls go: None (disabled), a registry, or a QueueSink
+_sink = None
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (
+        f'{k}="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for k, v in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """In-process store of counter, gauge and histogram samples, rendered in Prometheus text format."""
+    def __init__(self, buckets: tuple = DURATION_BUCKETS):
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._values = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+
+    def apply(self, op: str, name: str, labels: tuple, value: float):
+        with self._lock:
+            if op == "inc":
+                self._values[(name, labels)] = self._values.get((name, labels), 0) + value
+            elif op == "set":
+                self._values[(name, labels)] = value
+            elif op == "observe":
+                counts = self._histograms.setdefault((name, labels), [0] * len(self.buckets) + [0.0])
+                for i, bound in enumerate(self.buckets):
+                    if value <= bound:
+                        counts[i] += 1
+                counts[-1] += value
+            else:
+                logger.error(f"Ignoring unknown metrics op: {op}")
+
+
+    def value(self, name: str, **labels) -> float:
+        return self._values.get((name, _label_key(labels)), 0)
+
+
+    def snapshot(self) -> tuple[dict, dict]:
+        """Copies of the counter/gauge values and histogram counts, keyed by (name, labels)."""
+        with self._lock:
+            return dict(self._values), {key: list(counts) for key, counts in self._histograms.items()}
+
+
+    def render(self) -> str:
+        values, histograms = self.snapshot()
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                for (metric, labels), counts in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(self.buckets, counts):
+                        le = (("le", _format_value(bound)),)
+                        lines.append(f"{name}_bucket{_format_labels(labels, le)} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(counts[-1])}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {counts[-2]}")
+            else:
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+    def write_textfile(self, path: Path):
+        """Write for node_exporter's textfile collector; the rename keeps scrapes from seeing partial files."""
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(self.render())
+        os.replace(tmp, path)
+
+
+class QueueSink:
+    """Worker-side sink: forwards metric ops to the parent's MetricsCollector."""
+    def __init__(self, queue):
+        self.queue = queue
+
+
+    def apply(self, op: str, name: str, labels: tuple, value: float):
+        self.queue.put((op, name, labels, value))
+
+
+def bind(sink):
+    """Send this process's metric calls to sink (a MetricsRegistry, a QueueSink, or None to disable)."""
+    global _sink
+    _sink = sink
+
+
+def inc(name: str, value: float = 1, **labels):
+    if _sink is not None:
+        _sink.apply("inc", name, _label_key(labels), value)
+
+
+def set_gauge(name: str, value: float, **labels):
+    if _sink is not None:
+        _sink.apply("set", name, _label_key(labels), value)
+
+
+def observe(name: str, value: float, **labels):
+    if _sink is not None:
+        _sink.apply("observe", name, _label_key(labels), value)
+
+
+def record_step(step: str, status: str, event: dict):
+    """Count a finished step and its duration and bytes (event as built by Job._step_event)."""
+    inc(STEP_RESULTS, step=step, status=status)
+    if event.get("duration_seconds") is not None:
+        observe(STEP_DURATION, event["duration_seconds"], step=step)
+    if event.get("bytes_in"):
+        inc(STEP_BYTES, event["bytes_in"], step=step, direction="in")
+    if event.get("bytes_out"):
+        inc(STEP_BYTES, event["bytes_out"], step=step, direction="out")
+
+
+@contextmanager
+def track_subprocess(tool: str):
+    """Count tool as running for the duration of the block."""
+    inc(ACTIVE_SUBPROCESSES, 1, tool=tool)
+    try:
+        yield
+    finally:
+        inc(ACTIVE_SUBPROCESSES, -1, tool=tool)
+
+
+class MetricsCollector:
+    """
+    Aggregates metrics for a run in the parent process. Pool workers send ops
+    over a manager queue; one thread applies them to a single registry, so
+    counters are summed across workers instead of each worker exposing its
+    own. The registry is served over HTTP and/or written to a textfile.
+    """
+    def __init__(self, *, port: int = None, textfile: Path = None, interval: float = 15.0,
+                 host: str = "127.0.0.1"):
+        self.port = port
+        self.textfile = textfile
+        self.interval = interval
+        self.host = host
+
+        self.registry = MetricsRegistry()
+        self._sync_manager = Manager()
+        self.queue = self._sync_manager.Queue()
+        self._watched = {"metrics": self.queue}
+        self._thread = None
+        self._server = None
+
+
+    def watch_queue(self, name: str, queue):
+        """Report queue.qsize() as sra_pipeline_queue_depth{queue=name} on every tick."""
+        self._watched[name] = queue
+
+
+    def start(self):
+        bind(self.registry)
+        self._thread = threading.Thread(target=self._run, name="metrics-collector", daemon=True)
+        self._thread.start()
+
+        if self.port is not None:
+            self._server = ThreadingHTTPServer((self.host, self.port), _handler_for(self.registry))
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+            logger.info(f"Serving metrics on http://{self.host}:{self._server.server_port}/metrics")
+
+
+    def stop(self):
+        """Apply everything already queued, write a final textfile, and shut down."""
+        if self._thread:
+            self.queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        self._sync_manager.shutdown()
+        bind(None)
+
+
+    def __enter__(self):
+        self.start()
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+    def _run(self):
+        next_tick = time.monotonic() + self.interval
+        while True:
+            try:
+                item = self.queue.get(timeout=max(0.0, next_tick - time.monotonic()))
+            except Empty:
+                item = ()
+
+            if item is None:
+                break
+            if item:
+                self.registry.apply(*item)
+            # tick on a clock, not on idle gaps: a busy queue must not starve the textfile
+            if time.monotonic() >= next_tick:
+                self._tick()
+                next_tick = time.monotonic() + self.interval
+        self._tick()
+
+
+    def _tick(self):
+        for name, queue in self._watched.items():
+            try:
+                set_gauge(QUEUE_DEPTH, queue.qsize(), queue=name)
+            except Exception:
+                # the watched queue's manager may already be gone at shutdown
+                pass
+
+        if self.textfile:
+            try:
+                self.registry.write_textfile(self.textfile)
+            except OSError as e:
+                logger.warning(f"Could not write metrics textfile {self.textfile}: {e}")
+
+
+def _handler_for(registry: MetricsRegistry):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+
+        def log_message(self, format, *args):
+            # scrapes every few seconds would flood the run log
+            pass
+
+    return MetricsHandler
@@ -0,0 +1,131 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable
+import json
+import os
+
+from .constants import STEP_BYTES_DIRECTION
+from .enums import PipelineStep
+from .run_metadata import download_bytes, fastq_bytes
+from .utils import format_bytes
+
+
+PLAN_VERSION = 1
+
+# steps whose bytes run metadata gives per run
+METADATA_BYTES = {
+    PipelineStep.DOWNLOAD: download_bytes,
+    PipelineStep.CONVERT: fastq_bytes,
+}
+
+
+class WorkPlan:
+    """
+    The steps each pending accession still needs, with per-step totals of
+    jobs, bytes and core-hours estimated from past runs. Built without
+    launching any tool (SRAOrchestrator.build_plan), saved as JSON, and run
+    as-is with SRAOrchestrator.execute_plan.
+    """
+    def __init__(self, *, stages: list[PipelineStep], jobs: list[tuple[str, str, tuple]],
+                 summary: dict[str, dict], created_at: str = None):
+        self.stages = [PipelineStep(stage) for stage in stages]
+        self.jobs = [(acc, source, tuple(PipelineStep(step) for step in steps)) for acc, source, steps in jobs]
+        self.summary = summary
+        self.created_at = created_at or datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+    def to_dict(self) -> dict:
+        return {
+            "version": PLAN_VERSION,
+            "created_at": self.created_at,
+            "stages": [stage.value for stage in self.stages],
+            "summary": self.summary,
+            "jobs": [
+                {"accession": acc, "source_file": str(source), "steps": [step.value for step in steps]}
+                for acc, source, steps in self.jobs
+            ],
+        }
+
+
+    def save(self, path: Path):
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps(self.to_dict(), indent=1))
+        os.replace(tmp, path)
+
+
+    @classmethod
+    def load(cls, path: Path) -> "WorkPlan":
+        data = json.loads(path.read_text())
+        if data.get("version") != PLAN_VERSION:
+            raise ValueError(f"{path} is plan version {data.get('version')}; expected {PLAN_VERSION}")
+        return cls(
+            stages=data["stages"],
+            jobs=[(job["accession"], job["source_file"], job["steps"]) for job in data["jobs"]],
+            summary=data["summary"],
+            created_at=data["created_at"],
+        )
+
+
+def estimate(jobs: Iterable[tuple[str, str, tuple]], history: dict[str, dict],
+             on_disk: set[str] = frozenset(), metadata: dict = None) -> dict[str, dict]:
+    """
+    Per-step totals for planned jobs: job count, and bytes, job-hours and
+    core-hours from the historical per-step means (None where a step has no
+    history). Download and FASTQ bytes come from each run's metadata
+    (accession -> RunMetadataModel) where it is known, and from the means for
+    the rest. Downloads whose file is already on disk move no bytes.
+    """
+    metadata = metadata or {}
+    summary = {
+        step.value: {"jobs": 0, "on_disk": 0, "bytes": None, "job_hours": None, "core_hours": None}
+        for step in PipelineStep
+    }
+    # step -> [runs with known bytes, their bytes]
+    known = {step.value: [0, 0] for step in PipelineStep}
+    for accession, _, steps in jobs:
+        for step in steps:
+            row = summary[step.value]
+            row["jobs"] += 1
+            if step == PipelineStep.DOWNLOAD and accession in on_disk:
+                row["on_disk"] += 1
+                continue
+            size = METADATA_BYTES[step](metadata.get(accession)) if step in METADATA_BYTES else None
+            if size is not None:
+                known[step.value][0] += 1
+                known[step.value][1] += size
+
+    for step, row in summary.items():
+        if not row["jobs"]:
+            continue
+        working = row["jobs"] - row["on_disk"]
+        known_runs, known_bytes = known[step]
+        past = history.get(step) or {}
+        mean_bytes = past.get(f"bytes_{STEP_BYTES_DIRECTION.get(step, 'out')}")
+        if known_runs == working:
+            row["bytes"] = known_bytes
+        elif mean_bytes is not None:
+            row["bytes"] = known_bytes + int(mean_bytes * (working - known_runs))
+        if past.get("seconds") is not None:
+            row["job_hours"] = past["seconds"] * working / 3600
+        if past.get("cpu_seconds") is not None:
+            row["core_hours"] = past["cpu_seconds"] * working / 3600
+    return {step: row for step, row in summary.items() if row["jobs"]}
+
+
+def _format_hours(hours) -> str:
+    return "?" if hours is None else f"{hours:.1f}"
+
+
+def format_summary(plan: WorkPlan, workers: int = 1) -> str:
+    """Plain-text table of a plan's per-step totals, with wall-clock time at `workers` parallel jobs."""
+    lines = [f"{'step':<10}{'jobs':>10}{'on disk':>10}{'bytes':>12}{'job-h':>10}{'core-h':>10}"]
+    job_hours = 0.0
+    for step, row in plan.summary.items():
+        lines.append(
+            f"{step:<10}{row['jobs']:>10}{row['on_disk']:>10}{format_bytes(row['bytes']):>12}"
+            f"{_format_hours(row['job_hours']):>10}{_format_hours(row['core_hours']):>10}"
+        )
+        job_hours += row["job_hours"] or 0.0
+    lines.append(f"{len(plan.jobs)} accessions; about {job_hours / max(1, workers):.1f} h "
+                 f"wall-clock at {workers} parallel jobs (steps without history not counted)")
+    return "\n".join(lines)
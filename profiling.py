@@ -0,0 +1,184 @@
+from collections import Counter, defaultdict
+from pathlib import Path
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+PROFILE_MODES = ("sample", "cprofile")
+
+# merged outputs written into the profile directory
+COLLAPSED_FILE = "profile.collapsed"
+MERGED_PSTATS_FILE = "profile.prof"
+
+# per-process profiler state; the JobProfiler itself is pickled into every task
+_state = {}
+
+
+def _frame_name(code) -> str:
+    # collapsed-stack frames are ';'-separated, so keep names free of it
+    return f"{Path(code.co_filename).stem}.{code.co_qualname}".replace(";", ":")
+
+
+class _Sampler:
+    """Samples one thread's stack every `interval` seconds into collapsed-stack counts."""
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = None
+        self._thread = None
+
+
+    def start(self):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(threading.get_ident(), self._stop),
+                                        name="profile-sampler", daemon=True)
+        self._thread.start()
+
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+    def _run(self, thread_id: int, stop: threading.Event):
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+
+class JobProfiler:
+    """
+    Profiles every job a worker runs, either with a stack sampler (default;
+    low overhead, shows time spent waiting on external tools) or cProfile.
+    Each worker process writes its own file into out_dir after every job;
+    merge() combines them into one collapsed-stack file for flamegraph.pl
+    or speedscope.
+    """
+    def __init__(self, out_dir: Path, *, mode: str = "sample", interval: float = 0.01):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}; expected one of {PROFILE_MODES}")
+        self.out_dir = out_dir
+        self.mode = mode
+        self.interval = interval
+
+
+    def run(self, func, *args, **kwargs):
+        """Call func under this process's profiler and save the accumulated profile."""
+        state = self._process_state()
+        if self.mode == "cprofile":
+            state.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                state.disable()
+                state.dump_stats(self.out_dir / f"worker-{os.getpid()}.prof")
+
+        state.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            state.stop()
+            _write_collapsed(state.counts, self.out_dir / f"worker-{os.getpid()}.collapsed")
+
+
+    def _process_state(self):
+        key = (os.getpid(), self.mode, self.out_dir)
+        if key not in _state:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            _state[key] = cProfile.Profile() if self.mode == "cprofile" else _Sampler(self.interval)
+        return _state[key]
+
+
+    def merge(self, top: int = 15) -> Path:
+        """Merge all worker profiles in out_dir into COLLAPSED_FILE and log the hottest frames."""
+        if self.mode == "cprofile":
+            files = sorted(self.out_dir.glob("worker-*.prof"))
+            if not files:
+                return None
+            stats = pstats.Stats(*map(str, files))
+            stats.dump_stats(self.out_dir / MERGED_PSTATS_FILE)
+            counts = pstats_to_collapsed(stats)
+            unit = "us"
+        else:
+            counts = Counter()
+            for file in sorted(self.out_dir.glob("worker-*.collapsed")):
+                counts.update(read_collapsed(file))
+            if not counts:
+                return None
+            unit = "samples"
+
+        path = self.out_dir / COLLAPSED_FILE
+        _write_collapsed(counts, path)
+
+        self_time = Counter()
+        for stack, count in counts.items():
+            self_time[stack.rsplit(";", 1)[-1]] += count
+        total = sum(self_time.values()) or 1
+        hottest = ", ".join(f"{name} {100 * n / total:.1f}%" for name, n in self_time.most_common(top))
+        logger.info(f"Merged profiles into {path} ({total} {unit}); hottest: {hottest}")
+        return path
+
+
+def _write_collapsed(counts: Counter, path: Path):
+    tmp = path.with_name(f".{path.name}.tmp")
+    with tmp.open("w") as f:
+        for stack, count in sorted(counts.items()):
+            if count > 0:
+                f.write(f"{stack} {count}\n")
+    os.replace(tmp, path)
+
+
+def read_collapsed(path: Path) -> Counter:
+    counts = Counter()
+    for line in path.read_text().splitlines():
+        stack, _, count = line.rpartition(" ")
+        if stack:
+            counts[stack] += int(count)
+    return counts
+
+
+def pstats_to_collapsed(stats: pstats.Stats, max_depth: int = 64) -> Counter:
+    """
+    Approximate collapsed stacks (in microseconds) from cProfile's caller
+    graph: a function's time is split between its callers in proportion to
+    the cumulative time each caller's calls took.
+    """
+    def name(func):
+        filename, _, funcname = func
+        return f"{Path(filename).stem}.{funcname}".replace(";", ":")
+
+    callees = defaultdict(dict)
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees[caller][func] = edge[3]
+
+    counts = Counter()
+
+    def walk(func, path, on_path, share):
+        _, _, tt, ct, _ = stats.stats[func]
+        counts[path] += int(tt * share * 1_000_000)
+        if len(on_path) >= max_depth:
+            return
+        for child, edge_ct in callees[func].items():
+            child_ct = stats.stats[child][3]
+            # skip sub-microsecond branches; they also keep the walk from exploding
+            if child in on_path or child_ct <= 0 or share * edge_ct < 1e-6:
+                continue
+            walk(child, f"{path};{name(child)}", on_path | {child}, share * edge_ct / child_ct)
+
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        if not callers:
+            walk(func, name(func), {func}, 1.0)
+    return counts
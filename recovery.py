@@ -0,0 +1,104 @@
+from pathlib import Path
+import logging
+import shutil
+
+from .artifacts import check
+from .enums import PipelineStep, StepStatus
+from .fastq_converter import FASTQConverter
+from .manifest_manager import ManifestManager, DONE_STATUSES
+from .status_checker import DownloadStatusChecker
+
+
+logger = logging.getLogger(__name__)
+
+
+STEP_ORDER = list(PipelineStep)
+
+
+class RecoveryPass:
+    """
+    Startup pass over jobs an earlier run left mid-step: Running (the process
+    died) or Interrupted (it was shut down). The stopped step's partial
+    outputs are removed and the step reset; then the completed steps before
+    it are checked back to front, and any whose outputs are gone is reset
+    too, so the job resumes from its last verified step rather than from
+    scratch or from a corrupt file.
+    """
+    def __init__(self, *, output_dir: Path, fastq_dir: Path, star_output_dir: Path):
+        self.status_checker = DownloadStatusChecker(output_dir)
+        self.fastq = FASTQConverter(output_dir=fastq_dir)
+        self.output_dir = output_dir
+        self.star_output_dir = star_output_dir
+
+
+    def run(self, manifest: ManifestManager) -> dict[str, int]:
+        counts = {"jobs": 0, "reset_steps": 0}
+        stopped = manifest.get_stopped_jobs()
+        artifacts = manifest.get_artifacts(list(stopped))
+        for accession, statuses in stopped.items():
+            resets = self.resets(accession, statuses, artifacts.get(accession, {}))
+            for step in resets:
+                manifest.update_step_status(accession, step.value, StepStatus.PENDING)
+            counts["jobs"] += 1
+            counts["reset_steps"] += len(resets)
+            logger.info(f"Recovered {accession}: reset {[step.value for step in resets]}")
+        if counts["jobs"]:
+            logger.warning(f"Recovered {counts['jobs']} jobs left mid-step by an earlier run "
+                           f"({counts['reset_steps']} steps will be redone)")
+        return counts
+
+
+    def resets(self, accession: str, statuses: dict[str, StepStatus],
+               artifacts: dict[str, list[dict]] = None) -> list[PipelineStep]:
+        """Steps to reset to Pending, removing the partial outputs of stopped ones."""
+        resets = []
+        stopped = [step for step in STEP_ORDER
+                   if statuses[step.value] in (StepStatus.RUNNING, StepStatus.INTERRUPTED)]
+        for step in stopped:
+            self.remove_partial_outputs(accession, step)
+            resets.append(step)
+
+        # uploads delete each file once it is up, so there is nothing to verify
+        # before one; it resumes with whatever is still on disk
+        first = stopped[0]
+        if first == PipelineStep.UPLOAD:
+            return resets
+        for step in reversed(STEP_ORDER[:STEP_ORDER.index(first)]):
+            if statuses[step.value] not in DONE_STATUSES or self.outputs_present(accession, step, artifacts):
+                break
+            resets.append(step)
+        return resets
+
+
+    def outputs_present(self, accession: str, step: PipelineStep, artifacts: dict[str, list[dict]] = None) -> bool:
+        """Whether what the step leaves for the next one is still on disk (and intact, if recorded)."""
+        recorded = (artifacts or {}).get(step.value)
+        if recorded:
+            return not any(map(check, recorded))
+        if step in (PipelineStep.DOWNLOAD, PipelineStep.VALIDATE):
+            return self.status_checker.confirm_download(accession) == "Download OK!"
+        if step == PipelineStep.CONVERT:
+            return bool(self.fastq.find_fastq_files(accession))
+        if step == PipelineStep.ALIGN:
+            # STAR writes Log.final.out last
+            return (self.star_output_dir / f"{accession}_" / "Log.final.out").is_file()
+        return True
+
+
+    def remove_partial_outputs(self, accession: str, step: PipelineStep):
+        if step == PipelineStep.DOWNLOAD:
+            # prefetch resumes from its own partial files; a stale lock would block it
+            for lock in (self.output_dir / accession).glob("*.lock"):
+                lock.unlink(missing_ok=True)
+        elif step == PipelineStep.CONVERT:
+            # fasterq-dump writes its FASTQs progressively
+            paths = [*self.fastq.get_fastq_paths(accession), self.fastq.get_single_end_path(accession)]
+            for path in paths:
+                if path.exists():
+                    logger.info(f"Removing partial FASTQ {path}")
+                    path.unlink()
+        elif step == PipelineStep.ALIGN:
+            prefix = self.star_output_dir / f"{accession}_"
+            if prefix.exists():
+                logger.info(f"Removing partial STAR output {prefix}")
+                shutil.rmtree(prefix)
@@ -0,0 +1,158 @@
+from pathlib import Path
+from enum import Enum
+import logging
+import shutil
+import tempfile
+
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .db.models import JobModel, StepEventModel, StarMetricsModel, ToolRunModel, RunMetadataModel, ArtifactModel
+
+
+logger = logging.getLogger(__name__)
+
+
+# dataset name -> (model, timestamp column used for the date partition, extra partition columns)
+DATASETS = {
+    "jobs": (JobModel, "updated_at", []),
+    "step_events": (StepEventModel, "started_at", ["step"]),
+    "star_metrics": (StarMetricsModel, "recorded_at", []),
+    "tool_runs": (ToolRunModel, "recorded_at", ["tool"]),
+    "run_metadata": (RunMetadataModel, "recorded_at", []),
+    "artifacts": (ArtifactModel, "recorded_at", ["step"]),
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("Parquet reports need pyarrow. Install it with `pip install pyarrow`.") from e
+
+
+def _table_frame(session: Session, model) -> pd.DataFrame:
+    columns = [column.name for column in model.__table__.columns]
+    rows = session.execute(select(*model.__table__.columns)).all()
+    frame = pd.DataFrame(rows, columns=columns)
+
+    # enum columns come back as Enum members; store their plain values
+    for column in frame.columns:
+        if frame[column].map(lambda v: isinstance(v, Enum)).any():
+            frame[column] = frame[column].map(lambda v: v.value if isinstance(v, Enum) else v)
+    return frame
+
+
+def export_parquet(session: Session, out_dir: Path) -> dict[str, Path]:
+    """
+    Export manifest tables as Parquet datasets partitioned by date (and step
+    for step_events). Each export is a full snapshot that replaces the
+    previous dataset as a whole: rows move between date partitions when they
+    are updated, so replacing only the partitions written would leave their
+    old copies behind.
+    """
+    _require_pyarrow()
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = {}
+
+    for name, (model, time_column, partitions) in DATASETS.items():
+        frame = _table_frame(session, model)
+        path = out_dir / name
+        if frame.empty:
+            logger.info(f"No rows to export for {name}")
+            shutil.rmtree(path, ignore_errors=True)
+            continue
+
+        frame["date"] = pd.to_datetime(frame[time_column]).dt.strftime("%Y-%m-%d")
+        staging = Path(tempfile.mkdtemp(prefix=f".{name}-", dir=out_dir))
+        try:
+            frame.to_parquet(staging / name, engine="pyarrow", index=False, partition_cols=["date", *partitions])
+            _swap_in(staging / name, path)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        written[name] = path
+        logger.info(f"Exported {len(frame)} {name} rows to {path}")
+
+    return written
+
+
+def _swap_in(new: Path, path: Path):
+    # two renames on one filesystem: readers see the old dataset or the new one, briefly neither
+    if path.exists():
+        old = new.with_name(f"{new.name}.old")
+        path.rename(old)
+    new.rename(path)
+
+
+def load_dataset(out_dir: Path, name: str, columns: list[str]) -> pd.DataFrame:
+    """Read only the requested columns of an exported dataset."""
+    _require_pyarrow()
+    path = out_dir / name
+    if not path.exists():
+        raise FileNotFoundError(f"No exported {name} dataset at {path}. Run `report export` first.")
+    return pd.read_parquet(path, columns=columns, engine="pyarrow")
+
+
+def throughput(out_dir: Path, freq: str = "1h") -> pd.DataFrame:
+    """Finished steps and bytes written per step per time bucket."""
+    events = load_dataset(out_dir, "step_events", ["step", "status", "ended_at", "bytes_out"])
+    events["bucket"] = pd.to_datetime(events["ended_at"]).dt.floor(freq)
+    events["succeeded"] = events["status"].isin(["Success", "Skipped"])
+
+    return (
+        events.groupby(["step", "bucket"], observed=True)
+        .agg(jobs=("status", "size"), succeeded=("succeeded", "sum"), bytes_out=("bytes_out", "sum"))
+        .reset_index()
+    )
+
+
+def failure_rates(out_dir: Path) -> pd.DataFrame:
+    """Attempts, failures and failure rate per step."""
+    events = load_dataset(out_dir, "step_events", ["step", "status"])
+    events["failed"] = events["status"].isin(["Failed", "TimedOut"])
+
+    summary = (
+        events.groupby("step", observed=True)
+        .agg(attempts=("status", "size"), failed=("failed", "sum"))
+        .reset_index()
+    )
+    summary["failure_rate"] = summary["failed"] / summary["attempts"]
+    return summary
+
+
+def step_durations(out_dir: Path) -> pd.DataFrame:
+    """Duration percentiles (seconds) of successful step attempts."""
+    events = load_dataset(out_dir, "step_events", ["step", "status", "duration_seconds"])
+    events = events[events["status"] == "Success"]
+
+    grouped = events.groupby("step", observed=True)["duration_seconds"]
+    return pd.DataFrame({
+        "runs": grouped.size(),
+        "mean": grouped.mean(),
+        "p50": grouped.quantile(0.50),
+        "p95": grouped.quantile(0.95),
+        "max": grouped.max(),
+    }).reset_index()
+
+
+def tool_usage(out_dir: Path) -> pd.DataFrame:
+    """Per-tool p50/p95 wall time, CPU, peak memory and I/O, for sizing threads and memory."""
+    runs = load_dataset(out_dir, "tool_runs", [
+        "tool", "wall_seconds", "user_cpu_seconds", "sys_cpu_seconds",
+        "max_rss_kb", "read_bytes", "write_bytes",
+    ])
+    runs["cpu_seconds"] = runs["user_cpu_seconds"] + runs["sys_cpu_seconds"]
+    # average cores kept busy; compare with the threads setting
+    runs["cores"] = runs["cpu_seconds"] / runs["wall_seconds"].where(runs["wall_seconds"] > 0)
+    runs["max_rss_mb"] = runs["max_rss_kb"] / 1024
+
+    grouped = runs.groupby("tool", observed=True)
+    summary = {"runs": grouped.size()}
+    for column in ("wall_seconds", "cores", "max_rss_mb"):
+        summary[f"{column}_p50"] = grouped[column].quantile(0.50)
+        summary[f"{column}_p95"] = grouped[column].quantile(0.95)
+    summary["max_rss_mb_max"] = grouped["max_rss_mb"].max()
+    summary["read_bytes_mean"] = grouped["read_bytes"].mean()
+    summary["write_bytes_mean"] = grouped["write_bytes"].mean()
+    return pd.DataFrame(summary).reset_index()
@@ -0,0 +1,183 @@
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+import csv
+import logging
+import re
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .accession_lists import ACCESSION_PATTERN, chunked, open_list
+from .db.models import RunMetadataModel
+
+
+logger = logging.getLogger(__name__)
+
+
+# SraRunInfo column -> (run_metadata column, parser)
+RUNINFO_COLUMNS = {
+    "Run": ("accession", str),
+    "Experiment": ("experiment", str),
+    "SRAStudy": ("study", str),
+    "Sample": ("sample", str),
+    "LibraryLayout": ("layout", str.upper),
+    "spots": ("spots", int),
+    "bases": ("bases", int),
+    "avgLength": ("avg_length", float),
+    "size_MB": ("size_mb", float),
+    "Platform": ("platform", str),
+    "LibraryStrategy": ("library_strategy", str),
+}
+
+GEO_SUFFIXES = (".soft", ".soft.gz")
+
+# the SRA link GEO puts in each sample's !Sample_relation lines
+SRA_RELATION = re.compile(r"SRA:.*?\b([SED]RX\d+)")
+
+# uncompressed FASTQ holds a sequence and a quality character per base, plus headers
+FASTQ_BYTES_PER_BASE = 2.2
+
+UPSERT_CHUNK_SIZE = 500
+
+
+def read_runinfo(path: Path) -> Iterator[dict]:
+    """Stream run_metadata rows from an SraRunInfo CSV (plain or compressed)."""
+    with open_list(path) as f:
+        for record in csv.DictReader(f):
+            accession = (record.get("Run") or "").strip()
+            # efetch repeats the header between batches
+            if not ACCESSION_PATTERN.fullmatch(accession):
+                continue
+            row = {"source_file": str(path)}
+            for column, (field, parse) in RUNINFO_COLUMNS.items():
+                value = (record.get(column) or "").strip()
+                try:
+                    row[field] = parse(value) if value else None
+                except ValueError:
+                    row[field] = None
+            yield row
+
+
+def read_geo_soft(path: Path) -> Iterator[dict]:
+    """
+    Yield {experiment, geo_sample, library_strategy, platform} for each
+    sample in a GEO SOFT file. GEO links samples to SRA experiments, not runs,
+    so these annotate runs already loaded from SraRunInfo.
+    """
+    import GEOparse
+
+    geo = GEOparse.get_GEO(filepath=str(path), silent=True)
+    samples = getattr(geo, "gsms", None) or {geo.name: geo}
+    for name, gsm in samples.items():
+        metadata = gsm.metadata
+        experiments = {match.group(1) for relation in metadata.get("relation", [])
+                       for match in [SRA_RELATION.search(relation)] if match}
+        for experiment in sorted(experiments):
+            yield {
+                "experiment": experiment,
+                "geo_sample": name,
+                "library_strategy": next(iter(metadata.get("library_strategy", [])), None),
+                "platform": next(iter(metadata.get("instrument_model", [])), None),
+            }
+
+
+def is_geo_soft(path: Path) -> bool:
+    return Path(path).name.lower().endswith(GEO_SUFFIXES)
+
+
+class RunMetadataStore:
+    """Reads and writes run_metadata rows; lookups are by primary key."""
+    def __init__(self, session: Session):
+        self.session = session
+
+
+    def upsert_runs(self, rows: Iterable[dict]) -> int:
+        """Insert or refresh SraRunInfo rows, keeping GEO annotations. Returns the number of rows."""
+        dialect = self.session.get_bind().dialect.name
+        count = 0
+        for chunk in chunked(rows, UPSERT_CHUNK_SIZE):
+            # one row per accession per statement: the last listing wins
+            chunk = list({row["accession"]: row for row in chunk}.values())
+            if dialect in ("postgresql", "sqlite"):
+                insert_fn = postgresql.insert if dialect == "postgresql" else sqlite.insert
+                stmt = insert_fn(RunMetadataModel)
+                fields = [field for field in chunk[0] if field != "accession"]
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=["accession"], set_={field: stmt.excluded[field] for field in fields}
+                )
+                self.session.execute(stmt, chunk)
+            else:
+                for row in chunk:
+                    self.session.merge(RunMetadataModel(**row))
+            count += len(chunk)
+        self.session.commit()
+        return count
+
+
+    def annotate_experiments(self, rows: Iterable[dict]) -> tuple[int, int]:
+        """Apply GEO sample rows to the runs of their experiments. Returns (runs updated, experiments without runs)."""
+        updated = unmatched = 0
+        for row in rows:
+            values = {field: value for field, value in row.items() if field != "experiment" and value is not None}
+            result = self.session.execute(
+                update(RunMetadataModel).where(RunMetadataModel.experiment == row["experiment"]).values(**values)
+            )
+            updated += result.rowcount
+            unmatched += not result.rowcount
+        self.session.commit()
+        return updated, unmatched
+
+
+    def get(self, accession: str) -> Optional[RunMetadataModel]:
+        return self.session.get(RunMetadataModel, accession)
+
+
+    def get_many(self, accessions: list[str]) -> dict[str, RunMetadataModel]:
+        found = {}
+        for chunk in chunked(accessions, UPSERT_CHUNK_SIZE):
+            query = select(RunMetadataModel).where(RunMetadataModel.accession.in_(chunk))
+            found.update((row.accession, row) for row in self.session.scalars(query))
+        return found
+
+
+def import_metadata(session: Session, paths: Iterable[Path]) -> dict[str, int]:
+    """Load SraRunInfo CSVs, then GEO SOFT files (which annotate the loaded runs)."""
+    store = RunMetadataStore(session)
+    paths = list(paths)
+    counts = {"runs": 0, "geo_runs": 0, "geo_unmatched": 0}
+    for path in sorted(paths, key=is_geo_soft):
+        if is_geo_soft(path):
+            updated, unmatched = store.annotate_experiments(read_geo_soft(path))
+            counts["geo_runs"] += updated
+            counts["geo_unmatched"] += unmatched
+            if unmatched:
+                logger.warning(f"{unmatched} experiments in {path} have no runs loaded; import their SraRunInfo first")
+        else:
+            counts["runs"] += store.upsert_runs(read_runinfo(path))
+        logger.info(f"Imported run metadata from {path}")
+    return counts
+
+
+def download_bytes(metadata: Optional[RunMetadataModel]) -> Optional[int]:
+    """Bytes a run's .sra download writes, or None if unknown."""
+    if metadata is None or metadata.size_mb is None:
+        return None
+    return int(metadata.size_mb * 1024 * 1024)
+
+
+def fastq_bytes(metadata: Optional[RunMetadataModel]) -> Optional[int]:
+    """Bytes of a run's uncompressed FASTQs, or None if unknown."""
+    if metadata is None or not metadata.bases:
+        return None
+    return int(metadata.bases * FASTQ_BYTES_PER_BASE)
+
+
+def disk_needed(metadata: Optional[RunMetadataModel], convert: bool) -> Optional[int]:
+    """Bytes a run's download (and FASTQ conversion, if planned) will write, or None if unknown."""
+    needed = download_bytes(metadata)
+    if needed is None:
+        return None
+    if convert:
+        needed += fastq_bytes(metadata) or 0
+    return needed
@@ -23,6 +23,17 @@ class S3Handler:
         self.s3.upload_file(str(local_path), self.s3_bucket, s3_key)
 
 
+    def upload_fileobj(self, fileobj, s3_key: str):
+        """Upload from a readable stream. Non-seekable streams go up as multipart chunks."""
+        logger.info(f"Streaming upload to s3://{self.s3_bucket}/{s3_key}")
+        self.s3.upload_fileobj(fileobj, self.s3_bucket, s3_key)
+
+
+    def upload_bytes(self, data: bytes, s3_key: str):
+        logger.info(f"Uploading {len(data)} bytes to s3://{self.s3_bucket}/{s3_key}")
+        self.s3.put_object(Bucket=self.s3_bucket, Key=s3_key, Body=data)
+
+
     def download_file(self, s3_key: str, local_path: Path):
         logger.info(f"Downloading s3://{self.s3_bucket}/{s3_key} to {local_path}")
         self.s3.download_file(self.s3_bucket, s3_key, str(local_path))
@@ -0,0 +1,101 @@
+"""
+Per-job logging overhead in pool workers: inherited file handler vs. queue listener.
+
+    python -m pipeline.scripts.bench_logging --workers 8 --jobs 400 --records 200
+
+Each fake job emits --records INFO lines. Prints one JSON object per mode with
+the worker-side logging time per job and how many lines made it to disk intact.
+"""
+from logging.handlers import RotatingFileHandler
+from multiprocessing import get_context
+from pathlib import Path
+import argparse
+import json
+import logging
+import re
+import tempfile
+import time
+
+from ..log_setup import LOG_FORMAT, setup_logging, stop_logging
+
+
+LINE = re.compile(r"^\S+ \S+ \[INFO\] job \d+ record \d+ " + "x" * 80 + "$")
+
+
+def _fake_job(args):
+    job_id, records = args
+    logger = logging.getLogger("bench")
+    start = time.perf_counter()
+    for i in range(records):
+        logger.info(f"job {job_id} record {i} " + "x" * 80)
+    return time.perf_counter() - start
+
+
+def _setup_direct(log_path: Path):
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+    handler = RotatingFileHandler(log_path, maxBytes=5_000_000, backupCount=50)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    logging.basicConfig(level=logging.INFO, handlers=[handler])
+
+
+def _count_lines(log_dir: Path) -> tuple[int, int]:
+    intact = corrupt = 0
+    for path in log_dir.glob("bench.log*"):
+        for line in path.read_text(errors="replace").splitlines():
+            if "record" not in line:
+                continue
+            if LINE.match(line):
+                intact += 1
+            else:
+                corrupt += 1
+    return intact, corrupt
+
+
+def run(mode: str, workers: int, jobs: int, records: int, log_dir: Path) -> dict:
+    log_path = log_dir / "bench.log"
+    if mode == "queue":
+        setup_logging(log_path)
+    else:
+        _setup_direct(log_path)
+
+    start = time.perf_counter()
+    with get_context("fork").Pool(workers) as pool:
+        job_times = pool.map(_fake_job, [(j, records) for j in range(jobs)])
+        pool.close()
+        pool.join()
+    dispatch_seconds = time.perf_counter() - start
+
+    stop_logging()
+    total_seconds = time.perf_counter() - start
+    intact, corrupt = _count_lines(log_dir)
+
+    return {
+        "mode": mode,
+        "workers": workers,
+        "jobs": jobs,
+        "records_per_job": records,
+        "worker_ms_per_job": round(1000 * sum(job_times) / jobs, 3),
+        "dispatch_seconds": round(dispatch_seconds, 3),
+        "total_seconds": round(total_seconds, 3),
+        "lines_expected": jobs * records,
+        "lines_intact": intact,
+        "lines_corrupt_or_lost": jobs * records - intact,
+        "lines_corrupt": corrupt,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--jobs", type=int, default=400)
+    parser.add_argument("--records", type=int, default=200)
+    args = parser.parse_args()
+
+    for mode in ("direct", "queue"):
+        with tempfile.TemporaryDirectory() as tmp:
+            print(json.dumps(run(mode, args.workers, args.jobs, args.records, Path(tmp))), flush=True)
+
+
+if __name__ == "__main__":
+    main()
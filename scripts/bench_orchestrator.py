@@ -0,0 +1,243 @@
+"""
+End-to-end orchestrator benchmark against stub bioinformatics tools.
+
+    python -m pipeline.scripts.bench_orchestrator --accessions 1000 10000 100000 \\
+        --command convert-fastq --batch-size 8 --latency 0.05 --failure-rate 0.01
+
+Puts stub prefetch, vdb-validate, fasterq-dump and STAR executables on PATH
+(sleeping --latency seconds, writing --output-bytes per file, failing at
+--failure-rate), writes a list of N accessions into a fresh workspace and
+runs the real CLI command on it. Prints one JSON object per size with
+jobs/sec, DB queries per job and peak memory; --out appends them to a file.
+"""
+from pathlib import Path
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+from ..tool_runner import run_tool
+
+
+PACKAGE = __package__.split(".")[0]
+
+COMMANDS = {
+    "download": ["download", "run"],
+    "convert-fastq": ["convert-fastq", "run", "--fresh-run"],
+    "align-star": ["align-star", "run", "--fresh-run"],
+}
+
+STUB_PREAMBLE = """#!/bin/sh
+sleep "$BENCH_LATENCY"
+roll=$(od -An -N2 -tu2 /dev/urandom | tr -d ' ')
+if [ "$roll" -lt "$BENCH_FAIL_BELOW" ]; then
+    echo "$(basename "$0") (stub): simulated failure" >&2
+    exit 1
+fi
+"""
+
+STUBS = {
+    # prefetch --max-size 200G -O <outdir> <accession>
+    "prefetch": """
+while [ $# -gt 1 ]; do
+    case "$1" in -O) out="$2"; shift 2 ;; *) shift ;; esac
+done
+acc="$1"
+mkdir -p "$out/$acc"
+head -c "$BENCH_OUTPUT_BYTES" /dev/zero > "$out/$acc/$acc.sra"
+echo "2024-01-01T00:00:00 prefetch.3.0.0: 1) '$acc' was downloaded successfully"
+""",
+    # vdb-validate <file>
+    "vdb-validate": """
+echo "info: Database '$(basename "$1")' metadata: md5 ok" >&2
+echo "info: Database '$(basename "$1")' is consistent" >&2
+""",
+    # fasterq-dump <accession> --outdir <dir> --threads <n>
+    "fasterq-dump": """
+acc="$1"; shift
+while [ $# -gt 0 ]; do
+    case "$1" in --outdir) out="$2"; shift 2 ;; *) shift ;; esac
+done
+mkdir -p "$out"
+head -c "$BENCH_OUTPUT_BYTES" /dev/zero > "$out/${acc}_1.fastq"
+head -c "$BENCH_OUTPUT_BYTES" /dev/zero > "$out/${acc}_2.fastq"
+echo "spots read      : 1,000"
+""",
+    # STAR ... --outFileNamePrefix <prefix>/ ...
+    "STAR": """
+while [ $# -gt 0 ]; do
+    case "$1" in --outFileNamePrefix) prefix="$2"; shift 2 ;; *) shift ;; esac
+done
+mkdir -p "$prefix"
+head -c "$BENCH_OUTPUT_BYTES" /dev/zero > "${prefix}Aligned.sortedByCoord.out.bam"
+printf '                          Number of input reads |\\t1000\\n                   Uniquely mapped reads %% |\\t90.00%%\\n' > "${prefix}Log.final.out"
+""",
+}
+
+CONFIG_TEMPLATE = """
+data_dir: {data_dir}
+subdirs:
+  lists: sra_lists
+  output: sra_files
+  logs: logs
+  fastq: fastq_files
+  star: star
+logs:
+  csv: csv_logs
+  python: python_logs
+star:
+  genome_dir: genome_ref
+  star_output: star_output
+batch_size: {batch_size}
+threads: 1
+max_retries: 1
+"""
+
+# runs inside the CLI process: counts SQL statements and records peak RSS
+# per process (parent and each pool worker) into $BENCH_STATS_DIR
+BOOTSTRAP = """
+import atexit, json, os, resource, sys
+from multiprocessing import util
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+stats_dir = os.environ["BENCH_STATS_DIR"]
+main_pid = os.getpid()
+state = {"pid": main_pid, "queries": 0}
+
+def dump():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    with open(os.path.join(stats_dir, f"{os.getpid()}.json"), "w") as f:
+        json.dump({"main": os.getpid() == main_pid, "queries": state["queries"],
+                   "max_rss_kb": usage.ru_maxrss}, f)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def count(*args):
+    if state["pid"] != os.getpid():
+        # first statement in a forked worker: reset and dump at worker exit
+        state["pid"], state["queries"] = os.getpid(), 0
+        util.Finalize(None, dump, exitpriority=100)
+    state["queries"] += 1
+
+atexit.register(dump)
+
+from {package}.cli.cli import cli
+cli(args=sys.argv[1:], prog_name="womb")
+"""
+
+
+def write_stubs(bin_dir: Path):
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for name, body in STUBS.items():
+        path = bin_dir / name
+        path.write_text(STUB_PREAMBLE + body)
+        path.chmod(0o755)
+
+
+def prepare_workspace(root: Path, accessions: int, batch_size: int) -> Path:
+    data_dir = root / "data"
+    lists_dir = data_dir / "sra_lists"
+    lists_dir.mkdir(parents=True)
+    with (lists_dir / "bench.txt").open("w") as f:
+        for i in range(accessions):
+            f.write(f"SRR{i:09d}\n")
+
+    config_file = root / "config.yaml"
+    config_file.write_text(CONFIG_TEMPLATE.format(data_dir=data_dir, batch_size=batch_size))
+    return config_file
+
+
+def _status_counts(db_path: Path) -> dict:
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT pipeline_status, COUNT(*) FROM jobs GROUP BY pipeline_status").fetchall()
+    return dict(rows)
+
+
+def run(command: str, accessions: int, args, root: Path) -> dict:
+    root.mkdir(parents=True)
+    config_file = prepare_workspace(root, accessions, args.batch_size)
+    write_stubs(root / "bin")
+    stats_dir = root / "stats"
+    stats_dir.mkdir()
+    db_path = root / "manifest.db"
+
+    env = {
+        **os.environ,
+        "PATH": f"{root / 'bin'}{os.pathsep}{os.environ.get('PATH', '')}",
+        "PYTHONPATH": str(Path(sys.modules[PACKAGE].__file__).parent.parent),
+        "database_url": f"sqlite:///{db_path}",
+        "BENCH_STATS_DIR": str(stats_dir),
+        "BENCH_LATENCY": str(args.latency),
+        "BENCH_OUTPUT_BYTES": str(args.output_bytes),
+        "BENCH_FAIL_BELOW": str(int(args.failure_rate * 65536)),
+    }
+    # same setup a user does before the first run: create the data directories
+    init = run_tool("womb", [sys.executable, "-m", f"{PACKAGE}.cli", "config", "init",
+                             "--config-file", str(config_file)], cwd=root, env=env)
+    init.check_returncode()
+
+    cmd = [sys.executable, "-c", BOOTSTRAP.replace("{package}", PACKAGE),
+           *COMMANDS[command], "--config-file", str(config_file)]
+
+    # run_tool's usage gives wall time and the peak RSS of the largest process in the tree
+    result = run_tool("womb", cmd, cwd=root, env=env)
+
+    processes = [json.loads(p.read_text()) for p in stats_dir.glob("*.json")]
+    queries = sum(p["queries"] for p in processes)
+    parent_rss = max((p["max_rss_kb"] for p in processes if p["main"]), default=0)
+    worker_rss = max((p["max_rss_kb"] for p in processes if not p["main"]), default=0)
+    seconds = result.usage["wall_seconds"]
+
+    return {
+        "command": command,
+        "accessions": accessions,
+        "batch_size": args.batch_size,
+        "latency": args.latency,
+        "output_bytes": args.output_bytes,
+        "failure_rate": args.failure_rate,
+        "exit_code": result.returncode,
+        "seconds": round(seconds, 3),
+        "jobs_per_second": round(accessions / seconds, 2),
+        "db_queries": queries,
+        "db_queries_per_job": round(queries / accessions, 2),
+        "peak_rss_mb": round(result.usage["max_rss_kb"] / 1024, 1),
+        "parent_peak_rss_mb": round(parent_rss / 1024, 1),
+        "worker_peak_rss_mb": round(worker_rss / 1024, 1),
+        "pipeline_status": _status_counts(db_path) if db_path.exists() else {},
+        "stderr_tail": result.stderr.strip().splitlines()[-5:] if result.returncode else [],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--accessions", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--command", choices=sorted(COMMANDS), default="convert-fastq")
+    parser.add_argument("--batch-size", type=int, default=8, help="Pool workers.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds each stub tool sleeps.")
+    parser.add_argument("--output-bytes", type=int, default=1024, help="Bytes per file written by stubs.")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability a stub call fails.")
+    parser.add_argument("--out", type=Path, help="Append results as JSON lines to this file.")
+    parser.add_argument("--keep", action="store_true", help="Keep the workspace for inspection.")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="womb-bench-")
+    try:
+        for accessions in args.accessions:
+            result = run(args.command, accessions, args, Path(tmp) / f"{args.command}-{accessions}")
+            line = json.dumps(result)
+            print(line, flush=True)
+            if args.out:
+                with args.out.open("a") as f:
+                    f.write(line + "\n")
+    finally:
+        if args.keep:
+            print(f"workspace kept at {tmp}", file=sys.stderr)
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
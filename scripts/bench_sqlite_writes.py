@@ -0,0 +1,91 @@
+"""
+Status-update throughput on SQLite: per-worker commits vs. the single writer.
+
+    python -m pipeline.scripts.bench_sqlite_writes --workers 1 8 32 --updates 200
+
+Prints one JSON object per (mode, workers) run.
+"""
+from multiprocessing import Pool
+from pathlib import Path
+import argparse
+import json
+import tempfile
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from ..db.engine import create_db_engine, get_session_maker
+from ..db.schema import create_schema
+from ..enums import PipelineStep, StepStatus
+from ..manifest_manager import ManifestManager, QueuedManifestManager
+from ..manifest_writer import ManifestWriter
+
+
+def _worker_updates(args):
+    database_url, accessions, queue = args
+    session = get_session_maker(database_url)()
+    if queue is not None:
+        manifest = QueuedManifestManager(session, queue)
+    else:
+        manifest = ManifestManager(session)
+
+    locked = 0
+    for accession in accessions:
+        for step in PipelineStep:
+            try:
+                manifest.update_step_status(accession, step.value, StepStatus.SUCCESS)
+            except OperationalError:
+                locked += 1
+                session.rollback()
+    session.close()
+    return locked
+
+
+def run(mode: str, workers: int, updates_per_worker: int, db_dir: Path) -> dict:
+    database_url = f"sqlite:///{db_dir / f'{mode}_{workers}.db'}"
+    steps = len(PipelineStep)
+    per_worker = max(1, updates_per_worker // steps)
+
+    chunks = [[f"SRR{w:03d}{i:06d}" for i in range(per_worker)] for w in range(workers)]
+    create_schema(create_db_engine(database_url))
+    session = get_session_maker(database_url)()
+    ManifestManager(session).bulk_get_or_create_jobs(
+        (acc, "bench.txt") for chunk in chunks for acc in chunk
+    )
+    session.close()
+
+    start = time.perf_counter()
+    if mode == "single-writer":
+        with ManifestWriter(database_url) as writer:
+            with Pool(workers) as pool:
+                locked = sum(pool.map(_worker_updates, [(database_url, c, writer.queue) for c in chunks]))
+    else:
+        with Pool(workers) as pool:
+            locked = sum(pool.map(_worker_updates, [(database_url, c, None) for c in chunks]))
+    elapsed = time.perf_counter() - start
+
+    total = workers * per_worker * steps
+    return {
+        "mode": mode,
+        "workers": workers,
+        "updates": total,
+        "seconds": round(elapsed, 3),
+        "updates_per_second": round(total / elapsed, 1),
+        "locked_errors": locked,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--updates", type=int, default=200, help="Status updates per worker.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in args.workers:
+            for mode in ("per-worker", "single-writer"):
+                print(json.dumps(run(mode, workers, args.updates, Path(tmp))), flush=True)
+
+
+if __name__ == "__main__":
+    main()
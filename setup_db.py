@@ -1,11 +1,15 @@
-from sqlalchemy import create_engine
 from .config import Config
-from .db.models import Base 
+from .db.engine import create_db_engine
+from .db.schema import create_schema
 
 
-cfg = Config()
-engine = create_engine(cfg.database_url)
+def main():
+    cfg = Config()
+    engine = create_db_engine(cfg.database_url)
 
+    create_schema(engine)
+    print("Database schema created successfully.")
 
-Base.metadata.create_all(engine)
-print("Database schema created successfully.")
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+# seconds a tool gets to exit after SIGTERM before its process group is killed
+TOOL_TERMINATE_GRACE = 10.0
+
+# seconds between the task feeder's checks for a signal while every slot is taken
+SLOT_POLL_INTERVAL = 0.5
+
+# worker-side state: set once this process is told to stop, and the tools it is running
+_interrupted = False
+_running_tools = set()
+
+
+class JobInterrupted(BaseException):
+    """
+    Raised in a worker that was told to stop, at a tool exit or a step
+    boundary. A BaseException so step error handling does not record it as a
+    failure; JobRunner records the open step as Interrupted instead.
+    """
+
+
+def init_worker():
+    """
+    Pool initializer. Terminal Ctrl-C reaches every process in the group, so
+    workers ignore SIGINT and leave the decision to the parent. SIGTERM
+    (from the parent, or a service manager) ends an idle worker outright,
+    which Pool.terminate() counts on, and interrupts a running job (see
+    job_running).
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # not the parent's GracefulShutdown handler, inherited through the fork
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+@contextmanager
+def job_running():
+    """
+    While a job runs, SIGTERM stops its tools and interrupts the job instead
+    of ending the process. Outside a job the default action stays: a Python
+    handler can miss a signal that lands just as the worker blocks waiting
+    for its next task, and the pool would wait on that worker forever.
+    """
+    # handlers can only be installed from the main thread
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signal.SIGTERM, _on_worker_sigterm)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+
+def _on_worker_sigterm(signum, frame):
+    global _interrupted
+    _interrupted = True
+    for proc in list(_running_tools):
+        terminate_tool(proc)
+
+
+def _signal_tool(proc, sig):
+    # tools run in their own session, so this reaches their children too; never
+    # reap here (poll/wait), run_tool is waiting on the pid
+    try:
+        os.killpg(proc.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _kill_if_running(proc):
+    if proc in _running_tools and proc.returncode is None:
+        logger.warning(f"{proc.args[0]} did not exit {TOOL_TERMINATE_GRACE:.0f}s after SIGTERM; killing it")
+        _signal_tool(proc, signal.SIGKILL)
+
+
+def track_tool(proc):
+    _running_tools.add(proc)
+
+
+def untrack_tool(proc):
+    _running_tools.discard(proc)
+
+
+def terminate_tool(proc):
+    """SIGTERM a tool's process group, then SIGKILL it if it is still running TOOL_TERMINATE_GRACE later."""
+    _signal_tool(proc, signal.SIGTERM)
+    timer = threading.Timer(TOOL_TERMINATE_GRACE, _kill_if_running, args=(proc,))
+    timer.daemon = True
+    timer.start()
+
+
+def kill_tool(proc):
+    """Kill a tool's process group and reap it (run_tool's error path)."""
+    _signal_tool(proc, signal.SIGKILL)
+    proc.wait()
+
+
+def interrupted() -> bool:
+    return _interrupted
+
+
+def raise_if_interrupted():
+    if _interrupted:
+        raise JobInterrupted("worker is stopping")
+
+
+class GracefulShutdown:
+    """
+    Parent-side SIGINT/SIGTERM handling for one batch.
+
+    SIGINT (Ctrl-C) first stops handing out new jobs and lets running ones
+    finish; a second SIGINT interrupts the running jobs; a third abandons the
+    batch with KeyboardInterrupt. SIGTERM means "exit soon", so it stops
+    dispatching and interrupts running jobs at once. Interrupted jobs stop
+    their tools (SIGTERM, then SIGKILL after TOOL_TERMINATE_GRACE) and record
+    the open step as Interrupted for the next run to resume.
+    """
+    def __init__(self):
+        self.signals = 0
+        self.interrupting = False
+        self._previous = {}
+        self._slots = None
+        self._feeding = False
+
+
+    @property
+    def stopping(self) -> bool:
+        return self.signals > 0
+
+
+    def __enter__(self):
+        # handlers can only be installed from the main thread
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                self._previous[signum] = signal.signal(signum, self._handle)
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        for signum, handler in self._previous.items():
+            signal.signal(signum, handler)
+        self._previous.clear()
+
+
+    def _handle(self, signum, frame):
+        self.signals += 1
+        name = signal.Signals(signum).name
+        if self.signals > 2 or (self.interrupting and signum == signal.SIGTERM):
+            raise KeyboardInterrupt
+        if signum == signal.SIGTERM or self.signals == 2:
+            self.interrupt_workers(name)
+        else:
+            logger.warning(f"{name}: finishing running jobs and starting no new ones; signal again to interrupt them")
+
+
+    def interrupt_workers(self, reason: str):
+        self.interrupting = True
+        workers = [p for p in multiprocessing.active_children() if "PoolWorker" in p.name]
+        logger.warning(f"{reason}: interrupting {len(workers)} workers; their running steps are recorded as Interrupted")
+        for worker in workers:
+            try:
+                os.kill(worker.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+    def until_stopped(self, items: Iterable, in_flight: int = None) -> Iterator:
+        """
+        Pass items through until the first signal (runs in the pool's
+        task-feeding thread). The pool pipes whatever it is given to its
+        workers straight away, beyond a signal's reach, so with in_flight at
+        most that many items are out at once: call task_done() for each
+        result, and stop_feeding() when the batch ends.
+        """
+        self._slots = threading.Semaphore(in_flight) if in_flight else None
+        self._feeding = True
+        return self._feed(items, self._slots)
+
+
+    def _feed(self, items: Iterable, slots) -> Iterator:
+        for item in items:
+            while slots and not slots.acquire(timeout=SLOT_POLL_INTERVAL):
+                if self.stopping or not self._feeding:
+                    return
+            if self.stopping or not self._feeding:
+                return
+            yield item
+
+
+    def task_done(self):
+        if self._slots:
+            self._slots.release()
+
+
+    def stop_feeding(self):
+        # a feeder still waiting for a slot would keep Pool.terminate() waiting for it
+        self._feeding = False
@@ -1,7 +1,32 @@
-import subprocess
 import logging
+import re
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
+
+from .log_setup import log_subprocess_output
+from .tool_runner import run_tool
+from . import fs_index
+
+
+# Log.final.out label -> metric name, for the numbers worth keeping per run
+LOG_FINAL_METRICS = {
+    "Number of input reads": "input_reads",
+    "Average input read length": "avg_input_read_length",
+    "Uniquely mapped reads number": "uniquely_mapped_reads",
+    "Uniquely mapped reads %": "uniquely_mapped_pct",
+    "Mismatch rate per base, %": "mismatch_rate_pct",
+    "% of reads mapped to multiple loci": "multi_mapped_pct",
+    "% of reads unmapped: too short": "unmapped_too_short_pct",
+    "% of reads unmapped: other": "unmapped_other_pct",
+    "Mapping speed, Million of reads per hour": "mapping_speed_mreads_per_hour",
+}
+
+# a Log.progress.out row: time, speed (M reads/hour), reads so far, read length, uniquely mapped %
+PROGRESS_LINE = re.compile(r"^\w{3} +\d+ \d\d:\d\d:\d\d +([\d.]+) +(\d+) +(\d+) +([\d.]+)%")
+
+# mates shorter than this (bp) get relaxed mapping filters
+SHORT_READ_LENGTH = 50
+SHORT_READ_FILTER_FRACTION = 0.3
 
 
 class STARRunner:
@@ -20,34 +45,86 @@ class STARRunner:
         self.logger = logging.getLogger(__name__)
 
 
-    def align(self, accession: str, fastq_files: List[Path]) -> List[Path]:
-        """Run STAR on paired-end FASTQ files."""
-        if len(fastq_files) != 2:
-            raise ValueError("STARRunner expects paired-end FASTQ files.")
+    def align(self, accession: str, fastq_files: List[Path], metadata=None) -> List[Path]:
+        """
+        Run STAR on paired-end (two) or single-end (one) FASTQ files. With the
+        run's metadata, the layout is checked against it and mapping filters
+        are chosen for its read length.
+        """
+        if len(fastq_files) not in (1, 2):
+            raise ValueError(f"STARRunner expects one or two FASTQ files, got {len(fastq_files)}.")
+        layout = getattr(metadata, "layout", None)
+        if layout == "PAIRED" and len(fastq_files) != 2:
+            raise ValueError(f"{accession} is paired-end but only {len(fastq_files)} FASTQ file was found.")
 
         output_prefix = self.star_output_dir / f"{accession}_"
         cmd = self._build_star_command(fastq_files, output_prefix)
+        cmd.extend(self.read_length_parameters(metadata, mates=len(fastq_files)))
+
+        # a previous attempt's rows would be counted as this one's progress
+        progress_file = self.progress_path(accession)
+        progress_file.unlink(missing_ok=True)
 
         self.logger.info(f"Running STAR for {accession}")
-        result = subprocess.run(cmd, capture_output=True, text=True, cwd=self.star_output_dir)
+        result = run_tool("STAR", cmd, cwd=self.star_output_dir, progress_file=progress_file,
+                          parse_progress=parse_progress_line)
 
         if result.returncode != 0:
-            self.logger.error(f"STAR failed for {accession}:\n{result.stderr}")
+            log_subprocess_output(self.logger, f"STAR failed for {accession}", result.stderr,
+                                  level=logging.ERROR)
             raise RuntimeError(f"STAR alignment failed for {accession}")
 
         self.logger.info(f"STAR completed for {accession}")
 
-        output_files = list(output_prefix.parent.glob(f"{output_prefix.name}*"))
+        fs_index.refresh(output_prefix)
+        output_files = self.output_files(accession)
         self.logger.debug(f"Detected STAR output files: {[f.name for f in output_files]}")
         return output_files
 
 
+    def output_files(self, accession: str) -> List[Path]:
+        """What an alignment of accession left in the output directory."""
+        return fs_index.glob_prefix(self.star_output_dir, f"{accession}_")
+
+
+    def log_final_path(self, accession: str) -> Path:
+        return self.star_output_dir / f"{accession}_" / "Log.final.out"
+
+
+    def progress_path(self, accession: str) -> Path:
+        return self.star_output_dir / f"{accession}_" / "Log.progress.out"
+
+
+    def read_metrics(self, accession: str) -> Dict[str, float]:
+        """Parse the alignment summary from STAR's Log.final.out; empty if missing."""
+        log_final = self.log_final_path(accession)
+        if not log_final.is_file():
+            self.logger.debug(f"No Log.final.out for {accession}")
+            return {}
+        return parse_log_final(log_final.read_text())
+
+
+    def read_length_parameters(self, metadata, mates: int) -> List[str]:
+        """
+        STAR's default filters need an alignment to cover 66% of the read
+        (both mates together); short reads rarely do, so they get the relaxed
+        fractions commonly used for them.
+        """
+        avg_length = getattr(metadata, "avg_length", None)
+        if not avg_length or avg_length / mates >= SHORT_READ_LENGTH:
+            return []
+        return [
+            "--outFilterScoreMinOverLread", str(SHORT_READ_FILTER_FRACTION),
+            "--outFilterMatchNminOverLread", str(SHORT_READ_FILTER_FRACTION),
+        ]
+
+
     def _build_star_command(self, fastq_files: List[Path], output_prefix: Path) -> List[str]:
         """Build the STAR command."""
         cmd = [
             "STAR",
             "--genomeDir", str(self.star_genome_dir),
-            "--readFilesIn", str(fastq_files[0]), str(fastq_files[1]),
+            "--readFilesIn", *(str(path) for path in fastq_files),
             "--runThreadN", str(self.threads),
             "--outFileNamePrefix", str(output_prefix) + "/",
             "--outSAMtype", "BAM", "SortedByCoordinate",
@@ -64,4 +141,29 @@ class STARRunner:
                 "--soloCBwhitelist", str(self.barcode_whitelist) if self.barcode_whitelist else "None",
             ])
 
-        return cmd
\ No newline at end of file
+        return cmd
+
+
+def parse_log_final(text: str) -> Dict[str, float]:
+    """Parse the 'label | value' lines of a STAR Log.final.out."""
+    metrics = {}
+    for line in text.splitlines():
+        label, sep, value = line.partition("|")
+        name = LOG_FINAL_METRICS.get(label.strip())
+        if not sep or not name:
+            continue
+        value = value.strip().rstrip("%")
+        try:
+            metrics[name] = int(value) if value.isdigit() else float(value)
+        except ValueError:
+            continue
+    return metrics
+
+
+def parse_progress_line(line: str) -> Optional[Dict[str, float]]:
+    """Reads so far, speed and uniquely mapped % from a Log.progress.out row; None for headers."""
+    match = PROGRESS_LINE.match(line)
+    if not match:
+        return None
+    speed, reads, _, unique = match.groups()
+    return {"reads": int(reads), "mreads_per_hour": float(speed), "uniquely_mapped_pct": float(unique)}
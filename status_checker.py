@@ -1,6 +1,8 @@
 from pathlib import Path
 from typing import List
 
+from . import fs_index
+
 
 class DownloadStatusChecker:
     def __init__(self, output_dir: Path, extensions: List[str] = [".sra", ".sralite"]):
@@ -33,6 +35,6 @@ class DownloadStatusChecker:
         accession_dir = self.output_dir / accession
         for ext in self.extensions:
             file_path = accession_dir / f"{accession}{ext}"
-            if file_path.exists():
+            if fs_index.exists(file_path):
                 return True
         return False
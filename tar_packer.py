@@ -0,0 +1,144 @@
+from pathlib import Path
+from typing import List, Tuple
+import gzip
+import json
+import logging
+import os
+import tarfile
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+BLOCK_SIZE = tarfile.BLOCKSIZE
+
+
+def expand_files(paths: List[Path]) -> List[Path]:
+    """Flatten a mix of files and output directories into a sorted file list."""
+    files = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(p for p in path.rglob("*") if p.is_file())
+        elif path.is_file():
+            files.append(path)
+    return sorted(files)
+
+
+def split_by_size(files: List[Path], max_member_size: int) -> Tuple[List[Path], List[Path]]:
+    """Split files into (small, large) around max_member_size bytes. BAMs always count as large."""
+    small, large = [], []
+    for file in files:
+        if file.suffix == ".bam" or file.stat().st_size > max_member_size:
+            large.append(file)
+        else:
+            small.append(file)
+    return small, large
+
+
+def relative_name(file: Path, root: Path) -> str:
+    """file's path under root (its name if it is outside root), as stored in the archive and index."""
+    try:
+        return file.relative_to(root).as_posix()
+    except ValueError:
+        return file.name
+
+
+class TarStreamPacker:
+    """
+    Streams files into a gzip tar archive through an OS pipe.
+
+    A writer thread feeds the pipe while the caller reads the other end,
+    so the archive is never materialized on disk or held fully in memory.
+    """
+    def __init__(self, files: List[Path], root: Path, compresslevel: int = 6):
+        self.files = files
+        self.root = root
+        self.compresslevel = compresslevel
+        self.members = []
+        self._error = None
+        self._thread = None
+
+
+    def open(self):
+        """Start the writer thread and return the readable end of the pipe."""
+        read_fd, write_fd = os.pipe()
+        self._reader = os.fdopen(read_fd, "rb")
+        writer = os.fdopen(write_fd, "wb")
+
+        self._thread = threading.Thread(target=self._write_archive, args=(writer,), daemon=True)
+        self._thread.start()
+        return self._reader
+
+
+    def close(self):
+        """Close the pipe, wait for the writer, and re-raise any writer error."""
+        self._reader.close()
+        if self._thread:
+            self._thread.join()
+        if self._error:
+            raise self._error
+
+
+    def _write_archive(self, writer):
+        try:
+            with writer, gzip.GzipFile(fileobj=writer, mode="wb",
+                                       compresslevel=self.compresslevel) as gz, \
+                    tarfile.open(fileobj=gz, mode="w|") as tar:
+                for file in self.files:
+                    tarinfo = tar.gettarinfo(str(file), arcname=relative_name(file, self.root))
+                    with file.open("rb") as f:
+                        tar.addfile(tarinfo, f)
+
+                    # tar.offset sits just past the padded data block, so step back
+                    # over it to find the member's data offset in the uncompressed tar.
+                    padded = -(-tarinfo.size // BLOCK_SIZE) * BLOCK_SIZE
+                    self.members.append({
+                        "path": tarinfo.name,
+                        "size": tarinfo.size,
+                        "tar_offset": tar.offset - padded,
+                    })
+        except BrokenPipeError:
+            # reader side went away because the upload failed; the caller sees that error
+            logger.debug("Tar stream reader closed before archive was complete")
+        except Exception as e:
+            logger.error(f"Failed to build tar stream: {e}")
+            self._error = e
+
+
+def pack_and_upload(s3_handler, accession: str, files: List[Path], root: Path,
+                    max_member_size: int) -> dict:
+    """
+    Upload an accession's outputs: small files as one streamed .tar.gz,
+    large files directly, under {accession}/ and their path relative to root
+    (every STAR run names its BAM the same). Writes an index manifest
+    recording where each file lives.
+    """
+    small, large = split_by_size(expand_files(files), max_member_size)
+
+    archive_key = s3_handler._s3_key(f"{accession}.tar.gz")
+    index = {"accession": accession, "archive": None, "members": [], "objects": []}
+
+    if small:
+        packer = TarStreamPacker(small, root)
+        stream = packer.open()
+        try:
+            logger.info(f"Streaming {len(small)} small files for {accession} to {archive_key}")
+            s3_handler.upload_fileobj(stream, archive_key)
+        finally:
+            packer.close()
+
+        index["archive"] = archive_key
+        index["members"] = packer.members
+
+    for file in large:
+        path = relative_name(file, root)
+        s3_key = s3_handler._s3_key(f"{accession}/{path}")
+        s3_handler.upload_file(file, s3_key)
+        index["objects"].append({"path": path, "size": file.stat().st_size, "key": s3_key})
+
+    index_key = s3_handler._s3_key(f"{accession}.index.json")
+    s3_handler.upload_bytes(json.dumps(index, indent=2).encode(), index_key)
+    logger.info(f"Wrote upload index for {accession} to {index_key}")
+
+    return index
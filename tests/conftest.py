@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from ..db.engine import create_db_engine
+from ..db.models import Base
+from ..db.schema import create_schema
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    """An on-disk SQLite manifest with the schema setup_db creates."""
+    url = f"sqlite:///{tmp_path / 'manifest.db'}"
+    engine = create_db_engine(url)
+    create_schema(engine)
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def session(tmp_path):
+    """A session on an on-disk SQLite manifest with just the tables."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'manifest.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
@@ -0,0 +1,79 @@
+import gzip
+import logging
+
+import pytest
+
+from ..accession_lists import AccessionSpool, chunked, is_list_file, read_accessions
+from ..enums import PipelineStep
+from ..utils import get_sra_lists
+
+
+RUNINFO = (
+    "Run,ReleaseDate,spots,bases,LibraryLayout,SampleName\n"
+    "SRR000001,2020-01-01,100,20000,PAIRED,s1\n"
+    "ERR000002,2020-01-01,100,10000,SINGLE,s2\n"
+    # efetch repeats the header between batches
+    "Run,ReleaseDate,spots,bases,LibraryLayout,SampleName\n"
+    "DRR000003,2020-01-01,100,20000,PAIRED,s3\n"
+)
+
+
+def test_text_list_skips_blanks_comments_and_invalid_entries(tmp_path, caplog):
+    path = tmp_path / "list.txt"
+    path.write_text("# header\nSRR000001\n\n  SRR000002  \nSRX000003\nsrr000004\n")
+
+    with caplog.at_level(logging.WARNING):
+        assert list(read_accessions(path)) == ["SRR000001", "SRR000002"]
+    assert "Skipped 2 invalid entries" in caplog.text
+
+
+def test_gzip_runinfo_csv_is_read_by_run_column(tmp_path):
+    path = tmp_path / "SraRunInfo.csv.gz"
+    with gzip.open(path, "wt") as f:
+        f.write(RUNINFO)
+
+    assert list(read_accessions(path)) == ["SRR000001", "ERR000002", "DRR000003"]
+
+
+def test_zstd_list(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    path = tmp_path / "list.txt.zst"
+    path.write_bytes(zstandard.ZstdCompressor().compress(b"SRR000001\nSRR000002\n"))
+
+    assert list(read_accessions(path)) == ["SRR000001", "SRR000002"]
+
+
+def test_csv_without_run_column_is_rejected(tmp_path):
+    path = tmp_path / "samples.csv"
+    path.write_text("Sample,Title\nGSM1,x\n")
+
+    with pytest.raises(ValueError, match="no Run column"):
+        list(read_accessions(path))
+
+
+def test_get_sra_lists_finds_supported_lists_in_name_order(tmp_path):
+    for name in ("b.txt.gz", "a.txt", "c.csv.zst", "notes.md", ".a.txt.swp", "d.csv"):
+        (tmp_path / name).write_text("")
+
+    assert [path.name for path in get_sra_lists(tmp_path)] == ["a.txt", "b.txt.gz", "c.csv.zst", "d.csv"]
+    assert not is_list_file(tmp_path / "x.gz")
+
+
+def test_spool_dedups_and_replays_queued_jobs(tmp_path):
+    with AccessionSpool(tmp_path) as spool:
+        assert spool.add_new(["SRR1", "SRR2", "SRR1"]) == ["SRR1", "SRR2"]
+        assert spool.add_new(["SRR2", "SRR3"]) == ["SRR3"]
+
+        steps = (PipelineStep.DOWNLOAD, PipelineStep.VALIDATE)
+        spool.queue([("SRR1", tmp_path / "a.txt", steps), ("SRR3", "b.txt", steps[1:])])
+
+        assert spool.jobs == 2
+        assert list(spool.iter_jobs(page_size=1)) == [
+            ("SRR1", str(tmp_path / "a.txt"), steps),
+            ("SRR3", "b.txt", (PipelineStep.VALIDATE,)),
+        ]
+    assert list(tmp_path.glob("ingest_*")) == []
+
+
+def test_chunked():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
@@ -0,0 +1,115 @@
+import os
+
+from .. import artifacts, fs_index
+from ..artifacts import PendingArtifacts, check, fast_digest, reconcile
+from ..enums import PipelineStep, StepStatus
+
+
+DONE = StepStatus.SUCCESS
+PENDING = StepStatus.PENDING
+
+
+def _statuses(**overrides):
+    return {step.value: overrides.get(step.value, PENDING) for step in PipelineStep}
+
+
+def _record(path):
+    return PendingArtifacts(PipelineStep.CONVERT, [path]).result()[0]
+
+
+def test_fast_digest_samples_large_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "DIGEST_SAMPLE_BYTES", 4)
+    path = tmp_path / "reads.fastq"
+    path.write_bytes(b"AAAAbbbbCCCCddddEEEE")
+    before = fast_digest(path)
+
+    # between the samples: not seen
+    path.write_bytes(b"AAAAxxxxCCCCddddEEEE")
+    assert fast_digest(path) == before
+    # in the middle sample
+    path.write_bytes(b"AAAAbbbbCCXXddddEEEE")
+    assert fast_digest(path) != before
+
+
+def test_pending_artifacts_skip_missing_files(tmp_path):
+    present = tmp_path / "SRR1_1.fastq"
+    present.write_text("@r1\nACGT\n+\nIIII\n")
+
+    pending = PendingArtifacts(PipelineStep.CONVERT, [present, tmp_path / "SRR1_2.fastq"])
+
+    [row] = pending.result()
+    assert pending.done()
+    assert row == {"path": str(present), "size": 16, "mtime_ns": present.stat().st_mtime_ns,
+                   "digest": fast_digest(present)}
+
+
+def test_check_finds_missing_truncated_and_changed_files(tmp_path):
+    path = tmp_path / "SRR1_1.fastq"
+    path.write_text("@r1\nACGT\n+\nIIII\n")
+    record = _record(path)
+    assert check(record) is None
+
+    # rewritten with the same size: only the digest tells
+    path.write_text("@r1\nTTTT\n+\nIIII\n")
+    os.utime(path, ns=(record["mtime_ns"] + 10**9, record["mtime_ns"] + 10**9))
+    assert "changed" in check(record)
+
+    path.write_text("@r1\nAC")
+    assert "bytes" in check(record)
+
+    path.unlink()
+    assert "missing" in check(record)
+
+
+def test_check_answers_missing_files_from_the_index(tmp_path, monkeypatch):
+    (tmp_path / "SRR1").mkdir()
+    present = tmp_path / "SRR1" / "SRR1_1.fastq"
+    present.write_text("@r1\nACGT\n+\nIIII\n")
+    records = [_record(present), {**_record(present), "path": str(tmp_path / "SRR2" / "SRR2_1.fastq")}]
+
+    with fs_index.indexing([tmp_path]):
+        stats = []
+        real_stat = os.stat
+        monkeypatch.setattr(os, "stat", lambda path, *a, **kw: (stats.append(str(path)), real_stat(path, *a, **kw))[1])
+        assert check(records[0]) is None
+        assert "missing" in check(records[1])
+
+    assert stats == [str(present)]
+
+
+def test_reconcile_redoes_steps_whose_outputs_went_missing(tmp_path):
+    fastq = tmp_path / "SRR1_1.fastq"
+    fastq.write_text("@r1\nACGT\n+\nIIII\n")
+    sra = [{**_record(fastq), "path": str(tmp_path / "SRR1.sra")}]
+    recorded = {"download": sra, "validate": sra, "convert": [_record(fastq)]}
+    statuses = _statuses(download=DONE, validate=DONE, convert=DONE)
+
+    assert reconcile("SRR1", statuses, recorded) == {}
+
+    fastq.unlink()
+    # the .sra went after conversion, as usual, so the download is redone as well
+    assert reconcile("SRR1", statuses, recorded) == {"convert": PENDING, "validate": PENDING, "download": PENDING}
+    # steps done before artifacts were recorded are trusted, and the walk stops there
+    assert reconcile("SRR1", statuses, {"convert": recorded["convert"]}) == {"convert": PENDING}
+
+
+def test_reconcile_takes_steps_with_intact_outputs_as_done(tmp_path):
+    bam = tmp_path / "SRR1_" / "Aligned.out.bam"
+    bam.parent.mkdir()
+    bam.write_bytes(b"BAM\1")
+    recorded = {"align": [_record(bam)]}
+
+    changes = reconcile("SRR1", _statuses(), recorded)
+
+    assert changes == {"download": DONE, "validate": DONE, "convert": DONE, "align": DONE}
+    # never over a failure
+    assert reconcile("SRR1", _statuses(validate=StepStatus.FAILED), recorded) == {}
+
+
+def test_reconcile_leaves_alignments_of_started_uploads_alone(tmp_path):
+    recorded = {"align": [{"path": str(tmp_path / "gone.bam"), "size": 1, "mtime_ns": 0, "digest": None}]}
+    statuses = _statuses(download=DONE, validate=DONE, convert=DONE, align=DONE)
+
+    assert reconcile("SRR1", statuses, recorded) == {"align": PENDING}
+    # an upload that started deletes what it sent
+    assert reconcile("SRR1", {**statuses, "upload": StepStatus.FAILED}, recorded) == {}
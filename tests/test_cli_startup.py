@@ -0,0 +1,53 @@
+from pathlib import Path
+import os
+import subprocess
+import sys
+
+
+PACKAGE = __package__.split(".")[0]
+
+# modules only a subcommand that needs them may import; they made up nearly all
+# of the ~800 ms `import <package>.cli.cli` took before imports were made lazy
+HEAVY_MODULES = ("sqlalchemy", "boto3", "botocore", "pandas", "numpy", "tqdm", "yaml", "dotenv")
+
+
+def _python(code: str, cwd: Path, *args) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONPATH": str(Path(sys.modules[PACKAGE].__file__).parent.parent)}
+    env.pop("database_url", None)
+    return subprocess.run([sys.executable, *args, "-c", code], cwd=cwd, env=env,
+                          capture_output=True, text=True, timeout=60, check=True)
+
+
+def _import_times(stderr: str) -> dict[str, int]:
+    """Module -> cumulative import time in microseconds, from -X importtime output."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if cumulative.strip().isdigit():
+            times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_import_is_light(tmp_path):
+    result = _python(f"import {PACKAGE}.cli.cli", tmp_path, "-X", "importtime")
+    times = _import_times(result.stderr)
+
+    # which modules load, not wall-clock time, which depends on the machine and its load
+    assert f"{PACKAGE}.cli.cli" in times
+    loaded = {module.split(".")[0] for module in times}
+    assert not loaded & set(HEAVY_MODULES)
+
+
+def test_imports_do_no_io(tmp_path):
+    # a .env that load_dotenv() would pick up if it ran at import time
+    (tmp_path / ".env").write_text("database_url=sqlite:///from-dotenv.db\n")
+    code = (
+        f"import os, {PACKAGE}.config, {PACKAGE}.db.session, {PACKAGE}.job_orchestrator; "
+        "print(os.environ.get('database_url'))"
+    )
+    result = _python(code, tmp_path)
+
+    assert result.stdout.strip() == "None"
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".env"]
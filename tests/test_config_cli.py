@@ -3,6 +3,7 @@ import pytest
 from typer.testing import CliRunner
 from rich import print as rprint
 from ..cli.cli import cli
+from ..log_setup import stop_logging
 
 
 runner = CliRunner()
@@ -49,6 +50,8 @@ def test_config_init(temp_cwd):
         ["config", "init", "--config-file", str(config_file)],
         catch_exceptions=False,
     )
+    # the log listener's console handler holds CliRunner's stderr, closed once invoke returns
+    stop_logging()
 
     # If CLI fails, dump colored debug info
     if result.exit_code != 0:
@@ -0,0 +1,67 @@
+from rich.console import Console
+
+from .. import metrics
+from ..dashboard import Dashboard
+from ..metrics import MetricsRegistry, JOBS_COMPLETED, STEPS_ACTIVE, TOOL_PROGRESS
+
+
+def _registry_mid_run():
+    registry = MetricsRegistry()
+    metrics.bind(registry)
+    try:
+        for _ in range(4):
+            metrics.record_step("download", "Success", {"duration_seconds": 10.0, "bytes_out": 1000})
+            metrics.record_step("validate", "Success", {"duration_seconds": 2.0})
+            metrics.inc(JOBS_COMPLETED)
+        metrics.record_step("download", "Failed", {"duration_seconds": 1.0})
+        metrics.inc(JOBS_COMPLETED)
+        metrics.inc(STEPS_ACTIVE, 2, step="download")
+        metrics.inc(STEPS_ACTIVE, 1, step="validate")
+        metrics.inc(TOOL_PROGRESS, 50_000, tool="STAR", unit="reads")
+    finally:
+        metrics.bind(None)
+    return registry
+
+
+def test_summary_counts_rates_and_eta():
+    registry = _registry_mid_run()
+    dashboard = Dashboard(registry, steps=["download", "validate"], total=10, workers=3,
+                          history={"download": 60.0})
+
+    # an earlier sample with nothing done yet, ten seconds before
+    dashboard._samples.append((0.0, {"completed": 0, "bytes": {"download": 0, "validate": 0},
+                                     "done": {"download": 0, "validate": 0},
+                                     "progress": {("STAR", "reads"): 10_000}}))
+    summary = dashboard.summary(now=10.0)
+
+    download, validate = summary["steps"]
+    assert (download["active"], download["queued"], download["done"], download["failed"]) == (2, 2, 5, 1)
+    assert (validate["active"], validate["queued"], validate["done"]) == (1, 4, 4)
+    assert download["bytes_per_second"] == 400.0
+    assert summary["jobs_per_hour"] == 1800.0
+    assert summary["progress"] == [{"tool": "STAR", "unit": "reads", "per_second": 4000.0}]
+
+    # history wins over this run's mean for download; validate falls back to the run's 2s
+    assert download["mean_seconds"] == 60.0 and validate["mean_seconds"] == 2.0
+    assert summary["eta_seconds"] == ((2 + 2 / 2) * 60.0 + (4 + 1 / 2) * 2.0) / 3
+
+
+def test_summary_eta_zero_when_all_jobs_done():
+    registry = MetricsRegistry()
+    registry.apply("inc", JOBS_COMPLETED, (), 3)
+    summary = Dashboard(registry, steps=["download"], total=3, workers=1).summary()
+
+    assert summary["eta_seconds"] == 0.0
+    assert summary["steps"][0]["queued"] == 0
+
+
+def test_render_draws_every_step():
+    console = Console(record=True, width=120)
+    dashboard = Dashboard(_registry_mid_run(), steps=["download", "validate"], total=10, workers=3)
+    console.print(dashboard.render())
+
+    text = console.export_text()
+    assert "Jobs 5/10" in text
+    assert "download" in text and "validate" in text
+    assert "ETA" in text
+    assert "STAR" in text and "reads/s" in text
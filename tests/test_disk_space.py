@@ -0,0 +1,30 @@
+import os
+from unittest.mock import MagicMock, patch
+
+from .. import disk_space
+
+
+@patch("pipeline.disk_space.shutil.disk_usage")
+def test_claims_count_against_free_space_until_released(mock_usage, tmp_path):
+    mock_usage.return_value = MagicMock(free=100)
+
+    first = disk_space.reserve(tmp_path, "SRR1", 60)
+    # both would pass a plain free-space check
+    assert disk_space.reserve(tmp_path, "SRR2", 60) is None
+
+    disk_space.release(first)
+    assert disk_space.reserve(tmp_path, "SRR2", 60) is not None
+
+
+@patch("pipeline.disk_space.shutil.disk_usage")
+def test_claims_of_exited_processes_are_dropped(mock_usage, tmp_path):
+    mock_usage.return_value = MagicMock(free=100)
+    claims = tmp_path / disk_space.CLAIMS_DIR
+    claims.mkdir()
+    # a pid above the kernel's maximum is never running
+    (claims / "SRR1.claim").write_text(f"{disk_space.socket.gethostname()} {2**22 + 1} 60\n")
+    (claims / "SRR3.claim").write_text(f"otherhost {os.getpid()} 30\n")
+
+    assert disk_space.reserve(tmp_path, "SRR2", 60) is not None
+    assert not (claims / "SRR1.claim").exists()
+    assert disk_space.reserve(tmp_path, "SRR4", 20) is None
@@ -5,7 +5,7 @@ from ..fastq_converter import FASTQConverter
 from pathlib import Path
 
 
-@patch("pipeline.fastq_converter.subprocess.run")
+@patch("pipeline.fastq_converter.run_tool")
 def test_fastq_convert_success(mock_run):
     mock_run.return_value = MagicMock(returncode=0)
 
@@ -14,12 +14,12 @@ def test_fastq_convert_success(mock_run):
 
     assert success is True
     mock_run.assert_called_once()
-    cmd = mock_run.call_args[0][0]
+    cmd = mock_run.call_args[0][1]
     assert "fasterq-dump" in cmd
     assert "SRR123456" in cmd
 
 
-@patch("pipeline.fastq_converter.subprocess.run")
+@patch("pipeline.fastq_converter.run_tool")
 def test_fastq_convert_failure(mock_run):
     mock_run.side_effect = subprocess.CalledProcessError(returncode=1, cmd="fasterq-dump")
 
@@ -27,4 +27,16 @@ def test_fastq_convert_failure(mock_run):
     success = converter.convert("SRR_FAIL_TEST")
 
     assert success is False
-    mock_run.assert_called_once()
\ No newline at end of file
+    mock_run.assert_called_once()
+
+
+def test_find_fastq_files_prefers_pairs_then_single_end(tmp_path):
+    converter = FASTQConverter(output_dir=tmp_path, threads=2)
+    assert converter.find_fastq_files("SRR1") == []
+
+    (tmp_path / "SRR1.fastq").touch()
+    assert converter.find_fastq_files("SRR1") == [tmp_path / "SRR1.fastq"]
+
+    (tmp_path / "SRR1_1.fastq").touch()
+    (tmp_path / "SRR1_2.fastq").touch()
+    assert converter.find_fastq_files("SRR1") == [tmp_path / "SRR1_1.fastq", tmp_path / "SRR1_2.fastq"]
@@ -0,0 +1,81 @@
+import os
+from unittest.mock import patch
+
+from .. import fs_index
+from ..fs_index import FsIndex
+
+
+def _tree(tmp_path):
+    (tmp_path / "sra" / "SRR1").mkdir(parents=True)
+    (tmp_path / "sra" / "SRR1" / "SRR1.sra").write_bytes(b"x")
+    (tmp_path / "fastq").mkdir()
+    return tmp_path / "sra", tmp_path / "fastq"
+
+
+def test_lookups_match_the_filesystem(tmp_path):
+    sra, fastq = _tree(tmp_path)
+    index = FsIndex([sra, fastq])
+
+    assert index.exists(sra / "SRR1" / "SRR1.sra")
+    assert index.is_file(sra / "SRR1" / "SRR1.sra")
+    assert not index.is_file(sra / "SRR1")
+    assert not index.exists(sra / "SRR2" / "SRR2.sra")
+    assert index.listdir(sra / "SRR1") == ["SRR1.sra"]
+    assert index.listdir(sra / "SRR2") is None
+    # outside the roots: answered by the filesystem
+    assert not index.covers(tmp_path / "elsewhere")
+    assert not index.exists(tmp_path / "elsewhere")
+
+
+def test_missing_accession_needs_no_filesystem_calls(tmp_path):
+    sra, fastq = _tree(tmp_path)
+    index = FsIndex([sra, fastq])
+
+    with patch("pipeline.fs_index.os.scandir") as scandir, patch("pipeline.fs_index.os.stat") as stat:
+        assert not index.exists(sra / "SRR9" / "SRR9.sra")
+        assert not index.exists(fastq / "SRR9_1.fastq")
+    scandir.assert_not_called()
+    stat.assert_not_called()
+
+
+def test_subdirectories_are_listed_once(tmp_path):
+    sra, _ = _tree(tmp_path)
+    index = FsIndex([sra])
+
+    with patch("pipeline.fs_index.os.scandir", wraps=os.scandir) as scandir:
+        for _ in range(3):
+            assert index.exists(sra / "SRR1" / "SRR1.sra")
+    assert scandir.call_count == 1
+
+
+def test_refresh_and_discard_track_changes(tmp_path):
+    sra, fastq = _tree(tmp_path)
+    index = FsIndex([sra, fastq])
+
+    # a tool creates a new accession directory and file
+    (sra / "SRR2").mkdir()
+    (sra / "SRR2" / "SRR2.sra").write_bytes(b"x")
+    assert not index.exists(sra / "SRR2" / "SRR2.sra")
+    index.refresh(sra / "SRR2")
+    assert index.is_file(sra / "SRR2" / "SRR2.sra")
+
+    # refreshing a file whose parent was never listed links the parent in too
+    (fastq / "nested").mkdir()
+    (fastq / "nested" / "R1.fastq").touch()
+    index.refresh(fastq / "nested" / "R1.fastq")
+    assert index.exists(fastq / "nested" / "R1.fastq")
+
+    (sra / "SRR1" / "SRR1.sra").unlink()
+    index.discard(sra / "SRR1" / "SRR1.sra")
+    assert index.listdir(sra / "SRR1") == []
+
+
+def test_module_functions_fall_back_without_an_index(tmp_path):
+    sra, _ = _tree(tmp_path)
+
+    assert fs_index.exists(sra / "SRR1" / "SRR1.sra")
+    assert fs_index.glob_prefix(sra, "SRR1") == [sra / "SRR1"]
+    with fs_index.indexing([sra]):
+        assert fs_index.is_file(sra / "SRR1" / "SRR1.sra")
+        assert fs_index.glob_prefix(sra, "SRR") == [sra / "SRR1"]
+    assert fs_index._index is None
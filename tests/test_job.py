@@ -3,8 +3,12 @@ from pathlib import Path
 from unittest.mock import MagicMock, patch
 import subprocess
 
+from .. import metrics
 from ..job import Job
-from ..enums import StepStatus
+from ..log_setup import ContextFilter, log_context
+from ..enums import StepStatus, PipelineStep
+from ..db.models import RunMetadataModel
+from ..shutdown import JobInterrupted
 
 
 class DummyStatus:
@@ -22,6 +26,7 @@ def mock_manifest_manager():
     dummy_status = DummyStatus()
     mock_mm = MagicMock()
     mock_mm.get_or_create_job.return_value = dummy_status
+    mock_mm.attempt_counts.return_value = {}
     return mock_mm, dummy_status
 
 
@@ -39,10 +44,12 @@ def fake_job(mock_manifest_manager):
         s3_handler=MagicMock(),
         star_runner=MagicMock()
     )
-    return job, status
+    # as in JobRunner.run, so steps bound by the job don't leak into other tests
+    with log_context(accession=job.accession):
+        yield job, status
 
 
-@patch("pipeline.job.subprocess.run")
+@patch("pipeline.job.run_tool")
 def test_run_download_success(mock_run, fake_job):
     job, status = fake_job
     job.status_checker.check_status.return_value = "Not Found"
@@ -54,8 +61,27 @@ def test_run_download_success(mock_run, fake_job):
     assert status.download_status == StepStatus.SUCCESS
     mock_run.assert_called_once()
 
+    event = job.manifest_manager.update_step_status.call_args.kwargs["event"]
+    assert event["step"] == PipelineStep.DOWNLOAD
+    assert event["ended_at"] >= event["started_at"]
 
-@patch("pipeline.job.subprocess.run", side_effect=subprocess.CalledProcessError(1, "cmd", stderr="simulated error"))
+
+@patch("pipeline.job.run_tool")
+def test_run_download_binds_step_and_attempt_to_log_records(mock_run, fake_job, caplog):
+    job, _ = fake_job
+    job.manifest_manager.attempt_counts.return_value = {PipelineStep.DOWNLOAD: 2}
+    job.status_checker.check_status.return_value = "Not Found"
+    job.status_checker.confirm_download.return_value = "Download OK!"
+
+    caplog.handler.addFilter(ContextFilter())
+    with caplog.at_level("INFO", logger="pipeline.job"):
+        job.run_download()
+
+    record = next(r for r in caplog.records if r.getMessage().startswith("Downloading"))
+    assert (record.accession, record.step, record.attempt) == ("SRR_FAKE123", "download", 3)
+
+
+@patch("pipeline.job.run_tool", side_effect=subprocess.CalledProcessError(1, "cmd", stderr="simulated error"))
 def test_run_download_failure(mock_run, fake_job):
     job, status = fake_job
     job.status_checker.check_status.return_value = "Not Found"
@@ -88,6 +114,79 @@ def test_run_validation_success(fake_job):
     assert status.validate_status == StepStatus.SUCCESS
 
 
+def test_steps_counted_active_until_they_get_a_status(fake_job):
+    job, _ = fake_job
+    registry = metrics.MetricsRegistry()
+    metrics.bind(registry)
+    try:
+        job.validator.validate.return_value = "Valid"
+        job.run_validation()
+        assert registry.value(metrics.STEPS_ACTIVE, step="validate") == 0
+
+        # a step whose tool raised never gets a status; the runner ends it
+        job.star_runner.align.side_effect = KeyboardInterrupt
+        with pytest.raises(KeyboardInterrupt):
+            job.run_alignment()
+        assert registry.value(metrics.STEPS_ACTIVE, step="align") == 1
+        job.end_open_steps()
+        assert registry.value(metrics.STEPS_ACTIVE, step="align") == 0
+    finally:
+        metrics.bind(None)
+
+
+def test_interrupted_step_is_recorded_for_recovery(fake_job):
+    job, status = fake_job
+    job.star_runner.align.side_effect = JobInterrupted("STAR stopped")
+
+    with pytest.raises(JobInterrupted):
+        job.run_alignment()
+    job.manifest_manager.update_step_status.assert_any_call(job.accession, "align", StepStatus.RUNNING)
+    # a buffered manifest must not hold the Running mark back from the recovery pass
+    job.manifest_manager.flush.assert_called()
+
+    job.interrupt_open_steps()
+    assert status.align_status == StepStatus.INTERRUPTED
+
+
+@patch("pipeline.job.run_tool")
+@patch("pipeline.disk_space.shutil.disk_usage")
+def test_run_download_refuses_run_that_will_not_fit(mock_usage, mock_run, fake_job, tmp_path):
+    job, status = fake_job
+    job.output_dir = tmp_path
+    job.status_checker.check_status.return_value = "Not Found"
+    job.run_metadata = RunMetadataModel(accession=job.accession, size_mb=100, bases=10**9)
+    mock_usage.return_value = MagicMock(free=2 * 10**9)
+
+    assert job.run_download() is False
+
+    assert status.download_status == StepStatus.FAILED
+    mock_run.assert_not_called()
+
+
+@patch("pipeline.disk_space.shutil.disk_usage")
+def test_disk_claim_is_held_until_the_fastqs_are_written(mock_usage, fake_job, tmp_path):
+    job, _ = fake_job
+    job.output_dir = tmp_path
+    job.run_metadata = RunMetadataModel(accession=job.accession, size_mb=1, bases=1000)
+    mock_usage.return_value = MagicMock(free=10**9)
+
+    assert job._reserve_disk_space()
+    claim = job._disk_claim
+    job._update_status(PipelineStep.DOWNLOAD, StepStatus.SUCCESS)
+    assert claim.exists()
+    job._update_status(PipelineStep.CONVERT, StepStatus.SUCCESS)
+    assert not claim.exists()
+
+
+@patch("pipeline.job.tool_killed", return_value="stalled")
+def test_steps_whose_tool_was_killed_time_out(mock_killed, fake_job):
+    job, status = fake_job
+    job.validator.validate.return_value = "Invalid: killed"
+
+    job.run_validation()
+
+    assert status.validate_status == StepStatus.TIMED_OUT
+
 def test_run_validation_failure(fake_job):
     job, status = fake_job
     job.validator.validate.return_value = "Invalid: something bad"
@@ -103,7 +202,7 @@ def test_run_conversion_success(mock_exists, fake_job):
     job, status = fake_job
     job.fastq_converter.convert.return_value = True
     job.fastq_converter.output_dir = Path("/fake/fastq_dir")
-    job.fastq_converter.get_fastq_paths.return_value = [Path("/fake/fastq_dir/sample_1.fastq"), Path("/fake/fastq_dir/sample_2.fastq")]
+    job.fastq_converter.find_fastq_files.return_value = [Path("/fake/fastq_dir/sample_1.fastq"), Path("/fake/fastq_dir/sample_2.fastq")]
 
     output = job.run_conversion()
 
@@ -111,6 +210,21 @@ def test_run_conversion_success(mock_exists, fake_job):
     assert all(isinstance(f, Path) for f in output)
 
 
+def test_successful_steps_record_their_outputs(fake_job, tmp_path):
+    job, _ = fake_job
+    fastq = tmp_path / "SRR_FAKE123.fastq"
+    fastq.write_text("@r1\nACGT\n+\nIIII\n")
+    job.fastq_converter.convert.return_value = True
+    job.fastq_converter.find_fastq_files.return_value = [fastq]
+
+    job.run_conversion()
+    job.write_artifacts()
+
+    [(accession, step, [row])] = [c.args for c in job.manifest_manager.record_artifacts.call_args_list]
+    assert (accession, step, row["path"], row["size"]) == ("SRR_FAKE123", "convert", str(fastq), 16)
+    assert row["digest"]
+
+
 def test_run_conversion_failure(fake_job):
     job, status = fake_job
     job.fastq_converter.convert.return_value = False
@@ -122,7 +236,7 @@ def test_run_conversion_failure(fake_job):
 
 def test_run_alignment_success(fake_job):
     job, status = fake_job
-    job.fastq_converter.get_fastq_paths.return_value = [Path("r1.fastq"), Path("r2.fastq")]
+    job.fastq_converter.find_fastq_files.return_value = [Path("r1.fastq"), Path("r2.fastq")]
     expected_outputs = [
         Path("STAR_Aligned.out.sam"),
         Path("SJ.out.tab"),
@@ -139,7 +253,7 @@ def test_run_alignment_success(fake_job):
 
 def test_run_alignment_failure(fake_job):
     job, status = fake_job
-    job.fastq_converter.get_fastq_paths.return_value = [Path("r1.fastq"), Path("r2.fastq")]
+    job.fastq_converter.find_fastq_files.return_value = [Path("r1.fastq"), Path("r2.fastq")]
     job.star_runner.align.side_effect = Exception("align boom")
 
     result = job.run_alignment()
@@ -2,12 +2,19 @@ import pytest
 from unittest.mock import MagicMock, patch
 from pathlib import Path
 from ..job_orchestrator import SRAOrchestrator
+from ..db.engine import get_session_maker
+from ..manifest_manager import ManifestManager
+from ..enums import StepStatus, PipelineStep
 from ..s3_handler import S3Handler
 from ..star_runner import STARRunner
+from ..profiling import JobProfiler, COLLAPSED_FILE
+from ..planner import WorkPlan
+from ..log_manager import LogManager
+from ..metrics import JOBS_COMPLETED
 
 
 @pytest.fixture
-def orchestrator_setup():
+def orchestrator_setup(database_url):
     mock_log_manager = MagicMock()
     mock_log_manager.load_accessions_from_file.return_value = ["SRR123456", "SRR789012"]
     mock_log_manager.write_csv_log = MagicMock()
@@ -23,6 +30,7 @@ def orchestrator_setup():
         log_manager=mock_log_manager,
         validator=MagicMock(),
         status_checker=MagicMock(),
+        database_url=database_url,
         convert_fastq=False,
         threads=4,
         max_retries=3,
@@ -50,155 +58,196 @@ def test_process_sra_lists(mock_process_batch, mock_get_sra_lists, orchestrator_
 
     mock_log_manager.load_accessions_from_file.assert_called_once_with(fake_sra_file)
     mock_process_batch.assert_called_once()
-    mock_log_manager.write_csv_log.assert_called_once()
+    mock_log_manager.open_csv_log.assert_called_once_with(Path("/fake/log.csv"))
+    csv_log = mock_log_manager.open_csv_log.return_value.__enter__.return_value
+    row = ["SRR123456", "Success", "Success", "Pending", "Pending", "Pending", "fake_list.txt"]
+    mock_process_batch.call_args.kwargs["on_result"](row)
+    csv_log.write_row.assert_called_once_with(row)
 
 
+@patch("pipeline.job_orchestrator.get_sra_lists")
 @patch("pipeline.job_orchestrator.SRAOrchestrator.process_batch")
-def test_retry_failed_with_failures(mock_process_batch, orchestrator_setup):
-    orchestrator, mock_log_manager = orchestrator_setup
-    mock_log_manager.get_failed_accessions.return_value = ["SRR_FAIL123"]
-
-    mock_process_batch.return_value = [["SRR_FAIL123", "Failed", "retry"]]
-
-    orchestrator.retry_failed()
+def test_process_sra_lists_skips_completed_accessions(mock_process_batch, mock_get_sra_lists, orchestrator_setup):
+    orchestrator, _ = orchestrator_setup
+    mock_get_sra_lists.return_value = [Path("fake_list.txt")]
+    # jobs are streamed from a spool that only lives for the batch
+    dispatched = []
+    mock_process_batch.side_effect = lambda func, args, **kwargs: dispatched.append(list(args))
 
-    mock_log_manager.write_csv_log.assert_called_once_with(
-        [["SRR_FAIL123", "Failed", "retry"]],
-        Path("/fake/log.csv")
-    )
+    both = (PipelineStep.DOWNLOAD, PipelineStep.VALIDATE)
+    orchestrator.process_sra_lists()
+    assert dispatched.pop() == [
+        ("SRR123456", "fake_list.txt", both),
+        ("SRR789012", "fake_list.txt", both),
+    ]
 
+    session = get_session_maker(orchestrator.database_url)()
+    ManifestManager(session).update_step_status("SRR123456", "download", StepStatus.SUCCESS)
+    ManifestManager(session).update_step_status("SRR123456", "validate", StepStatus.SUCCESS)
+    ManifestManager(session).update_step_status("SRR789012", "download", StepStatus.SUCCESS)
+    session.close()
 
-def test_retry_failed_with_no_failures(orchestrator_setup):
-    orchestrator, mock_log_manager = orchestrator_setup
-    mock_log_manager.get_failed_accessions.return_value = []
+    # done steps are left out of the plan each job receives
+    orchestrator.process_sra_lists()
+    assert dispatched.pop() == [
+        ("SRR789012", "fake_list.txt", (PipelineStep.VALIDATE,)),
+    ]
 
-    result = orchestrator.retry_failed()
-    assert result is None
-    mock_log_manager.write_csv_log.assert_not_called()
 
+@patch("pipeline.job_orchestrator.SRAOrchestrator.process_batch")
+def test_process_sra_lists_runs_accessions_repeated_across_lists_once(mock_process_batch, tmp_path, database_url):
+    lists = tmp_path / "lists"
+    lists.mkdir()
+    (lists / "a.txt").write_text("SRR000001\nSRR000002\nSRR000001\n")
+    (lists / "b.txt").write_text("SRR000002\nSRR000003\n")
+    orch = make_minimal_orchestrator(stages=["download"], sra_lists_dir=lists,
+                                     log_manager=LogManager(tmp_path, tmp_path), ingest_chunk_size=2,
+                                     database_url=database_url)
+    dispatched = []
+    mock_process_batch.side_effect = lambda func, args, **kwargs: dispatched.extend(args)
+
+    orch.process_sra_lists()
+
+    assert [(acc, Path(source).name) for acc, source, _ in dispatched] == [
+        ("SRR000001", "a.txt"), ("SRR000002", "a.txt"), ("SRR000003", "b.txt"),
+    ]
+    assert mock_process_batch.call_args.kwargs["total"] == 3
 
-def test_get_fastq_converter_enabled():
-    mock_log = MagicMock()
 
-    orchestrator = SRAOrchestrator(
-        output_dir=Path("/x"),
-        sra_lists_dir=Path("/x"),
-        csv_log_path=Path("/x.csv"),
-        fastq_file_dir=Path("/fastq"),
-        star_genome_dir=Path("/fake/genome"),
-        star_output_dir=Path("/fake/star_output_dir"),
-        log_manager=mock_log,
-        validator=MagicMock(),
-        status_checker=MagicMock(),
-        convert_fastq=True,
-        s3_handler=None,
-    )
+@patch("pipeline.job_orchestrator.SRAOrchestrator.process_batch")
+def test_retry_failed_with_failures(mock_process_batch, orchestrator_setup):
+    orchestrator, mock_log_manager = orchestrator_setup
+    session = get_session_maker(orchestrator.database_url)()
+    manifest = ManifestManager(session)
+    manifest.bulk_get_or_create_jobs([("SRR_FAIL123", "list.txt"), ("SRR_OK456", "list.txt")])
+    manifest.update_step_status("SRR_FAIL123", "download", StepStatus.SUCCESS)
+    manifest.update_step_status("SRR_FAIL123", "validate", StepStatus.FAILED)
+    manifest.update_step_status("SRR_OK456", "download", StepStatus.SUCCESS)
+    session.close()
 
-    converter = orchestrator._get_fastq_converter()
-    assert converter is not None
-    assert hasattr(converter, "convert")
+    orchestrator.retry_failed()
 
-
-def test_get_fastq_converter_disabled(orchestrator_setup):
-    orchestrator, _ = orchestrator_setup
-    assert orchestrator._get_fastq_converter() is None
+    assert list(mock_process_batch.call_args[0][1]) == [("SRR_FAIL123", "list.txt", (PipelineStep.VALIDATE,))]
+    mock_log_manager.get_failed_accessions.assert_not_called()
+    mock_log_manager.open_csv_log.assert_called_once_with(Path("/fake/log.csv"))
 
 
-def test_execute_job_calls_job_runner(monkeypatch, orchestrator_setup):
+@patch("pipeline.job_orchestrator.SRAOrchestrator.process_batch")
+def test_retry_failed_skips_steps_not_enabled(mock_process_batch, orchestrator_setup):
     orchestrator, _ = orchestrator_setup
+    session = get_session_maker(orchestrator.database_url)()
+    manifest = ManifestManager(session)
+    manifest.get_or_create_job("SRR_CONVERT_FAIL", "list.txt")
+    manifest.update_step_status("SRR_CONVERT_FAIL", "convert", StepStatus.FAILED)
+    session.close()
 
-    called_with = {}
-
-    class FakeJobRunner:
-        def __init__(self, **kwargs):
-            called_with['init'] = kwargs
-        def run(self, accession, source_file):
-            called_with['args'] = (accession, source_file)
-            return ["SRR123456", "Success", "Success", "fake_list.txt"]
+    # convert_fastq is off for this orchestrator
+    orchestrator.retry_failed()
+    mock_process_batch.assert_not_called()
 
-    monkeypatch.setattr("pipeline.job_orchestrator.JobRunner", FakeJobRunner)
 
-    result = orchestrator.execute_job(("SRR123456", "fake_list.txt"))
+@patch("pipeline.job_orchestrator.SRAOrchestrator.process_batch")
+def test_retry_failed_leaves_out_jobs_with_nothing_left_to_run(mock_process_batch, orchestrator_setup):
+    orchestrator, _ = orchestrator_setup
+    session = get_session_maker(orchestrator.database_url)()
+    manifest = ManifestManager(session)
+    manifest.bulk_get_or_create_jobs([("SRR_FAIL1", "list.txt"), ("SRR_FAIL2", "list.txt")])
+    for acc in ("SRR_FAIL1", "SRR_FAIL2"):
+        manifest.update_step_status(acc, "download", StepStatus.SUCCESS)
+        manifest.update_step_status(acc, "validate", StepStatus.FAILED)
+    session.close()
 
-    assert result == ["SRR123456", "Success", "Success", "fake_list.txt"]
-    assert called_with['args'] == ("SRR123456", "fake_list.txt")
+    def outputs_found(manifest, statuses):
+        statuses["SRR_FAIL2"]["validate"] = StepStatus.SUCCESS
 
+    with patch.object(orchestrator, "check_artifacts", side_effect=outputs_found):
+        orchestrator.retry_failed()
 
-import pytest
-from unittest.mock import MagicMock, patch
-from pathlib import Path
-from ..job_orchestrator import SRAOrchestrator
+    assert list(mock_process_batch.call_args[0][1]) == [("SRR_FAIL1", "list.txt", (PipelineStep.VALIDATE,))]
+    assert mock_process_batch.call_args.kwargs["total"] == 1
 
 
-@pytest.fixture
-def orchestrator_setup():
-    mock_log_manager = MagicMock()
-    mock_log_manager.load_accessions_from_file.return_value = ["SRR123456", "SRR789012"]
-    mock_log_manager.write_csv_log = MagicMock()
-    mock_log_manager.get_failed_accessions.return_value = []
-
-    orchestrator = SRAOrchestrator(
-        output_dir=Path("/fake/output"),
-        sra_lists_dir=Path("/fake/lists"),
-        csv_log_path=Path("/fake/log.csv"),
-        fastq_file_dir=Path("/fake/fastq"),
-        star_genome_dir=Path("/fake/genome"),
-        star_output_dir=Path("/fake/star_output_dir"),
-        log_manager=mock_log_manager,
-        validator=MagicMock(),
-        status_checker=MagicMock(),
-        convert_fastq=False,
-        threads=4,
-        max_retries=3,
-        batch_size=2,
-        s3_handler=None,
-    )
+def test_retry_failed_with_no_failures(orchestrator_setup):
+    orchestrator, mock_log_manager = orchestrator_setup
 
-    return orchestrator, mock_log_manager
+    result = orchestrator.retry_failed()
+    assert result is None
+    mock_log_manager.open_csv_log.assert_not_called()
+
+
+class InlinePool:
+    """Runs pool tasks in-process so results stream back deterministically."""
+    def __init__(self, processes, initializer=None):
+        pass
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+    def imap_unordered(self, func, args):
+        return map(func, args)
+    def close(self):
+        pass
+    def join(self):
+        pass
+
+
+def test_process_batch_streams_results_to_callback(orchestrator_setup):
+    orchestrator, _ = orchestrator_setup
+    orchestrator.pool_cls = InlinePool
+    orchestrator.single_writer = False
+    seen = []
 
+    results = orchestrator.process_batch(lambda x: x * 2, iter([1, 2, 3]), on_result=seen.append, total=3)
 
-@patch("pipeline.job_orchestrator.get_sra_lists")
-@patch("pipeline.job_orchestrator.SRAOrchestrator.process_batch")
-def test_process_sra_lists(mock_process_batch, mock_get_sra_lists, orchestrator_setup):
-    orchestrator, mock_log_manager = orchestrator_setup
+    assert seen == [2, 4, 6]
+    assert results == []
+    assert orchestrator.process_batch(lambda x: x + 1, [1, 2]) == [2, 3]
 
-    fake_sra_file = Path("fake_list.txt")
-    mock_get_sra_lists.return_value = [fake_sra_file]
 
-    mock_process_batch.return_value = [
-        ["SRR123456", "Success", "fake_list.txt"],
-        ["SRR789012", "Success", "fake_list.txt"]
-    ]
+def test_process_batch_profiles_jobs(orchestrator_setup, tmp_path):
+    orchestrator, _ = orchestrator_setup
+    orchestrator.pool_cls = InlinePool
+    orchestrator.single_writer = False
+    orchestrator.profiler = JobProfiler(tmp_path / "profile", mode="cprofile")
 
-    orchestrator.process_sra_lists()
+    with patch("pipeline.job_orchestrator.JobRunner") as runner_cls:
+        runner_cls.return_value.run.return_value = ["SRR000001"]
+        results = orchestrator.process_batch(orchestrator.execute_job, [("SRR000001", "list.txt", ())])
 
-    mock_log_manager.load_accessions_from_file.assert_called_once_with(fake_sra_file)
-    mock_process_batch.assert_called_once()
-    mock_log_manager.write_csv_log.assert_called_once()
+    assert results == [["SRR000001"]]
+    assert (tmp_path / "profile" / COLLAPSED_FILE).exists()
 
 
-@patch("pipeline.job_orchestrator.SRAOrchestrator.process_batch")
-def test_retry_failed_with_failures(mock_process_batch, orchestrator_setup):
-    orchestrator, mock_log_manager = orchestrator_setup
-    mock_log_manager.get_failed_accessions.return_value = ["SRR_FAIL123"]
+def test_process_batch_writes_metrics_textfile(orchestrator_setup, tmp_path):
+    orchestrator, _ = orchestrator_setup
+    orchestrator.pool_cls = InlinePool
+    orchestrator.single_writer = False
+    orchestrator.metrics_textfile = tmp_path / "pipeline.prom"
 
-    mock_process_batch.return_value = [["SRR_FAIL123", "Failed", "retry"]]
+    orchestrator.process_batch(lambda x: x, [1, 2, 3])
 
-    orchestrator.retry_failed()
+    text = orchestrator.metrics_textfile.read_text()
+    assert "sra_pipeline_jobs_completed_total 3" in text
+    assert 'sra_pipeline_queue_depth{queue="jobs"} 0' in text
+    assert orchestrator.metrics_queue is None
 
-    mock_log_manager.write_csv_log.assert_called_once_with(
-        [["SRR_FAIL123", "Failed", "retry"]],
-        Path("/fake/log.csv")
-    )
 
+def test_metrics_collector_lasts_for_the_whole_run(orchestrator_setup, tmp_path):
+    orchestrator, _ = orchestrator_setup
+    orchestrator.pool_cls = InlinePool
+    orchestrator.single_writer = False
+    orchestrator.metrics_textfile = tmp_path / "pipeline.prom"
 
-def test_retry_failed_with_no_failures(orchestrator_setup):
-    orchestrator, mock_log_manager = orchestrator_setup
-    mock_log_manager.get_failed_accessions.return_value = []
+    with orchestrator:
+        collector = orchestrator._collector
+        orchestrator.process_batch(lambda x: x, [1, 2, 3])
+        orchestrator.process_batch(lambda x: x, [4, 5])
+        # still the same collector, queue and registry between batches
+        assert orchestrator._collector is collector and orchestrator.metrics_queue is collector.queue
+        assert collector.registry.value(JOBS_COMPLETED) == 5
 
-    result = orchestrator.retry_failed()
-    assert result is None
-    mock_log_manager.write_csv_log.assert_not_called()
+    assert "sra_pipeline_jobs_completed_total 5" in orchestrator.metrics_textfile.read_text()
+    assert orchestrator.metrics_queue is None
 
 
 def test_get_fastq_converter_enabled():
@@ -214,6 +263,7 @@ def test_get_fastq_converter_enabled():
         log_manager=mock_log,
         validator=MagicMock(),
         status_checker=MagicMock(),
+        database_url="sqlite://",
         convert_fastq=True,
         s3_handler=None,
     )
@@ -236,16 +286,16 @@ def test_execute_job_calls_job_runner(monkeypatch, orchestrator_setup):
     class FakeJobRunner:
         def __init__(self, **kwargs):
             called_with['init'] = kwargs
-        def run(self, accession, source_file):
-            called_with['args'] = (accession, source_file)
+        def run(self, accession, source_file, steps):
+            called_with['args'] = (accession, source_file, steps)
             return ["SRR123456", "Success", "Success", "fake_list.txt"]
 
     monkeypatch.setattr("pipeline.job_orchestrator.JobRunner", FakeJobRunner)
 
-    result = orchestrator.execute_job(("SRR123456", "fake_list.txt"))
+    result = orchestrator.execute_job(("SRR123456", "fake_list.txt", (PipelineStep.DOWNLOAD,)))
 
     assert result == ["SRR123456", "Success", "Success", "fake_list.txt"]
-    assert called_with['args'] == ("SRR123456", "fake_list.txt")
+    assert called_with['args'] == ("SRR123456", "fake_list.txt", (PipelineStep.DOWNLOAD,))
 
 
 def make_minimal_orchestrator(**overrides):
@@ -259,6 +309,7 @@ def make_minimal_orchestrator(**overrides):
         log_manager=MagicMock(),
         validator=MagicMock(),
         status_checker=MagicMock(),
+        database_url="sqlite://",
         convert_fastq=False,
         align_star=False,
         s3_handler=False,
@@ -317,10 +368,10 @@ def test_execute_job_with_minimal_chain(monkeypatch):
             assert kwargs["fastq_converter"] is None
             assert kwargs["star_runner"] is None
             assert kwargs["s3_handler"] is None
-        def run(self, acc, src): return ["OK"]
+        def run(self, acc, src, steps): return ["OK"]
 
     monkeypatch.setattr("pipeline.job_orchestrator.JobRunner", DummyJobRunner)
-    result = orch.execute_job(("SRR123456", "source.txt"))
+    result = orch.execute_job(("SRR123456", "source.txt", ()))
     assert result == ["OK"]
 
 
@@ -337,8 +388,161 @@ def test_execute_job_with_all_tools(monkeypatch):
             assert kwargs["fastq_converter"] is not None
             assert kwargs["star_runner"] is not None
             assert kwargs["s3_handler"] is not None
-        def run(self, acc, src): return ["FullOK"]
+        def run(self, acc, src, steps): return ["FullOK"]
 
     monkeypatch.setattr("pipeline.job_orchestrator.JobRunner", DummyJobRunner)
-    result = orch.execute_job(("SRR789012", "source.txt"))
+    result = orch.execute_job(("SRR789012", "source.txt", ()))
     assert result == ["FullOK"]
+
+
+# --- stages ---
+
+def test_stages_replace_command_flags():
+    orch = make_minimal_orchestrator(stages=["align", "upload"], s3_bucket="bucket")
+
+    assert orch.enabled_steps() == [PipelineStep.ALIGN, PipelineStep.UPLOAD]
+    # alignment reads the converter's FASTQ paths and upload lists STAR's outputs
+    assert orch._get_fastq_converter() is not None
+    assert orch._get_star_runner() is not None
+    assert orch._get_s3_handler() is not None
+
+
+def test_plan_accessions_gives_each_job_its_remaining_stages(database_url):
+    orch = make_minimal_orchestrator(stages=["download", "validate", "convert"],
+                                     database_url=database_url)
+    session = get_session_maker(orch.database_url)()
+    manifest = ManifestManager(session)
+    manifest.bulk_get_or_create_jobs([("SRR1", "list.txt"), ("SRR2", "list.txt")])
+    for step in ("download", "validate", "convert"):
+        manifest.update_step_status("SRR1", step, StepStatus.SUCCESS)
+    manifest.update_step_status("SRR2", "download", StepStatus.SUCCESS)
+    session.close()
+
+    planned = orch.plan_accessions(["SRR1", "SRR2", "SRR3"], "list.txt")
+
+    assert planned == {
+        "SRR2": (PipelineStep.VALIDATE, PipelineStep.CONVERT),
+        "SRR3": (PipelineStep.DOWNLOAD, PipelineStep.VALIDATE, PipelineStep.CONVERT),
+    }
+
+
+def test_plan_accessions_redoes_steps_whose_recorded_outputs_are_gone(tmp_path, database_url):
+    orch = make_minimal_orchestrator(stages=["download", "validate", "convert", "align"],
+                                     database_url=database_url)
+    fastq = tmp_path / "SRR1_1.fastq"
+    fastq.write_text("@r1\nACGT\n+\nIIII\n")
+    session = get_session_maker(orch.database_url)()
+    manifest = ManifestManager(session)
+    manifest.bulk_get_or_create_jobs([("SRR1", "list.txt")])
+    for step in ("download", "validate", "convert"):
+        manifest.update_step_status("SRR1", step, StepStatus.SUCCESS)
+    stat = fastq.stat()
+    manifest.record_artifacts("SRR1", "convert", [
+        {"path": str(fastq), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": None},
+    ])
+
+    assert orch.plan_accessions(["SRR1"], "list.txt") == {"SRR1": (PipelineStep.ALIGN,)}
+
+    fastq.write_text("@r1\nAC")
+    assert orch.plan_accessions(["SRR1"], "list.txt") == {"SRR1": (PipelineStep.CONVERT, PipelineStep.ALIGN)}
+    assert manifest.get_statuses(["SRR1"])["SRR1"]["convert"] == StepStatus.PENDING
+    session.close()
+
+
+def test_jobs_killed_by_the_watchdog_are_requeued_in_the_same_run(tmp_path, database_url):
+    orch = make_minimal_orchestrator(stages=["download", "validate"], csv_log_path=tmp_path / "log.csv",
+                                     database_url=database_url)
+    session = get_session_maker(orch.database_url)()
+    manifest = ManifestManager(session)
+    manifest.bulk_get_or_create_jobs([("SRR1", "a.txt"), ("SRR2", "a.txt"), ("SRR3", "b.txt")])
+    # timed out in an earlier run, and not part of this batch
+    manifest.update_step_status("SRR3", "download", StepStatus.TIMED_OUT)
+    batches = []
+
+    def run_batch(func, args, on_result, **kwargs):
+        batches.append(list(args))
+        if len(batches) == 1:
+            manifest.update_step_status("SRR1", "download", StepStatus.TIMED_OUT)
+            manifest.update_step_status("SRR2", "download", StepStatus.FAILED)
+        else:
+            manifest.update_step_status("SRR1", "download", StepStatus.SUCCESS)
+        rows = {row[0]: row for row in manifest.iter_log_rows()}
+        for acc, _, _ in batches[-1]:
+            on_result(rows[acc])
+
+    with patch.object(orch, "process_batch", side_effect=run_batch):
+        orch._run_and_log(iter([("SRR1", "a.txt", ()), ("SRR2", "a.txt", ())]), total=2)
+    session.close()
+
+    # plain failures wait for retry_failed
+    assert batches[1:] == [[("SRR1", "a.txt", (PipelineStep.DOWNLOAD, PipelineStep.VALIDATE))]]
+
+
+def test_build_plan_is_read_only_and_counts_downloads_on_disk(tmp_path, database_url):
+    lists = tmp_path / "lists"
+    lists.mkdir()
+    (lists / "a.txt").write_text("SRR1\nSRR2\n")
+    log_manager = MagicMock()
+    log_manager.load_accessions_from_file.return_value = ["SRR1", "SRR2"]
+    status_checker = MagicMock()
+    status_checker.check_status.side_effect = lambda acc: "Already Exists" if acc == "SRR1" else "Missing"
+    orch = make_minimal_orchestrator(stages=["download", "validate"], sra_lists_dir=lists, output_dir=tmp_path,
+                                     log_manager=log_manager, status_checker=status_checker,
+                                     database_url=database_url)
+    session = get_session_maker(orch.database_url)()
+    manifest = ManifestManager(session)
+    manifest.bulk_get_or_create_jobs([("SRR2", "a.txt")])
+    manifest.update_step_status("SRR2", "download", StepStatus.SUCCESS)
+    session.close()
+
+    # over a read-only connection, any write (rows or schema) fails the plan
+    orch.database_url = database_url.replace("sqlite:///", "sqlite:///file:") + "?mode=ro&uri=true"
+    plan = orch.build_plan()
+
+    assert plan.stages == [PipelineStep.DOWNLOAD, PipelineStep.VALIDATE]
+    assert [(acc, steps) for acc, _, steps in plan.jobs] == [
+        ("SRR1", (PipelineStep.DOWNLOAD, PipelineStep.VALIDATE)),
+        ("SRR2", (PipelineStep.VALIDATE,)),
+    ]
+    assert plan.summary["download"]["on_disk"] == 1
+    assert plan.summary["validate"]["jobs"] == 2
+    session = get_session_maker(database_url)()
+    assert set(ManifestManager(session).get_statuses(["SRR1", "SRR2"])) == {"SRR2"}
+    session.close()
+
+
+@patch("pipeline.job_orchestrator.SRAOrchestrator._run_and_log")
+def test_execute_plan_drops_steps_completed_since_planning(mock_run, database_url):
+    orch = make_minimal_orchestrator(stages=["download", "validate"],
+                                     database_url=database_url)
+    steps = (PipelineStep.DOWNLOAD, PipelineStep.VALIDATE)
+    plan = WorkPlan(stages=steps, jobs=[("SRR1", "a.txt", steps), ("SRR2", "a.txt", steps)], summary={})
+    session = get_session_maker(orch.database_url)()
+    manifest = ManifestManager(session)
+    manifest.bulk_get_or_create_jobs([("SRR1", "a.txt")])
+    manifest.update_step_status("SRR1", "download", StepStatus.SUCCESS)
+    session.close()
+
+    orch.execute_plan(plan)
+
+    jobs = list(mock_run.call_args.args[0])
+    assert jobs == [("SRR1", "a.txt", (PipelineStep.VALIDATE,)), ("SRR2", "a.txt", steps)]
+
+
+def test_execute_plan_rejects_stages_not_enabled():
+    orch = make_minimal_orchestrator(stages=["download"])
+    plan = WorkPlan(stages=["download", "align"], jobs=[], summary={})
+
+    with pytest.raises(ValueError, match="align"):
+        orch.execute_plan(plan)
+
+
+@patch("pipeline.job_orchestrator.SRAOrchestrator.process_batch")
+def test_nothing_is_dispatched_after_a_shutdown(mock_process_batch, orchestrator_setup):
+    orchestrator, _ = orchestrator_setup
+    orchestrator.stopped = True
+
+    orchestrator._run_and_log(iter([("SRR1", "list.txt", (PipelineStep.DOWNLOAD,))]), total=1)
+    orchestrator.retry_failed()
+
+    mock_process_batch.assert_not_called()
@@ -2,7 +2,10 @@ import pytest
 from unittest.mock import MagicMock
 from pathlib import Path
 
+from .. import fs_index
+from ..enums import PipelineStep, StepStatus
 from ..job_runner import JobRunner
+from ..shutdown import JobInterrupted
 
 
 @pytest.fixture
@@ -32,27 +35,87 @@ def test_cleanup_fastq_files_removes_files(job_runner):
     job_runner._safe_unlink.assert_any_call(mock_fastq2)
 
 
-def test_cleanup_directory_skips_non_empty(job_runner):
+def test_cleanup_directory_skips_non_empty(job_runner, tmp_path):
     accession = "SRR123456"
-    mock_accession_dir = MagicMock()
-    mock_accession_dir.exists.return_value = True
-    mock_accession_dir.iterdir.return_value = iter(["something"])
+    accession_dir = tmp_path / accession
+    accession_dir.mkdir()
+    (accession_dir / "something").touch()
 
-    job_runner.output_dir = MagicMock()
-    job_runner.output_dir.__truediv__.return_value = mock_accession_dir
+    job_runner.output_dir = tmp_path
+    job_runner._cleanup_directories(accession)
+    assert accession_dir.is_dir()
+
+
+def test_cleanup_directory_removes_empty(job_runner, tmp_path):
+    accession = "SRR123456"
+    accession_dir = tmp_path / accession
+    accession_dir.mkdir()
 
+    job_runner.output_dir = tmp_path
     job_runner._cleanup_directories(accession)
-    mock_accession_dir.rmdir.assert_not_called()
+    assert not accession_dir.exists()
 
 
-def test_cleanup_directory_removes_empty(job_runner):
+def test_cleanup_directory_uses_the_filesystem_index(job_runner, tmp_path):
     accession = "SRR123456"
-    mock_accession_dir = MagicMock()
-    mock_accession_dir.exists.return_value = True
-    mock_accession_dir.iterdir.return_value = iter([])
+    (tmp_path / accession).mkdir()
 
-    job_runner.output_dir = MagicMock()
-    job_runner.output_dir.__truediv__.return_value = mock_accession_dir
+    job_runner.output_dir = tmp_path
+    with fs_index.indexing([tmp_path]) as index:
+        job_runner._cleanup_directories(accession)
+        assert not index.exists(tmp_path / accession)
+    assert not (tmp_path / accession).exists()
 
-    job_runner._cleanup_directories(accession)
-    mock_accession_dir.rmdir.assert_called_once()
\ No newline at end of file
+
+def test_run_executes_only_planned_steps(job_runner, tmp_path, monkeypatch):
+    job = MagicMock()
+    monkeypatch.setattr("pipeline.job_runner.Job", MagicMock(return_value=job))
+    job_runner.fastq_converter = MagicMock()
+    r1, r2 = tmp_path / "SRR1_1.fastq", tmp_path / "SRR1_2.fastq"
+    r1.touch()
+    r2.touch()
+    job_runner.fastq_converter.find_fastq_files.return_value = [r1, r2]
+    job.run_alignment.return_value = []
+
+    job_runner.run("SRR1", "list.txt", [PipelineStep.ALIGN])
+
+    job.run_download.assert_not_called()
+    job.run_validation.assert_not_called()
+    job.run_conversion.assert_not_called()
+    # converted in an earlier run: aligns the FASTQs already on disk
+    job.run_alignment.assert_called_once()
+
+
+def test_interrupted_job_records_its_open_step_and_returns_a_row(job_runner, monkeypatch):
+    job = MagicMock()
+    job.run_download.side_effect = JobInterrupted("prefetch stopped")
+    job.to_log_row.return_value = ["SRR1", "Interrupted"]
+    monkeypatch.setattr("pipeline.job_runner.Job", MagicMock(return_value=job))
+
+    assert job_runner.run("SRR1", "list.txt", [PipelineStep.DOWNLOAD, PipelineStep.VALIDATE]) == ["SRR1", "Interrupted"]
+
+    job.interrupt_open_steps.assert_called_once()
+    job.run_validation.assert_not_called()
+
+
+@pytest.mark.parametrize("steps, align_status, uploads", [
+    # align planned but no FASTQs this run: whatever is in the output dir is a failed STAR's leftovers
+    ([PipelineStep.CONVERT, PipelineStep.ALIGN, PipelineStep.UPLOAD], StepStatus.PENDING, False),
+    ([PipelineStep.UPLOAD], StepStatus.FAILED, False),
+    ([PipelineStep.UPLOAD], StepStatus.SUCCESS, True),
+])
+def test_upload_only_takes_outputs_of_a_successful_earlier_alignment(job_runner, monkeypatch, tmp_path,
+                                                                       steps, align_status, uploads):
+    job = MagicMock(align_status=align_status)
+    job.run_conversion.return_value = []
+    monkeypatch.setattr("pipeline.job_runner.Job", MagicMock(return_value=job))
+    job_runner.fastq_converter = MagicMock()
+    job_runner.fastq_converter.find_fastq_files.return_value = []
+    job_runner.s3_handler = MagicMock()
+    job_runner.star_runner.output_files.return_value = [tmp_path / "SRR1_" / "Aligned.sortedByCoord.out.bam"]
+    job.upload_status = StepStatus.PENDING
+
+    job_runner.run("SRR1", "list.txt", steps)
+
+    job.run_alignment.assert_not_called()
+    assert job.run_upload.called == uploads
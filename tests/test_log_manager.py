@@ -50,7 +50,7 @@ def test_load_accessions_from_file(tmp_path):
     file = tmp_path / "accessions.txt"
     file.write_text("SRR000001\nSRR000002\n\n")
     log_manager = LogManager(csv_log_dir=tmp_path, python_log_dir=tmp_path)
-    accessions = log_manager.load_accessions_from_file(file)
+    accessions = list(log_manager.load_accessions_from_file(file))
     assert accessions == ["SRR000001", "SRR000002"]
 
 
@@ -78,4 +78,18 @@ def test_get_failed_accessions_missing_log_file(tmp_path, caplog):
         failed = log_manager.get_failed_accessions(log_path)
 
     assert failed == []
-    assert f"Log file does not exist: {log_path}" in caplog.text
\ No newline at end of file
+    assert f"Log file does not exist: {log_path}" in caplog.text
+
+
+def test_csv_log_writer_appends_rows_as_written(tmp_path):
+    log_manager = LogManager(csv_log_dir=tmp_path, python_log_dir=tmp_path)
+    log_path = log_manager.generate_csv_log()
+
+    with log_manager.open_csv_log(log_path) as csv_log:
+        csv_log.write_row(["SRR000001", "Success", "Success", "Pending", "Pending", "Pending", "a.txt"])
+        # visible on disk before the writer is closed
+        assert log_path.read_text().splitlines()[1].startswith("SRR000001,Success")
+        csv_log.write_row(["SRR000002", "Failed", "Pending", "Pending", "Pending", "Pending", "a.txt"])
+
+    assert csv_log.rows_written == 2
+    assert len(log_path.read_text().splitlines()) == 3
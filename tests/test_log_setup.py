@@ -1,6 +1,8 @@
+import json
 import logging
+import multiprocessing
 import pytest
-from ..log_setup import setup_logging
+from ..log_setup import setup_logging, stop_logging, log_context, log_subprocess_output
 
 
 def test_setup_logging_creates_log_file_and_logs(tmp_path):
@@ -9,6 +11,7 @@ def test_setup_logging_creates_log_file_and_logs(tmp_path):
 
     logger = logging.getLogger()
     logger.info("This is a test log message.")
+    stop_logging()  # records are written by the listener thread; drain it
 
     assert log_path.exists()
 
@@ -16,4 +19,82 @@ def test_setup_logging_creates_log_file_and_logs(tmp_path):
         contents = f.read()
 
     assert "This is a test log message." in contents
-    assert "Logging system initialized" in contents
\ No newline at end of file
+    assert "Logging system initialized" in contents
+
+
+def _log_from_worker(n):
+    logging.getLogger("worker").info(f"worker record {n}")
+    return n
+
+
+def test_worker_records_reach_file_through_queue(tmp_path):
+    log_path = tmp_path / "pipeline.log"
+    setup_logging(log_path)
+
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(2) as pool:
+        pool.map(_log_from_worker, range(20))
+        pool.close()
+        pool.join()
+    stop_logging()
+
+    lines = [line for line in log_path.read_text().splitlines() if "worker record" in line]
+    assert len(lines) == 20
+    assert all(line.split(" ", 2)[2].startswith("[INFO] worker record ") for line in lines)
+
+
+def test_json_file_records_carry_job_context(tmp_path):
+    log_path = tmp_path / "pipeline.log"
+    setup_logging(log_path, json_format=True)
+
+    with log_context(accession="SRR000001", step="download", attempt=2):
+        logging.getLogger("pipeline.job").info("Downloading SRR000001...")
+    logging.getLogger("pipeline.job").info("outside any job")
+    stop_logging()
+
+    entries = [json.loads(line) for line in log_path.read_text().splitlines()]
+    inside = next(e for e in entries if e["message"] == "Downloading SRR000001...")
+    outside = next(e for e in entries if e["message"] == "outside any job")
+
+    assert inside["accession"] == "SRR000001"
+    assert inside["step"] == "download"
+    assert inside["attempt"] == 2
+    assert inside["worker"] == "MainProcess"
+    assert "accession" not in outside
+
+
+def test_log_subprocess_output_collapses_repetitive_lines(caplog):
+    logger = logging.getLogger("pipeline.test")
+    output = "\n".join(
+        ["starting"] + [f"{i}% done, {i * 10} bytes" for i in range(100)] + ["finished OK"]
+    )
+
+    with caplog.at_level(logging.DEBUG, logger="pipeline.test"):
+        kept = log_subprocess_output(logger, "tool stdout", output)
+
+    assert kept == 3
+    assert len(caplog.records) == 1
+    message = caplog.records[0].getMessage()
+    assert "(99 of 102 lines suppressed)" in message
+    assert "starting" in message and "finished OK" in message
+
+
+def test_log_subprocess_output_keeps_head_and_tail(caplog):
+    logger = logging.getLogger("pipeline.test")
+    output = "\n".join(f"line {chr(97 + i)}" for i in range(20))
+
+    with caplog.at_level(logging.DEBUG, logger="pipeline.test"):
+        kept = log_subprocess_output(logger, "tool stderr", output, head=2, tail=2)
+
+    message = caplog.records[0].getMessage()
+    assert kept == 4
+    assert "line a" in message and "line t" in message
+    assert "line j" not in message
+    assert "16 distinct lines omitted" in message
+
+
+def test_log_subprocess_output_skips_disabled_levels(caplog):
+    logger = logging.getLogger("pipeline.test")
+    with caplog.at_level(logging.INFO, logger="pipeline.test"):
+        assert log_subprocess_output(logger, "tool stdout", "noise\n" * 1000) == 0
+    assert not caplog.records
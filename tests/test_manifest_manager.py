@@ -0,0 +1,257 @@
+import time
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event, text
+
+from ..db.models import JobModel, StepEventModel, ToolRunModel
+from ..db.views import create_views
+from ..manifest_manager import ManifestManager
+from ..enums import StepStatus, PipelineStatus, PipelineStep
+
+
+def test_get_or_create_job_creates_pending_row(session):
+    manager = ManifestManager(session)
+    job = manager.get_or_create_job("SRR000001", "list.txt")
+
+    assert job.download_status == StepStatus.PENDING
+    assert job.pipeline_status == PipelineStatus.PENDING
+    assert manager.get_or_create_job("SRR000001", "other.txt").source_file == "list.txt"
+
+
+def test_update_step_status_derives_pipeline_status(session):
+    manager = ManifestManager(session)
+    manager.get_or_create_job("SRR000001", "list.txt")
+
+    manager.update_step_status("SRR000001", "download", StepStatus.FAILED)
+
+    job = session.query(JobModel).filter_by(accession="SRR000001").one()
+    assert job.download_status == StepStatus.FAILED
+    assert job.pipeline_status == PipelineStatus.FAILED
+
+
+def test_bulk_get_or_create_jobs_returns_status_map(session):
+    manager = ManifestManager(session)
+    manager.get_or_create_job("SRR000001", "old.txt")
+    manager.update_step_status("SRR000001", "download", StepStatus.SUCCESS)
+
+    statuses = manager.bulk_get_or_create_jobs(
+        [("SRR000001", "list.txt"), ("SRR000002", "list.txt"), ("SRR000002", "dup.txt")]
+    )
+
+    assert set(statuses) == {"SRR000001", "SRR000002"}
+    assert statuses["SRR000001"]["download"] == StepStatus.SUCCESS
+    assert statuses["SRR000002"]["download"] == StepStatus.PENDING
+
+    # existing rows are left alone
+    assert session.query(JobModel).filter_by(accession="SRR000001").one().source_file == "old.txt"
+    assert session.query(JobModel).count() == 2
+
+
+def test_bulk_get_or_create_jobs_batches_statements(session):
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, stmt, *args: statements.append(stmt))
+
+    accessions = [(f"SRR{i:06d}", "list.txt") for i in range(1200)]
+    statuses = ManifestManager(session).bulk_get_or_create_jobs(accessions)
+
+    assert len(statuses) == 1200
+    assert len([s for s in statements if s.startswith("INSERT")]) <= 3
+    assert len([s for s in statements if s.startswith("SELECT")]) <= 3
+
+
+def test_buffered_updates_coalesce_into_one_commit(session):
+    manager = ManifestManager(session, buffered=True, flush_interval=60, flush_size=10)
+    manager.get_or_create_job("SRR000001", "list.txt")
+    commits_before = manager.stats["commits"]
+
+    manager.update_step_status("SRR000001", "download", StepStatus.SUCCESS)
+    manager.update_step_status("SRR000001", "validate", StepStatus.SUCCESS)
+    manager.update_step_status("SRR000001", "convert", StepStatus.FAILED)
+    assert manager.stats["commits"] == commits_before
+
+    manager.close()
+
+    job = session.query(JobModel).filter_by(accession="SRR000001").one()
+    assert job.validate_status == StepStatus.SUCCESS
+    assert job.convert_status == StepStatus.FAILED
+    assert job.pipeline_status == PipelineStatus.FAILED
+    assert manager.stats["commits"] == commits_before + 1
+    assert manager.stats["updates"] == 3
+
+
+def test_buffered_updates_flush_at_size_threshold(session):
+    manager = ManifestManager(session, buffered=True, flush_interval=60, flush_size=2)
+    manager.bulk_get_or_create_jobs([("SRR000001", "list.txt"), ("SRR000002", "list.txt")])
+
+    manager.update_step_status("SRR000001", "download", StepStatus.SUCCESS)
+    assert manager.stats["flushes"] == 0
+    manager.update_step_status("SRR000002", "download", StepStatus.SUCCESS)
+    assert manager.stats["flushes"] == 1
+
+
+def test_buffered_updates_flush_at_the_next_write_after_the_interval(session):
+    manager = ManifestManager(session, buffered=True, flush_interval=0.05, flush_size=100)
+    manager.get_or_create_job("SRR000001", "list.txt")
+
+    manager.update_step_status("SRR000001", "download", StepStatus.RUNNING)
+    time.sleep(0.1)
+    # nothing writes behind the caller's back: the session is not thread-safe
+    assert manager.stats["flushes"] == 0
+
+    manager.update_step_status("SRR000001", "download", StepStatus.SUCCESS)
+    assert manager.stats["flushes"] == 1
+
+
+@pytest.mark.parametrize("buffered", [False, True])
+def test_record_artifacts_replaces_a_steps_earlier_record(session, buffered):
+    manager = ManifestManager(session, buffered=buffered, flush_interval=60)
+    row = {"path": "/fastq/SRR000001_1.fastq", "size": 10, "mtime_ns": 1, "digest": None}
+
+    manager.record_artifacts("SRR000001", "convert", [row, {**row, "path": "/fastq/SRR000001_2.fastq"}])
+    manager.record_artifacts("SRR000001", "convert", [{**row, "digest": "ab"}])
+    manager.record_artifacts("SRR000001", "download", [{**row, "path": "/sra/SRR000001.sra"}])
+    manager.close()
+
+    artifacts = manager.get_artifacts(["SRR000001", "SRR000002"])
+    assert artifacts == {"SRR000001": {
+        "convert": [{**row, "digest": "ab"}],
+        "download": [{**row, "path": "/sra/SRR000001.sra"}],
+    }}
+
+
+def test_timed_out_steps_fail_the_job_and_can_be_selected_alone(session):
+    manager = ManifestManager(session)
+    manager.bulk_get_or_create_jobs([("SRR000001", "list.txt"), ("SRR000002", "list.txt")])
+    manager.update_step_status("SRR000001", "download", StepStatus.TIMED_OUT)
+    manager.update_step_status("SRR000002", "download", StepStatus.FAILED)
+
+    job = session.query(JobModel).filter_by(accession="SRR000001").one()
+    assert job.pipeline_status == PipelineStatus.FAILED
+    assert len(manager.get_retry_jobs(["download"])) == 2
+    assert manager.get_retry_jobs(["download"], failed_statuses=[StepStatus.TIMED_OUT]) == [
+        ("SRR000001", "list.txt", "download"),
+    ]
+    assert manager.get_retry_jobs(["download"], accessions=["SRR000002"]) == [("SRR000002", "list.txt", "download")]
+
+
+def make_event(step, seconds, bytes_out=None):
+    started = datetime(2025, 1, 1, 12, 0, tzinfo=timezone.utc)
+    return {
+        "step": step,
+        "started_at": started,
+        "ended_at": started + timedelta(seconds=seconds),
+        "duration_seconds": seconds,
+        "bytes_out": bytes_out,
+        "host": "node-1",
+    }
+
+
+def test_step_events_number_attempts(session):
+    manager = ManifestManager(session)
+    manager.get_or_create_job("SRR000001", "list.txt")
+
+    manager.update_step_status("SRR000001", "download", StepStatus.FAILED,
+                               event=make_event(PipelineStep.DOWNLOAD, 5))
+    manager.update_step_status("SRR000001", "download", StepStatus.SUCCESS,
+                               event=make_event(PipelineStep.DOWNLOAD, 7, bytes_out=1024))
+
+    events = session.query(StepEventModel).order_by(StepEventModel.id).all()
+    assert [e.attempt for e in events] == [1, 2]
+    assert [e.status for e in events] == [StepStatus.FAILED, StepStatus.SUCCESS]
+    assert events[1].bytes_out == 1024
+
+
+def test_tool_runs_stored_with_their_step_attempt(session):
+    manager = ManifestManager(session)
+    manager.get_or_create_job("SRR000001", "list.txt")
+    usage = {"tool": "prefetch", "exit_code": 0, "wall_seconds": 3.0, "user_cpu_seconds": 1.5,
+             "sys_cpu_seconds": 0.5, "max_rss_kb": 20480, "read_bytes": 0, "write_bytes": 4096}
+
+    manager.update_step_status("SRR000001", "download", StepStatus.FAILED,
+                               event=make_event(PipelineStep.DOWNLOAD, 5))
+    manager.update_step_status("SRR000001", "download", StepStatus.SUCCESS,
+                               event={**make_event(PipelineStep.DOWNLOAD, 3), "tools": [usage]})
+
+    run = session.query(ToolRunModel).one()
+    assert (run.tool, run.step, run.attempt, run.host) == ("prefetch", PipelineStep.DOWNLOAD, 2, "node-1")
+    assert run.max_rss_kb == 20480 and run.write_bytes == 4096
+
+
+def test_buffered_step_events_written_on_flush(session):
+    manager = ManifestManager(session, buffered=True, flush_interval=60)
+    manager.get_or_create_job("SRR000001", "list.txt")
+
+    manager.update_step_status("SRR000001", "download", StepStatus.SUCCESS,
+                               event=make_event(PipelineStep.DOWNLOAD, 5))
+    assert session.query(StepEventModel).count() == 0
+
+    manager.close()
+    assert session.query(StepEventModel).one().step == PipelineStep.DOWNLOAD
+
+
+def test_step_duration_view_percentiles(session):
+    create_views(session.get_bind())
+    manager = ManifestManager(session)
+    manager.get_or_create_job("SRR000001", "list.txt")
+
+    for seconds in range(1, 21):
+        manager.update_step_status("SRR000001", "align", StepStatus.SUCCESS,
+                                   event=make_event(PipelineStep.ALIGN, float(seconds)))
+
+    row = session.execute(text("SELECT runs, p50_seconds, p95_seconds FROM step_durations")).one()
+    assert row == (20, 10.0, 19.0)
+
+
+def test_mean_step_durations_ignores_failed_runs(session):
+    manager = ManifestManager(session)
+    manager.get_or_create_job("SRR000001", "list.txt")
+
+    for seconds, status in [(10.0, StepStatus.SUCCESS), (20.0, StepStatus.SUCCESS), (500.0, StepStatus.FAILED)]:
+        manager.update_step_status("SRR000001", "align", status, event=make_event(PipelineStep.ALIGN, seconds))
+
+    assert manager.mean_step_durations() == {"align": 15.0}
+
+
+def test_step_cost_history_spreads_cpu_over_all_attempts(session):
+    manager = ManifestManager(session)
+    manager.get_or_create_job("SRR000001", "list.txt")
+    usage = {"tool": "STAR", "exit_code": 0, "wall_seconds": 10.0, "user_cpu_seconds": 35.0,
+             "sys_cpu_seconds": 5.0, "max_rss_kb": 1, "read_bytes": 0, "write_bytes": 0}
+
+    manager.update_step_status("SRR000001", "align", StepStatus.FAILED,
+                               event={**make_event(PipelineStep.ALIGN, 100), "tools": [usage]})
+    manager.update_step_status("SRR000001", "align", StepStatus.SUCCESS,
+                               event={**make_event(PipelineStep.ALIGN, 20, bytes_out=500), "tools": [usage]})
+
+    assert manager.step_cost_history() == {
+        "align": {"seconds": 20.0, "bytes_in": None, "bytes_out": 500.0, "cpu_seconds": 40.0},
+    }
+
+
+def test_get_retry_jobs_reports_first_failed_step_and_respects_attempts(session):
+    manager = ManifestManager(session)
+    manager.bulk_get_or_create_jobs([("SRR000001", "a.txt"), ("SRR000002", "b.txt"), ("SRR000003", "c.txt")])
+    manager.update_step_status("SRR000001", "download", StepStatus.SUCCESS)
+    manager.update_step_status("SRR000001", "convert", StepStatus.FAILED)
+    manager.update_step_status("SRR000001", "upload", StepStatus.FAILED)
+    for _ in range(3):
+        manager.update_step_status("SRR000002", "download", StepStatus.FAILED,
+                                   event=make_event(PipelineStep.DOWNLOAD, 1))
+
+    steps = ["download", "validate", "convert"]
+    assert manager.get_retry_jobs(steps) == [
+        ("SRR000001", "a.txt", "convert"),
+        ("SRR000002", "b.txt", "download"),
+    ]
+    assert manager.get_retry_jobs(steps, max_attempts=3) == [("SRR000001", "a.txt", "convert")]
+    assert manager.get_retry_jobs(["download"]) == [("SRR000002", "b.txt", "download")]
+
+
+def test_iter_log_rows_matches_csv_header(session):
+    manager = ManifestManager(session)
+    manager.get_or_create_job("SRR000001", "a.txt")
+    manager.update_step_status("SRR000001", "download", StepStatus.SUCCESS)
+
+    rows = list(manager.iter_log_rows())
+    assert rows == [["SRR000001", "Success", "Pending", "Pending", "Pending", "Pending", "a.txt"]]
@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+from sqlalchemy import text
+
+from ..db.engine import get_session_maker, is_sqlite_file
+from ..db.models import JobModel, StepEventModel
+from ..enums import PipelineStatus, PipelineStep, StepStatus
+from ..manifest_manager import ManifestManager, QueuedManifestManager
+from ..manifest_writer import ManifestWriter
+
+
+def test_is_sqlite_file():
+    assert is_sqlite_file("sqlite:////tmp/manifest.db")
+    assert not is_sqlite_file("sqlite://")
+    assert not is_sqlite_file("sqlite:///:memory:")
+    assert not is_sqlite_file("postgresql://user@host/db")
+
+
+def test_sqlite_engine_uses_wal_and_busy_timeout(database_url):
+    session = get_session_maker(database_url)()
+
+    assert session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+    assert session.execute(text("PRAGMA busy_timeout")).scalar() == 30000
+    session.close()
+
+
+def test_writer_applies_queued_writes(database_url):
+    session = get_session_maker(database_url)()
+    ManifestManager(session).get_or_create_job("SRR000001", "list.txt")
+
+    with ManifestWriter(database_url, flush_interval=0.1) as writer:
+        worker = QueuedManifestManager(session, writer.queue)
+        job = worker.get_or_create_job("SRR000002", "list.txt")
+        assert job.download_status == StepStatus.PENDING
+
+        worker.update_step_status("SRR000001", "download", StepStatus.SUCCESS,
+                                  event={"step": PipelineStep.DOWNLOAD,
+                                         "started_at": datetime.now(timezone.utc),
+                                         "ended_at": datetime.now(timezone.utc)})
+        worker.update_step_status("SRR000002", "download", StepStatus.FAILED)
+
+    session.expire_all()
+    rows = {job.accession: job for job in session.query(JobModel).all()}
+    assert rows["SRR000001"].download_status == StepStatus.SUCCESS
+    assert rows["SRR000002"].pipeline_status == PipelineStatus.FAILED
+    assert session.query(StepEventModel).count() == 1
+    assert writer.stats["updates"] == 2
+    session.close()
+
@@ -0,0 +1,61 @@
+from urllib.request import urlopen
+import multiprocessing
+
+from .. import metrics
+from ..metrics import (
+    MetricsCollector, MetricsRegistry, QueueSink,
+    STEP_RESULTS, STEP_DURATION, STEP_BYTES, ACTIVE_SUBPROCESSES,
+)
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry(buckets=(1, 10))
+    metrics.bind(registry)
+    try:
+        metrics.record_step("download", "Success", {"duration_seconds": 4.0, "bytes_out": 2048})
+        metrics.record_step("download", "Failed", {"duration_seconds": 0.5})
+    finally:
+        metrics.bind(None)
+
+    text = registry.render()
+    assert f"# TYPE {STEP_RESULTS} counter" in text
+    assert f'{STEP_RESULTS}{{status="Success",step="download"}} 1' in text
+    assert f'{STEP_BYTES}{{direction="out",step="download"}} 2048' in text
+    assert f'{STEP_DURATION}_bucket{{step="download",le="1"}} 1' in text
+    assert f'{STEP_DURATION}_bucket{{step="download",le="10"}} 2' in text
+    assert f'{STEP_DURATION}_bucket{{step="download",le="+Inf"}} 2' in text
+    assert f'{STEP_DURATION}_sum{{step="download"}} 4.5' in text
+    assert f'{STEP_DURATION}_count{{step="download"}} 2' in text
+
+
+def test_unbound_calls_are_noops():
+    metrics.bind(None)
+    metrics.inc(STEP_RESULTS, step="download", status="Success")
+    with metrics.track_subprocess("prefetch"):
+        pass
+
+
+def _worker_job(queue):
+    metrics.bind(QueueSink(queue))
+    with metrics.track_subprocess("prefetch"):
+        metrics.record_step("download", "Success", {"duration_seconds": 2.0, "bytes_out": 100})
+    return True
+
+
+def test_collector_sums_worker_metrics(tmp_path):
+    textfile = tmp_path / "pipeline.prom"
+    with MetricsCollector(port=0, textfile=textfile, interval=0.05) as collector:
+        with multiprocessing.get_context("fork").Pool(4) as pool:
+            pool.map(_worker_job, [collector.queue] * 20)
+            pool.close()
+            pool.join()
+        port = collector._server.server_port
+        with urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            scraped = response.read().decode()
+
+    registry = collector.registry
+    assert registry.value(STEP_RESULTS, step="download", status="Success") == 20
+    assert registry.value(STEP_BYTES, step="download", direction="out") == 2000
+    assert registry.value(ACTIVE_SUBPROCESSES, tool="prefetch") == 0
+    assert f"# TYPE {STEP_RESULTS} counter" in scraped
+    assert f'{STEP_RESULTS}{{status="Success",step="download"}} 20' in textfile.read_text()
@@ -0,0 +1,71 @@
+import pytest
+
+from ..db.models import RunMetadataModel
+from ..enums import PipelineStep
+from ..planner import WorkPlan, estimate, format_summary
+
+
+HISTORY = {
+    "download": {"seconds": 60.0, "bytes_in": None, "bytes_out": 1000.0, "cpu_seconds": 30.0},
+    "validate": {"seconds": 36.0, "bytes_in": 1000.0, "bytes_out": None, "cpu_seconds": 36.0},
+}
+
+
+def test_estimate_scales_history_by_jobs_and_skips_downloads_on_disk():
+    steps = (PipelineStep.DOWNLOAD, PipelineStep.VALIDATE, PipelineStep.CONVERT)
+    jobs = [("SRR1", "a.txt", steps), ("SRR2", "a.txt", steps), ("SRR3", "a.txt", (PipelineStep.VALIDATE,))]
+
+    summary = estimate(jobs, HISTORY, on_disk={"SRR1"})
+
+    assert summary["download"] == {"jobs": 2, "on_disk": 1, "bytes": 1000,
+                                   "job_hours": pytest.approx(60 / 3600), "core_hours": pytest.approx(30 / 3600)}
+    assert summary["validate"]["bytes"] == 3000
+    assert summary["validate"]["core_hours"] == pytest.approx(0.03)
+    assert summary["convert"] == {"jobs": 2, "on_disk": 0, "bytes": None, "job_hours": None, "core_hours": None}
+    assert "align" not in summary
+
+
+def test_estimate_takes_bytes_from_run_metadata_where_known():
+    steps = (PipelineStep.DOWNLOAD, PipelineStep.CONVERT)
+    jobs = [("SRR1", "a.txt", steps), ("SRR2", "a.txt", steps)]
+    metadata = {"SRR1": RunMetadataModel(accession="SRR1", size_mb=1, bases=1000)}
+
+    summary = estimate(jobs, HISTORY, metadata=metadata)
+
+    # SRR2 has no metadata: the historical mean stands in for it
+    assert summary["download"]["bytes"] == 1024 * 1024 + 1000
+    # no history for convert, so without SRR2's size the total is unknown
+    assert summary["convert"]["bytes"] is None
+    assert estimate(jobs[:1], {}, metadata=metadata)["convert"]["bytes"] == 2200
+
+
+def test_plan_round_trips_through_json(tmp_path):
+    steps = (PipelineStep.DOWNLOAD, PipelineStep.VALIDATE)
+    plan = WorkPlan(stages=list(steps), jobs=[("SRR1", "a.txt", steps)], summary=estimate([("SRR1", "a.txt", steps)], HISTORY))
+    path = tmp_path / "plan.json"
+
+    plan.save(path)
+    loaded = WorkPlan.load(path)
+
+    assert loaded.to_dict() == plan.to_dict()
+    assert loaded.jobs == [("SRR1", "a.txt", steps)]
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_load_rejects_other_plan_versions(tmp_path):
+    path = tmp_path / "plan.json"
+    path.write_text('{"version": 99}')
+
+    with pytest.raises(ValueError, match="version 99"):
+        WorkPlan.load(path)
+
+
+def test_format_summary_lists_steps_and_wall_clock():
+    steps = (PipelineStep.DOWNLOAD,)
+    plan = WorkPlan(stages=list(steps), jobs=[("SRR1", "a.txt", steps)] * 2,
+                    summary=estimate([("SRR1", "a.txt", steps)] * 120, HISTORY))
+
+    text = format_summary(plan, workers=2)
+
+    assert text.splitlines()[1].split()[:2] == ["download", "120"]
+    assert "about 1.0 h wall-clock at 2 parallel jobs" in text
@@ -0,0 +1,45 @@
+import pytest
+
+from ..profiling import JobProfiler, COLLAPSED_FILE, MERGED_PSTATS_FILE, read_collapsed
+
+
+def _busy_work(n):
+    total = 0
+    for _ in range(3):
+        total += sum(i * i for i in range(n))
+    return total
+
+
+def test_sampler_writes_worker_and_merged_collapsed_stacks(tmp_path):
+    profiler = JobProfiler(tmp_path / "profile", mode="sample", interval=0.001)
+
+    assert profiler.run(_busy_work, 300_000) > 0
+    path = profiler.merge()
+
+    assert path == tmp_path / "profile" / COLLAPSED_FILE
+    assert list((tmp_path / "profile").glob("worker-*.collapsed"))
+    stacks = read_collapsed(path)
+    assert any("test_profiling._busy_work" in stack for stack in stacks)
+    assert all(count > 0 for count in stacks.values())
+
+
+def test_cprofile_mode_merges_pstats_into_collapsed_stacks(tmp_path):
+    profiler = JobProfiler(tmp_path / "profile", mode="cprofile")
+
+    profiler.run(_busy_work, 50_000)
+    profiler.run(_busy_work, 50_000)
+    path = profiler.merge()
+
+    assert (tmp_path / "profile" / MERGED_PSTATS_FILE).exists()
+    stacks = read_collapsed(path)
+    busy = [stack for stack in stacks if stack.split(";")[-1].endswith("<genexpr>")]
+    assert busy and any("test_profiling._busy_work" in stack for stack in busy)
+
+
+def test_merge_without_profiles_returns_none(tmp_path):
+    assert JobProfiler(tmp_path, mode="sample").merge() is None
+
+
+def test_unknown_mode_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Unknown profile mode"):
+        JobProfiler(tmp_path, mode="perf")
@@ -0,0 +1,69 @@
+import pytest
+
+from ..enums import PipelineStep, StepStatus
+from ..manifest_manager import ManifestManager
+from ..recovery import RecoveryPass
+
+
+@pytest.fixture
+def manifest(session):
+    return ManifestManager(session)
+
+
+@pytest.fixture
+def recovery(tmp_path):
+    for name in ("sra", "fastq", "star"):
+        (tmp_path / name).mkdir()
+    return RecoveryPass(output_dir=tmp_path / "sra", fastq_dir=tmp_path / "fastq", star_output_dir=tmp_path / "star")
+
+
+def _job(manifest, accession, **statuses):
+    manifest.get_or_create_job(accession, "list.txt")
+    for step, status in statuses.items():
+        manifest.update_step_status(accession, step, status)
+
+
+def test_interrupted_conversion_resumes_from_verified_download(manifest, recovery, tmp_path):
+    _job(manifest, "SRR1", download=StepStatus.SUCCESS, validate=StepStatus.SUCCESS, convert=StepStatus.INTERRUPTED)
+    (tmp_path / "sra" / "SRR1").mkdir()
+    (tmp_path / "sra" / "SRR1" / "SRR1.sra").write_bytes(b"sra")
+    partial = tmp_path / "fastq" / "SRR1_1.fastq"
+    partial.write_text("@partial")
+
+    assert recovery.run(manifest) == {"jobs": 1, "reset_steps": 1}
+
+    assert not partial.exists()
+    statuses = manifest.get_statuses(["SRR1"])["SRR1"]
+    assert (statuses["download"], statuses["validate"], statuses["convert"]) == (
+        StepStatus.SUCCESS, StepStatus.SUCCESS, StepStatus.PENDING)
+
+
+def test_outputs_missing_upstream_are_redone(manifest, recovery):
+    # the process died mid-conversion after the .sra had gone missing
+    _job(manifest, "SRR1", download=StepStatus.SUCCESS, validate=StepStatus.SUCCESS, convert=StepStatus.RUNNING)
+
+    resets = recovery.resets("SRR1", manifest.get_statuses(["SRR1"])["SRR1"])
+
+    assert resets == [PipelineStep.CONVERT, PipelineStep.VALIDATE, PipelineStep.DOWNLOAD]
+
+
+def test_interrupted_alignment_removes_star_output_and_keeps_fastqs(manifest, recovery, tmp_path):
+    _job(manifest, "SRR1", download=StepStatus.SUCCESS, validate=StepStatus.SUCCESS,
+         convert=StepStatus.SUCCESS, align=StepStatus.RUNNING)
+    (tmp_path / "fastq" / "SRR1_1.fastq").touch()
+    (tmp_path / "fastq" / "SRR1_2.fastq").touch()
+    (tmp_path / "star" / "SRR1_" / "_STARtmp").mkdir(parents=True)
+
+    resets = recovery.resets("SRR1", manifest.get_statuses(["SRR1"])["SRR1"])
+
+    assert resets == [PipelineStep.ALIGN]
+    assert not (tmp_path / "star" / "SRR1_").exists()
+
+
+def test_interrupted_upload_resumes_with_what_is_left(manifest, recovery):
+    _job(manifest, "SRR1", **{step.value: StepStatus.SUCCESS for step in PipelineStep if step != PipelineStep.UPLOAD},
+         upload=StepStatus.INTERRUPTED)
+    _job(manifest, "SRR2", download=StepStatus.SUCCESS)
+
+    assert set(manifest.get_stopped_jobs()) == {"SRR1"}
+    assert recovery.resets("SRR1", manifest.get_stopped_jobs()["SRR1"]) == [PipelineStep.UPLOAD]
@@ -0,0 +1,51 @@
+from pathlib import Path
+import csv
+from typer.testing import CliRunner
+
+from ..cli.cli import cli
+from ..constants import CSV_HEADER
+from ..db.engine import get_session_maker
+from ..enums import StepStatus
+from ..manifest_manager import ManifestManager
+
+
+runner = CliRunner()
+
+
+def test_report_csv_writes_a_snapshot_of_the_manifest(tmp_path, monkeypatch, database_url):
+    monkeypatch.setenv("database_url", database_url)
+    session = get_session_maker(database_url)()
+    manager = ManifestManager(session)
+    manager.bulk_get_or_create_jobs([("SRR000001", "a.txt"), ("SRR000002", "a.txt")])
+    manager.update_step_status("SRR000001", "download", StepStatus.SUCCESS)
+    session.close()
+
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(f"""
+    data_dir: {tmp_path / "sra_data"}
+    subdirs:
+        lists: sra_lists
+        output: sra_files
+        logs: logs
+        fastq: fastq_files
+        star: star
+    logs:
+        csv: csv_logs
+        python: python_logs
+    star:
+        genome_dir: genome_ref
+        star_output: star_output
+    """)
+
+    result = runner.invoke(cli, ["report", "csv", "--config-file", str(config_file)], catch_exceptions=False)
+    assert result.exit_code == 0
+
+    log_path = Path(result.stdout.strip())
+    assert log_path.parent == tmp_path / "sra_data" / "logs" / "csv_logs"
+    with log_path.open() as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(CSV_HEADER)
+    assert sorted(rows[1:]) == [
+        ["SRR000001", "Success", "Pending", "Pending", "Pending", "Pending", "a.txt"],
+        ["SRR000002", "Pending", "Pending", "Pending", "Pending", "Pending", "a.txt"],
+    ]
@@ -0,0 +1,103 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from ..db.engine import get_session_maker
+from ..enums import PipelineStep, StepStatus
+from ..manifest_manager import ManifestManager
+from .. import reports
+
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def seeded_session(database_url):
+    session = get_session_maker(database_url)()
+    manager = ManifestManager(session)
+    manager.bulk_get_or_create_jobs([("SRR000001", "a.txt"), ("SRR000002", "a.txt")])
+
+    started = datetime(2025, 3, 1, 10, 0, tzinfo=timezone.utc)
+    runs = [
+        ("SRR000001", PipelineStep.DOWNLOAD, StepStatus.SUCCESS, 10),
+        ("SRR000002", PipelineStep.DOWNLOAD, StepStatus.FAILED, 2),
+        ("SRR000002", PipelineStep.DOWNLOAD, StepStatus.SUCCESS, 30),
+        ("SRR000001", PipelineStep.ALIGN, StepStatus.SUCCESS, 600),
+    ]
+    for accession, step, status, seconds in runs:
+        manager.update_step_status(accession, step.value, status, event={
+            "step": step,
+            "started_at": started,
+            "ended_at": started + timedelta(seconds=seconds),
+            "duration_seconds": float(seconds),
+            "bytes_out": 1000,
+            "tools": [{
+                "tool": step.value, "exit_code": 0, "wall_seconds": float(seconds),
+                "user_cpu_seconds": 2.0 * seconds, "sys_cpu_seconds": 0.0,
+                "max_rss_kb": 1024 * seconds, "read_bytes": 0, "write_bytes": 1000,
+            }],
+        })
+    manager.record_star_metrics("SRR000001", {"input_reads": 1000, "uniquely_mapped_pct": 91.5})
+
+    yield session
+    session.close()
+
+
+def test_export_parquet_writes_partitioned_datasets(seeded_session, tmp_path):
+    out_dir = tmp_path / "reports"
+    written = reports.export_parquet(seeded_session, out_dir)
+
+    assert set(written) == {"jobs", "step_events", "star_metrics", "tool_runs"}
+    assert (out_dir / "step_events" / "date=2025-03-01" / "step=download").is_dir()
+
+    # re-export replaces partitions instead of duplicating rows
+    reports.export_parquet(seeded_session, out_dir)
+    events = reports.load_dataset(out_dir, "step_events", ["accession", "status"])
+    assert len(events) == 4
+    assert list(events.columns) == ["accession", "status"]
+
+
+def test_export_parquet_drops_rows_that_moved_to_another_partition(seeded_session, tmp_path):
+    out_dir = tmp_path / "reports"
+    reports.export_parquet(seeded_session, out_dir)
+
+    # retrying every job of a day moves all of its rows to the retry's date
+    for job in ManifestManager(seeded_session).all_jobs():
+        job.updated_at = datetime(2025, 3, 2, tzinfo=timezone.utc)
+    seeded_session.commit()
+    reports.export_parquet(seeded_session, out_dir)
+
+    jobs = reports.load_dataset(out_dir, "jobs", ["accession"])
+    assert sorted(jobs["accession"]) == ["SRR000001", "SRR000002"]
+    assert [p.name for p in (out_dir / "jobs").iterdir()] == ["date=2025-03-02"]
+    assert sorted(p.name for p in out_dir.iterdir()) == ["jobs", "star_metrics", "step_events", "tool_runs"]
+
+
+def test_summary_queries(seeded_session, tmp_path):
+    out_dir = tmp_path / "reports"
+    reports.export_parquet(seeded_session, out_dir)
+
+    failures = reports.failure_rates(out_dir).set_index("step")
+    assert failures.loc["download", "attempts"] == 3
+    assert failures.loc["download", "failure_rate"] == pytest.approx(1 / 3)
+
+    durations = reports.step_durations(out_dir).set_index("step")
+    assert durations.loc["download", "runs"] == 2
+    assert durations.loc["align", "p50"] == 600
+
+    hourly = reports.throughput(out_dir)
+    assert hourly["jobs"].sum() == 4
+
+
+def test_load_dataset_missing_export(tmp_path):
+    with pytest.raises(FileNotFoundError, match="report export"):
+        reports.load_dataset(tmp_path, "step_events", ["step"])
+
+
+def test_tool_usage_summary(seeded_session, tmp_path):
+    out_dir = tmp_path / "reports"
+    reports.export_parquet(seeded_session, out_dir)
+
+    usage = reports.tool_usage(out_dir).set_index("tool")
+    assert usage.loc["download", "runs"] == 3
+    assert usage.loc["align", "cores_p50"] == pytest.approx(2.0)
+    assert usage.loc["align", "max_rss_mb_max"] == pytest.approx(600)
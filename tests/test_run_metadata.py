@@ -0,0 +1,80 @@
+import gzip
+import pytest
+
+from ..db.models import RunMetadataModel
+from ..run_metadata import RunMetadataStore, disk_needed, import_metadata, read_runinfo
+
+
+RUNINFO = (
+    "Run,ReleaseDate,spots,bases,avgLength,size_MB,Experiment,LibraryLayout,Platform,SRAStudy,Sample\n"
+    "SRR000001,2020-01-01,1000,200000,200,12,SRX000010,PAIRED,ILLUMINA,SRP000100,SRS000001\n"
+    "SRR000002,2020-01-01,1000,36000,36,,SRX000020,single,ILLUMINA,SRP000100,SRS000002\n"
+    "Run,ReleaseDate,spots,bases,avgLength,size_MB,Experiment,LibraryLayout,Platform,SRAStudy,Sample\n"
+)
+
+SOFT = """^SERIES = GSE1
+!Series_title = test
+^SAMPLE = GSM11
+!Sample_title = sample one
+!Sample_library_strategy = RNA-Seq
+!Sample_instrument_model = Illumina HiSeq 2500
+!Sample_relation = BioSample: https://www.ncbi.nlm.nih.gov/biosample/SAMN1
+!Sample_relation = SRA: https://www.ncbi.nlm.nih.gov/sra?term=SRX000010
+^SAMPLE = GSM99
+!Sample_title = sample without runs
+!Sample_relation = SRA: https://www.ncbi.nlm.nih.gov/sra?term=SRX999999
+"""
+
+
+def test_read_runinfo_parses_fields_and_skips_repeated_headers(tmp_path):
+    path = tmp_path / "SraRunInfo.csv.gz"
+    with gzip.open(path, "wt") as f:
+        f.write(RUNINFO)
+
+    rows = list(read_runinfo(path))
+
+    assert [row["accession"] for row in rows] == ["SRR000001", "SRR000002"]
+    assert rows[0]["layout"] == "PAIRED" and rows[0]["spots"] == 1000 and rows[0]["size_mb"] == 12.0
+    assert rows[1]["layout"] == "SINGLE" and rows[1]["size_mb"] is None
+    assert rows[1]["library_strategy"] is None  # column not in this export
+
+
+def test_reimport_refreshes_runs_and_keeps_geo_annotations(session, tmp_path):
+    path = tmp_path / "SraRunInfo.csv"
+    path.write_text(RUNINFO)
+    store = RunMetadataStore(session)
+
+    assert import_metadata(session, [path])["runs"] == 2
+    assert store.annotate_experiments([{"experiment": "SRX000010", "geo_sample": "GSM11"},
+                                       {"experiment": "SRX999999", "geo_sample": "GSM99"}]) == (1, 1)
+    path.write_text(RUNINFO.replace(",12,", ",15,"))
+    import_metadata(session, [path])
+
+    run = store.get("SRR000001")
+    assert (run.size_mb, run.geo_sample, run.experiment) == (15.0, "GSM11", "SRX000010")
+    assert set(store.get_many(["SRR000001", "SRR000002", "SRR404"])) == {"SRR000001", "SRR000002"}
+    assert store.get("SRR404") is None
+
+
+def test_geo_soft_annotates_runs_of_linked_experiments(session, tmp_path):
+    pytest.importorskip("GEOparse")
+    runinfo = tmp_path / "SraRunInfo.csv"
+    runinfo.write_text(RUNINFO)
+    soft = tmp_path / "GSE1_family.soft"
+    soft.write_text(SOFT)
+
+    # SOFT files are applied after the runs they annotate, whatever the argument order
+    counts = import_metadata(session, [soft, runinfo])
+
+    assert counts == {"runs": 2, "geo_runs": 1, "geo_unmatched": 1}
+    run = RunMetadataStore(session).get("SRR000001")
+    assert (run.geo_sample, run.library_strategy, run.platform) == ("GSM11", "RNA-Seq", "Illumina HiSeq 2500")
+
+
+def test_disk_needed_counts_fastq_only_when_converting():
+    run = RunMetadataModel(accession="SRR1", size_mb=10, bases=1000)
+
+    assert disk_needed(run, convert=False) == 10 * 1024 * 1024
+    assert disk_needed(run, convert=True) == 10 * 1024 * 1024 + 2200
+    assert disk_needed(RunMetadataModel(accession="SRR2"), convert=True) is None
+    assert disk_needed(None, convert=True) is None
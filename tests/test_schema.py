@@ -0,0 +1,25 @@
+from sqlalchemy import inspect
+
+from ..db.engine import create_db_engine
+from ..db.models import JobModel
+from ..db.schema import create_schema
+
+
+def test_create_schema_adds_indexes_to_existing_tables(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'manifest.db'}")
+    # a jobs table from before pipeline_status was indexed
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "CREATE TABLE jobs (accession VARCHAR PRIMARY KEY, source_file VARCHAR, "
+            + ", ".join(f"{column.name} VARCHAR" for column in JobModel.__table__.columns
+                        if column.name not in ("accession", "source_file"))
+            + ")"
+        )
+
+    create_schema(engine)
+    create_schema(engine)
+
+    inspector = inspect(engine)
+    assert "ix_jobs_pipeline_status" in {index["name"] for index in inspector.get_indexes("jobs")}
+    assert {"step_events", "artifacts"} <= set(inspector.get_table_names())
+    assert "step_throughput_hourly" in inspector.get_view_names()
@@ -0,0 +1,115 @@
+from multiprocessing import Pool
+import signal
+import threading
+import time
+
+import pytest
+
+from .. import shutdown
+from ..shutdown import GracefulShutdown, JobInterrupted, init_worker
+from ..tool_runner import run_tool
+
+
+def test_sigint_drains_then_interrupts_then_aborts(monkeypatch):
+    interrupted = []
+    monkeypatch.setattr(GracefulShutdown, "interrupt_workers", lambda self, reason: interrupted.append(reason))
+    handler = GracefulShutdown()
+
+    handler._handle(signal.SIGINT, None)
+    assert handler.stopping and interrupted == []
+
+    handler._handle(signal.SIGINT, None)
+    assert interrupted == ["SIGINT"]
+
+    with pytest.raises(KeyboardInterrupt):
+        handler._handle(signal.SIGINT, None)
+
+
+def test_sigterm_interrupts_running_jobs_at_once(monkeypatch):
+    interrupted = []
+    monkeypatch.setattr(GracefulShutdown, "interrupt_workers",
+                        lambda self, reason: (interrupted.append(reason), setattr(self, "interrupting", True)))
+    handler = GracefulShutdown()
+
+    handler._handle(signal.SIGTERM, None)
+
+    assert handler.stopping and interrupted == ["SIGTERM"]
+    with pytest.raises(KeyboardInterrupt):
+        handler._handle(signal.SIGTERM, None)
+
+
+def test_until_stopped_stops_dispatching_after_a_signal():
+    handler = GracefulShutdown()
+    dispatched = []
+    for item in handler.until_stopped(range(5)):
+        dispatched.append(item)
+        if item == 1:
+            handler.signals = 1
+
+    assert dispatched == [0, 1]
+
+
+def _slow_task(item):
+    time.sleep(0.02)
+    return item
+
+
+def test_first_signal_holds_back_tasks_a_real_pool_has_not_started():
+    handler = GracefulShutdown()
+    with Pool(2, initializer=init_worker) as pool:
+        results = []
+        for result in pool.imap_unordered(_slow_task, handler.until_stopped(range(2000), in_flight=2)):
+            handler.task_done()
+            results.append(result)
+            handler.signals = 1
+
+    # only the tasks out when the signal came finish
+    assert 1 <= len(results) <= 3
+
+
+def test_feeder_waiting_for_a_slot_returns_once_feeding_stops(monkeypatch):
+    monkeypatch.setattr(shutdown, "SLOT_POLL_INTERVAL", 0.01)
+    handler = GracefulShutdown()
+    tasks = handler.until_stopped(range(5), in_flight=1)
+
+    assert next(tasks) == 0
+    # the batch failed before its first result: nothing frees the slot
+    handler.stop_feeding()
+    assert list(tasks) == []
+
+
+def test_handlers_are_restored_on_exit():
+    previous = signal.getsignal(signal.SIGTERM)
+    with GracefulShutdown() as handler:
+        assert signal.getsignal(signal.SIGTERM) == handler._handle
+    assert signal.getsignal(signal.SIGTERM) == previous
+
+
+def test_sigterm_only_interrupts_while_a_job_runs():
+    previous = signal.getsignal(signal.SIGTERM)
+    with shutdown.job_running():
+        assert signal.getsignal(signal.SIGTERM) == shutdown._on_worker_sigterm
+    assert signal.getsignal(signal.SIGTERM) == previous
+
+
+def test_idle_workers_leave_a_terminated_pool():
+    with Pool(2, initializer=init_worker) as pool:
+        assert pool.map(_slow_task, range(4)) == [0, 1, 2, 3]
+        workers = list(pool._pool)
+
+    assert all(worker.exitcode is not None for worker in workers)
+
+
+def test_worker_sigterm_stops_the_running_tool(monkeypatch):
+    monkeypatch.setattr(shutdown, "_interrupted", False)
+    timer = threading.Timer(0.2, shutdown._on_worker_sigterm, args=(signal.SIGTERM, None))
+    timer.start()
+    started = time.perf_counter()
+
+    with pytest.raises(JobInterrupted), shutdown.job_running():
+        run_tool("sleep", ["sleep", "30"])
+
+    assert time.perf_counter() - started < 5
+    assert not shutdown._running_tools
+    with pytest.raises(JobInterrupted):
+        shutdown.raise_if_interrupted()
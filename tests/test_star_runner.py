@@ -2,7 +2,8 @@ import pytest
 from unittest.mock import patch, MagicMock
 from pathlib import Path
 
-from ..star_runner import STARRunner
+from ..star_runner import STARRunner, parse_log_final, parse_progress_line
+from ..db.models import RunMetadataModel
 
 
 @pytest.fixture
@@ -40,14 +41,14 @@ def solo_star_runner():
     )
 
 
-@patch("pipeline.star_runner.subprocess.run")
+@patch("pipeline.star_runner.run_tool")
 def test_star_align_success(mock_run, basic_star_runner, mock_fastqs):
     mock_run.return_value = MagicMock(returncode=0, stdout="ok", stderr="")
 
     result = basic_star_runner.align("TEST_ACC", mock_fastqs)
 
     # STAR CLI should be called
-    cmd = mock_run.call_args[0][0]
+    cmd = mock_run.call_args[0][1]
     assert "STAR" in cmd
     assert "--readFilesIn" in cmd
     assert str(mock_fastqs[0]) in cmd
@@ -57,12 +58,43 @@ def test_star_align_success(mock_run, basic_star_runner, mock_fastqs):
     assert isinstance(result, list)
 
 
-@patch("pipeline.star_runner.subprocess.run")
+@patch("pipeline.star_runner.run_tool")
+def test_star_align_single_end_short_reads(mock_run, basic_star_runner):
+    mock_run.return_value = MagicMock(returncode=0, stdout="ok", stderr="")
+    metadata = RunMetadataModel(accession="TEST_ACC", layout="SINGLE", avg_length=36)
+
+    basic_star_runner.align("TEST_ACC", [Path("TEST_ACC.fastq")], metadata=metadata)
+
+    cmd = mock_run.call_args[0][1]
+    assert cmd[cmd.index("--readFilesIn") + 1:cmd.index("--runThreadN")] == ["TEST_ACC.fastq"]
+    assert cmd[cmd.index("--outFilterScoreMinOverLread") + 1] == "0.3"
+
+
+@patch("pipeline.star_runner.run_tool")
+def test_star_align_long_paired_reads_keep_default_filters(mock_run, basic_star_runner, mock_fastqs):
+    mock_run.return_value = MagicMock(returncode=0, stdout="ok", stderr="")
+    metadata = RunMetadataModel(accession="TEST_ACC", layout="PAIRED", avg_length=200)
+
+    basic_star_runner.align("TEST_ACC", mock_fastqs, metadata=metadata)
+
+    assert "--outFilterScoreMinOverLread" not in mock_run.call_args[0][1]
+
+
+@patch("pipeline.star_runner.run_tool")
+def test_star_align_rejects_layout_mismatch(mock_run, basic_star_runner):
+    metadata = RunMetadataModel(accession="TEST_ACC", layout="PAIRED")
+
+    with pytest.raises(ValueError, match="paired-end"):
+        basic_star_runner.align("TEST_ACC", [Path("TEST_ACC.fastq")], metadata=metadata)
+    mock_run.assert_not_called()
+
+
+@patch("pipeline.star_runner.run_tool")
 def test_star_align_with_solo(mock_run, solo_star_runner, mock_fastqs):
     mock_run.return_value = MagicMock(returncode=0, stdout="ok", stderr="")
 
     result = solo_star_runner.align("SOLO_ACC", mock_fastqs)
-    cmd = mock_run.call_args[0][0]
+    cmd = mock_run.call_args[0][1]
 
     assert "--soloType" in cmd
     assert "--soloCBstart" in cmd
@@ -71,7 +103,7 @@ def test_star_align_with_solo(mock_run, solo_star_runner, mock_fastqs):
     assert isinstance(result, list)
 
 
-@patch("pipeline.star_runner.subprocess.run")
+@patch("pipeline.star_runner.run_tool")
 def test_star_align_with_solo_autodetect(mock_run, mock_fastqs):
     # solo fields set, but whitelist is None
     runner = STARRunner(
@@ -87,12 +119,12 @@ def test_star_align_with_solo_autodetect(mock_run, mock_fastqs):
     mock_run.return_value = MagicMock(returncode=0, stdout="ok", stderr="")
     runner.align("AUTO_ACC", mock_fastqs)
 
-    cmd = mock_run.call_args[0][0]
+    cmd = mock_run.call_args[0][1]
     assert "--soloCBwhitelist" in cmd
     assert "None" in cmd
 
 
-@patch("pipeline.star_runner.subprocess.run")
+@patch("pipeline.star_runner.run_tool")
 def test_star_align_failure(mock_run, basic_star_runner, mock_fastqs):
     mock_run.return_value = MagicMock(returncode=1, stderr="fail!")
 
@@ -101,5 +133,33 @@ def test_star_align_failure(mock_run, basic_star_runner, mock_fastqs):
 
 
 def test_star_align_invalid_fastq_count(basic_star_runner):
-    with pytest.raises(ValueError, match="paired-end FASTQ files"):
-        basic_star_runner.align("BAD_ACC", [Path("only_R1.fastq")])
\ No newline at end of file
+    # one (single-end) or two (paired-end) files only
+    with pytest.raises(ValueError, match="one or two FASTQ files"):
+        basic_star_runner.align("BAD_ACC", [])
+    with pytest.raises(ValueError, match="one or two FASTQ files"):
+        basic_star_runner.align("BAD_ACC", [Path("R1.fastq"), Path("R2.fastq"), Path("R3.fastq")])
+
+def test_parse_log_final_extracts_metrics():
+    text = (
+        "                          Number of input reads |\t1000\n"
+        "                      Average input read length |\t98\n"
+        "                   Uniquely mapped reads number |\t915\n"
+        "                        Uniquely mapped reads % |\t91.50%\n"
+        "             % of reads mapped to multiple loci |\t3.20%\n"
+        "                                    Started job on |\tJan 01 10:00:00\n"
+    )
+    metrics = parse_log_final(text)
+
+    assert metrics["input_reads"] == 1000
+    assert metrics["uniquely_mapped_pct"] == 91.5
+    assert metrics["multi_mapped_pct"] == 3.2
+    assert len(metrics) == 5
+
+
+def test_parse_progress_line_reads_rows_and_skips_headers():
+    header = "           Time    Speed        Read     Read   Mapped   Mapped   Mapped   Mapped Unmapped"
+    row = "Jan 01 10:01:02     80.4     1234567      202    91.2%    201.1     0.3%     3.1%     0.0%"
+
+    assert parse_progress_line(header) is None
+    assert parse_progress_line("ALL DONE!") is None
+    assert parse_progress_line(row) == {"reads": 1234567, "mreads_per_hour": 80.4, "uniquely_mapped_pct": 91.2}
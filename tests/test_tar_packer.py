@@ -0,0 +1,90 @@
+import gzip
+import io
+import json
+import tarfile
+from unittest.mock import MagicMock
+
+from ..tar_packer import TarStreamPacker, pack_and_upload, split_by_size
+
+
+def make_outputs(tmp_path, accession="SRR000001"):
+    out_dir = tmp_path / f"{accession}_"
+    solo_dir = out_dir / "Solo.out"
+    solo_dir.mkdir(parents=True)
+    (solo_dir / "barcodes.tsv").write_text("AAAC\nGGGT\n")
+    (solo_dir / "matrix.mtx").write_text("%%MatrixMarket\n1 1 1\n")
+    (out_dir / "Log.final.out").write_text("Uniquely mapped reads % | 90%\n")
+    bam = out_dir / "Aligned.sortedByCoord.out.bam"
+    bam.write_bytes(b"\x00" * 32)
+    return out_dir, bam
+
+
+def test_split_by_size_keeps_bams_large(tmp_path):
+    out_dir, bam = make_outputs(tmp_path)
+    files = sorted(p for p in out_dir.rglob("*") if p.is_file())
+
+    small, large = split_by_size(files, max_member_size=1024)
+
+    assert large == [bam]
+    assert len(small) == 3
+
+
+def test_tar_stream_offsets_point_at_member_data(tmp_path):
+    out_dir, _ = make_outputs(tmp_path)
+    files = sorted(p for p in out_dir.rglob("*.tsv")) + [out_dir / "Log.final.out"]
+
+    packer = TarStreamPacker(files, root=tmp_path)
+    stream = packer.open()
+    data = stream.read()
+    packer.close()
+
+    raw = gzip.decompress(data)
+    for member in packer.members:
+        original = (tmp_path / member["path"]).read_bytes()
+        start = member["tar_offset"]
+        assert raw[start:start + member["size"]] == original
+
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+        assert sorted(tar.getnames()) == sorted(m["path"] for m in packer.members)
+
+
+def test_pack_and_upload_streams_small_and_uploads_large(tmp_path):
+    out_dir, bam = make_outputs(tmp_path)
+
+    s3 = MagicMock()
+    s3._s3_key.side_effect = lambda name: f"prefix/{name}"
+    s3.upload_fileobj.side_effect = lambda fileobj, key: fileobj.read()
+
+    index = pack_and_upload(s3, "SRR000001", [out_dir], root=tmp_path, max_member_size=1024)
+
+    s3.upload_fileobj.assert_called_once()
+    assert s3.upload_fileobj.call_args[0][1] == "prefix/SRR000001.tar.gz"
+    s3.upload_file.assert_called_once_with(bam, "prefix/SRR000001/SRR000001_/Aligned.sortedByCoord.out.bam")
+
+    assert index["archive"] == "prefix/SRR000001.tar.gz"
+    assert len(index["members"]) == 3
+    assert index["objects"] == [{
+        "path": "SRR000001_/Aligned.sortedByCoord.out.bam",
+        "size": 32,
+        "key": "prefix/SRR000001/SRR000001_/Aligned.sortedByCoord.out.bam",
+    }]
+
+    uploaded_index = json.loads(s3.upload_bytes.call_args[0][0])
+    assert uploaded_index == index
+    assert s3.upload_bytes.call_args[0][1] == "prefix/SRR000001.index.json"
+
+
+def test_pack_and_upload_keys_large_files_by_accession(tmp_path):
+    s3 = MagicMock()
+    s3._s3_key.side_effect = lambda name: f"prefix/{name}"
+    s3.upload_fileobj.side_effect = lambda fileobj, key: fileobj.read()
+
+    for accession in ("SRR000001", "SRR000002"):
+        out_dir, _ = make_outputs(tmp_path, accession)
+        pack_and_upload(s3, accession, [out_dir], root=tmp_path, max_member_size=1024)
+
+    keys = [call.args[1] for call in s3.upload_file.call_args_list]
+    assert keys == [
+        "prefix/SRR000001/SRR000001_/Aligned.sortedByCoord.out.bam",
+        "prefix/SRR000002/SRR000002_/Aligned.sortedByCoord.out.bam",
+    ]
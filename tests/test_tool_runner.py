@@ -0,0 +1,122 @@
+import contextvars
+import subprocess
+import sys
+import time
+import pytest
+
+from .. import metrics, tool_runner
+from ..tool_runner import run_tool, set_step_limits, start_usage_collection, take_tool_usage, tool_killed
+
+
+def test_run_tool_captures_output_and_usage(tmp_path):
+    script = (
+        "import sys\n"
+        f"open({str(tmp_path / 'out.bin')!r}, 'wb').write(b'x' * 1_000_000)\n"
+        "buf = bytearray(50_000_000)\n"
+        "print('hello'); print('oops', file=sys.stderr)\n"
+    )
+    result = run_tool("python", [sys.executable, "-c", script], cwd=tmp_path)
+
+    assert result.returncode == 0
+    assert result.stdout == "hello\n"
+    assert result.stderr == "oops\n"
+
+    usage = result.usage
+    assert usage["tool"] == "python"
+    assert usage["exit_code"] == 0
+    assert usage["wall_seconds"] > 0
+    assert usage["user_cpu_seconds"] + usage["sys_cpu_seconds"] > 0
+    assert usage["max_rss_kb"] > 50_000
+    assert usage["write_bytes"] is None or usage["write_bytes"] >= 0
+
+
+def test_run_tool_check_raises_with_stderr():
+    cmd = [sys.executable, "-c", "import sys; sys.stderr.write('boom'); sys.exit(3)"]
+
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        run_tool("python", cmd, check=True)
+
+    assert excinfo.value.returncode == 3
+    assert excinfo.value.stderr == "boom"
+
+
+def test_run_tool_keeps_only_the_tail_of_long_output(monkeypatch):
+    monkeypatch.setattr(tool_runner, "OUTPUT_TAIL_LINES", 3)
+    cmd = [sys.executable, "-c", "import sys\nfor i in range(10): print(i, file=sys.stderr)"]
+
+    result = run_tool("python", cmd)
+
+    assert result.stderr == "... 7 earlier lines not kept ...\n7\n8\n9\n"
+    assert result.stdout == ""
+
+
+def test_run_tool_follows_progress_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(tool_runner, "PROGRESS_INTERVAL", 0.05)
+    progress = tmp_path / "progress.txt"
+    script = (
+        "import time\n"
+        f"f = open({str(progress)!r}, 'w', buffering=1)\n"
+        "f.write('reads\\n')\n"
+        "for n in (100, 250): f.write(f'{n}\\n'); time.sleep(0.2)\n"
+        "f.write('400')\n"
+    )
+    parse = lambda line: {"reads": int(line)} if line.isdigit() else None
+    registry = metrics.MetricsRegistry()
+    metrics.bind(registry)
+    try:
+        run_tool("python", [sys.executable, "-c", script], progress_file=progress, parse_progress=parse)
+    finally:
+        metrics.bind(None)
+
+    # the unterminated last line is not a whole row yet
+    assert registry.value(metrics.TOOL_PROGRESS, tool="python", unit="reads") == 250
+
+
+def test_usage_is_collected_per_step():
+    start_usage_collection()
+    run_tool("true", ["true"])
+    run_tool("false", ["false"])
+
+    usage = take_tool_usage()
+    assert [(u["tool"], u["exit_code"]) for u in usage] == [("true", 0), ("false", 1)]
+    assert take_tool_usage() == []
+
+
+def _run_limited(cmd, timeout=None, stall_timeout=None):
+    """run_tool under step limits, in a copied context so they don't leak into other tests."""
+    def step():
+        start_usage_collection()
+        set_step_limits(timeout, stall_timeout)
+        started = time.perf_counter()
+        result = run_tool("python", cmd)
+        return result, tool_killed(), time.perf_counter() - started
+    return contextvars.copy_context().run(step)
+
+
+@pytest.mark.parametrize("limits, reason", [
+    ({"timeout": 0.3}, "timeout"),
+    ({"stall_timeout": 0.3}, "stalled"),
+])
+def test_watchdog_kills_hung_tools(monkeypatch, limits, reason):
+    monkeypatch.setattr(tool_runner, "WATCHDOG_INTERVAL", 0.05)
+    registry = metrics.MetricsRegistry()
+    metrics.bind(registry)
+    try:
+        result, killed, elapsed = _run_limited([sys.executable, "-c", "import time; time.sleep(30)"], **limits)
+    finally:
+        metrics.bind(None)
+
+    assert result.returncode < 0
+    assert killed == reason
+    assert elapsed < 10
+    assert registry.value(metrics.TOOL_KILLS, tool="python", reason=reason) == 1
+
+
+def test_watchdog_leaves_tools_that_make_progress(monkeypatch):
+    monkeypatch.setattr(tool_runner, "WATCHDOG_INTERVAL", 0.05)
+    script = "import sys, time\nfor _ in range(10):\n    print('.', flush=True); time.sleep(0.1)\n"
+
+    result, killed, _ = _run_limited([sys.executable, "-c", script], timeout=30, stall_timeout=0.5)
+
+    assert result.returncode == 0
+    assert killed is None
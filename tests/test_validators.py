@@ -14,7 +14,7 @@ def test_validate_file_missing(validator):
     assert result == "File Missing"
 
 
-@patch("pipeline.validators.subprocess.run")
+@patch("pipeline.validators.run_tool")
 @patch("pipeline.validators.Path.is_file")
 def test_validate_success(mock_exists, mock_run, validator):
     accession = "SRR123456"
@@ -24,7 +24,7 @@ def test_validate_success(mock_exists, mock_run, validator):
     assert result == "Valid"
 
 
-@patch("pipeline.validators.subprocess.run")
+@patch("pipeline.validators.run_tool")
 @patch("pipeline.validators.Path.is_file")
 def test_validate_failure(mock_exists, mock_run, validator):
     accession = "SRR123456"
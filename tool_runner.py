@@ -0,0 +1,330 @@
+from collections import deque
+from contextvars import ContextVar
+from pathlib import Path
+import contextvars
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+from typing import Callable, Optional
+
+from . import metrics
+from . import shutdown
+
+
+logger = logging.getLogger(__name__)
+# tools' own output, line by line at DEBUG; leave it disabled unless you need it
+output_logger = logging.getLogger(f"{__name__}.output")
+
+
+# usage records collected for the step currently running in this context
+_tool_usage = ContextVar("tool_usage", default=None)
+# (deadline on the monotonic clock or None, stall seconds or None) for the current step's tools
+_step_limits = ContextVar("step_limits", default=(None, None))
+# why the watchdog killed a tool of the current step ("timeout" or "stalled"), if it did
+_tool_kill = ContextVar("tool_kill", default=None)
+
+# seconds between the watchdog's looks at a running tool
+WATCHDOG_INTERVAL = 5.0
+
+# lines of each output stream kept for error reporting; ToolResult.stdout/stderr hold only these
+OUTPUT_TAIL_LINES = 100
+# longer lines are split, so a tool writing without newlines cannot grow a buffer
+MAX_LINE_CHARS = 8192
+
+# seconds between reads of a followed progress file, and between progress log records
+PROGRESS_INTERVAL = 10.0
+PROGRESS_LOG_INTERVAL = 60.0
+
+_NUMBERS = re.compile(r"\d+")
+
+
+class ToolResult(subprocess.CompletedProcess):
+    """CompletedProcess plus the resource usage of the invocation. stdout and stderr are their tails."""
+    def __init__(self, args, returncode, stdout=None, stderr=None, usage: dict = None):
+        super().__init__(args, returncode, stdout, stderr)
+        self.usage = usage or {}
+
+
+def _read_proc_io(pid: int) -> dict:
+    """read_bytes/write_bytes from /proc/<pid>/io (storage-level I/O); empty where unavailable."""
+    try:
+        text = Path(f"/proc/{pid}/io").read_text()
+    except OSError:
+        return {}
+    fields = dict(line.split(": ", 1) for line in text.splitlines() if ": " in line)
+    return {key: int(fields[key]) for key in ("read_bytes", "write_bytes") if key in fields}
+
+
+def _io_progress(pid: int) -> Optional[int]:
+    """Bytes the process has read and written through any file, pipe or socket (rchar + wchar)."""
+    try:
+        text = Path(f"/proc/{pid}/io").read_text()
+    except OSError:
+        return None
+    fields = dict(line.split(": ", 1) for line in text.splitlines() if ": " in line)
+    return int(fields.get("rchar", 0)) + int(fields.get("wchar", 0))
+
+
+def _watchdog(proc, tool: str, deadline: Optional[float], stall_seconds: Optional[float],
+              exited: threading.Event, killed: list):
+    """
+    Stop a tool that runs past its step's deadline, or whose I/O stops
+    growing for stall_seconds (a prefetch stuck on a dead mirror, a hung
+    mount). Runs until the tool exits; the kill reason goes in `killed`.
+    """
+    progress, changed_at = None, time.monotonic()
+    while True:
+        wait = WATCHDOG_INTERVAL if deadline is None else min(WATCHDOG_INTERVAL, deadline - time.monotonic())
+        if exited.wait(max(0.0, wait)):
+            return
+        now = time.monotonic()
+        if deadline is not None and now >= deadline:
+            reason = "timeout"
+            logger.warning(f"{tool} is still running at its step's time limit; killing it")
+        else:
+            latest = _io_progress(proc.pid)
+            if latest != progress:
+                progress, changed_at = latest, now
+                continue
+            # without /proc there is nothing to measure, so only the deadline applies
+            if latest is None or stall_seconds is None or now - changed_at < stall_seconds:
+                continue
+            reason = "stalled"
+            logger.warning(f"{tool} has read or written nothing for {now - changed_at:.0f}s; killing it")
+        killed.append(reason)
+        metrics.inc(metrics.TOOL_KILLS, tool=tool, reason=reason)
+        shutdown.terminate_tool(proc)
+        return
+
+
+class OutputTail:
+    """The last OUTPUT_TAIL_LINES lines of an output stream, and how many it had in all."""
+    def __init__(self, text: bool):
+        self.text = text
+        self.lines = deque(maxlen=OUTPUT_TAIL_LINES)
+        self.count = 0
+
+
+    def append(self, line):
+        self.lines.append(line)
+        self.count += 1
+
+
+    def value(self):
+        dropped = self.count - len(self.lines)
+        lines = list(self.lines)
+        if dropped:
+            note = f"... {dropped} earlier lines not kept ...\n"
+            lines.insert(0, note if self.text else note.encode())
+        return ("" if self.text else b"").join(lines)
+
+
+def _thread(target, *args) -> threading.Thread:
+    # run in a copy of the caller's context, so log records carry the job's accession and step
+    return threading.Thread(target=contextvars.copy_context().run, args=(target, *args), daemon=True)
+
+
+def _pump(stream, tool: str, name: str, tail: OutputTail, on_line: Optional[Callable[[str], None]]):
+    """
+    Read one of a tool's output streams a line at a time, so memory stays
+    bounded however much it prints. Each line goes to the tail, to on_line,
+    and to output_logger at DEBUG (a run of lines differing only in their
+    numbers, like a progress counter, is logged once).
+    """
+    debug = output_logger.isEnabledFor(logging.DEBUG)
+    last_key = None
+    for line in iter(lambda: stream.readline(MAX_LINE_CHARS), "" if tail.text else b""):
+        tail.append(line)
+        if not on_line and not debug:
+            continue
+        line = (line if tail.text else line.decode(errors="replace")).rstrip()
+        if on_line:
+            on_line(line)
+        key = _NUMBERS.sub("#", line)
+        if debug and line and key != last_key:
+            output_logger.debug(f"{tool} {name}: {line}")
+        last_key = key
+    stream.close()
+
+
+def _follow(path: Path, on_line: Callable[[str], None], stop: threading.Event):
+    """Pass lines appended to path to on_line every PROGRESS_INTERVAL until stop is set, then once more."""
+    offset, partial = 0, b""
+    while True:
+        stopping = stop.wait(PROGRESS_INTERVAL)
+        try:
+            if path.stat().st_size < offset:
+                # rewritten from the start
+                offset, partial = 0, b""
+            with open(path, "rb") as f:
+                f.seek(offset)
+                for chunk in iter(lambda: f.read(64 * 1024), b""):
+                    *lines, partial = (partial + chunk).split(b"\n")
+                    partial = partial[-MAX_LINE_CHARS:]
+                    for line in lines:
+                        on_line(line.decode(errors="replace").rstrip())
+                offset = f.tell()
+        except FileNotFoundError:
+            # not created yet
+            pass
+        if stopping:
+            return
+
+
+class ProgressFeed:
+    """
+    Sends a tool's parsed progress lines on to the metrics (int values are
+    running totals, counted in TOOL_PROGRESS by unit) and to the log, at most
+    every PROGRESS_LOG_INTERVAL.
+    """
+    def __init__(self, tool: str, parse: Callable[[str], Optional[dict]]):
+        self.tool = tool
+        self.parse = parse
+        self.totals = {}
+        self._logged_at = None
+        self._lock = threading.Lock()
+
+
+    def __call__(self, line: str):
+        values = self.parse(line)
+        if not values:
+            return
+        with self._lock:
+            for unit, value in values.items():
+                if isinstance(value, int) and value > self.totals.get(unit, 0):
+                    metrics.inc(metrics.TOOL_PROGRESS, value - self.totals.get(unit, 0), tool=self.tool, unit=unit)
+                    self.totals[unit] = value
+            now = time.monotonic()
+            if self._logged_at is None or now - self._logged_at >= PROGRESS_LOG_INTERVAL:
+                self._logged_at = now
+                logger.info(f"{self.tool} progress: " + ", ".join(f"{key}={value}" for key, value in values.items()))
+
+
+def run_tool(tool: str, cmd: list, *, cwd: Optional[Path] = None, check: bool = False,
+             text: bool = True, env: Optional[dict] = None, progress_file: Optional[Path] = None,
+             parse_progress: Optional[Callable[[str], Optional[dict]]] = None) -> ToolResult:
+    """
+    subprocess.run(cmd, capture_output=True) for an external tool, also
+    recording wall time, user/sys CPU and max RSS (os.wait4 rusage) and
+    bytes read/written (/proc/<pid>/io, read after exit but before reaping).
+    The usage is attached to the result and collected for the current step.
+
+    Output is streamed rather than buffered: each line is logged at DEBUG
+    to output_logger as it arrives, and only the last OUTPUT_TAIL_LINES of
+    each stream are kept, as the result's stdout and stderr. With
+    parse_progress, progress lines (from progress_file, followed while the
+    tool runs, or else from its output) feed a ProgressFeed.
+
+    Tools run in their own session so a terminal Ctrl-C does not kill them
+    mid-write; a worker told to stop terminates them (see shutdown), and a
+    tool that exits unsuccessfully because of that raises JobInterrupted.
+
+    Under the limits set for the current step (set_step_limits), a watchdog
+    terminates a tool that outlives the step's deadline or stalls; it then
+    returns like any failed run (negative returncode), and tool_killed()
+    says why.
+    """
+    started = time.perf_counter()
+    with metrics.track_subprocess(tool):
+        proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                text=text, start_new_session=True)
+        shutdown.track_tool(proc)
+        feed = ProgressFeed(tool, parse_progress) if parse_progress else None
+        output_feed = feed if progress_file is None else None
+        out, err = OutputTail(text), OutputTail(text)
+        readers = [
+            _thread(_pump, proc.stdout, tool, "stdout", out, output_feed),
+            _thread(_pump, proc.stderr, tool, "stderr", err, output_feed),
+        ]
+        stop_following = threading.Event()
+        if feed and progress_file is not None:
+            readers.append(_thread(_follow, Path(progress_file), feed, stop_following))
+        for reader in readers:
+            reader.start()
+
+        exited, killed = threading.Event(), []
+        deadline, stall_seconds = _step_limits.get()
+        watchdog = None
+        if deadline is not None or stall_seconds is not None:
+            watchdog = threading.Thread(target=_watchdog, daemon=True,
+                                        args=(proc, tool, deadline, stall_seconds, exited, killed))
+            watchdog.start()
+
+        try:
+            # wait for exit without reaping so /proc/<pid> is still there
+            os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+            # and stop watching before the pid can be reused
+            exited.set()
+            stop_following.set()
+            if watchdog:
+                watchdog.join()
+            io = _read_proc_io(proc.pid)
+            _, status, rusage = os.wait4(proc.pid, 0)
+        except BaseException:
+            exited.set()
+            stop_following.set()
+            shutdown.kill_tool(proc)
+            raise
+        finally:
+            shutdown.untrack_tool(proc)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+
+        for reader in readers:
+            reader.join()
+
+    usage = {
+        "tool": tool,
+        "exit_code": proc.returncode,
+        "wall_seconds": time.perf_counter() - started,
+        "user_cpu_seconds": rusage.ru_utime,
+        "sys_cpu_seconds": rusage.ru_stime,
+        "max_rss_kb": rusage.ru_maxrss,  # kilobytes on Linux
+        "read_bytes": io.get("read_bytes"),
+        "write_bytes": io.get("write_bytes"),
+    }
+    collected = _tool_usage.get()
+    if collected is not None:
+        collected.append(usage)
+
+    if proc.returncode != 0 and shutdown.interrupted():
+        raise shutdown.JobInterrupted(f"{tool} stopped")
+    if killed:
+        _tool_kill.set(killed[0])
+
+    result = ToolResult(cmd, proc.returncode, out.value(), err.value(), usage)
+    if check:
+        result.check_returncode()
+    return result
+
+
+def start_usage_collection():
+    """Start collecting run_tool usage in this context (a job calls this when a step begins)."""
+    _tool_usage.set([])
+    _tool_kill.set(None)
+
+
+def set_step_limits(timeout: Optional[float] = None, stall_timeout: Optional[float] = None):
+    """
+    Limit the tools of the step beginning in this context: all of them must
+    finish within timeout seconds from now, and each is killed if it reads
+    and writes nothing for stall_timeout seconds. None means no limit.
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    _step_limits.set((deadline, stall_timeout or None))
+
+
+def tool_killed() -> Optional[str]:
+    """Why the watchdog killed a tool of the current step ("timeout" or "stalled"), or None."""
+    return _tool_kill.get()
+
+
+def take_tool_usage() -> list[dict]:
+    """Return the usage collected since the last call (or since collection started) and reset it."""
+    collected = _tool_usage.get()
+    if collected is None:
+        return []
+    _tool_usage.set([])
+    return collected
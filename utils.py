@@ -1,9 +1,22 @@
 from pathlib import Path
 import logging
 
+from .accession_lists import is_list_file
+
 
 logger = logging.getLogger(__name__)
 
 
 def get_sra_lists(sra_lists_dir: Path) -> list[Path]:
-    return list(sra_lists_dir.glob("*.txt"))
+    """Accession list files in the directory, plain or compressed, in name order."""
+    return sorted(path for path in sra_lists_dir.glob("*") if path.is_file() and is_list_file(path))
+
+
+def format_bytes(n) -> str:
+    """Human-readable size in binary units ("1.5 GB"); "?" when unknown."""
+    if n is None:
+        return "?"
+    for unit in ("B", "KB", "MB", "GB", "TB", "PB"):
+        if abs(n) < 1024 or unit == "PB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
@@ -1,7 +1,9 @@
 from pathlib import Path
-import subprocess
 import logging
 
+from .tool_runner import run_tool
+from . import fs_index
+
 
 class SRAValidator:
     def __init__(self, output_dir: Path):
@@ -11,14 +13,14 @@ class SRAValidator:
 
     def validate(self, accession: str) -> str:
         sra_file = self.output_dir / accession / f"{accession}.sra"
-        exists = sra_file.is_file()
+        exists = fs_index.is_file(sra_file)
         
         if not exists:
             self.logger.info(f"{accession}: File Missing!")
             return "File Missing"
         
         self.logger.info(f"RUNNING vdb-validate on: {sra_file}")
-        result = subprocess.run(["vdb-validate", str(sra_file)], capture_output=True, text=True)
+        result = run_tool("vdb-validate", ["vdb-validate", str(sra_file)])
 
         if result.returncode == 0:
             self.logger.info(f"{accession}: Validation OK!")